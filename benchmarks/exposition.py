@@ -0,0 +1,118 @@
+"""Serialization cost per scrape for a simulated fleet of FRITZ!Box devices.
+
+Compares prometheus_client's ``generate_latest`` with the incremental
+``FamilyRenderer`` on identical collections. Byte and packet counters advance
+on every scrape, everything else stays constant, as on a real fleet.
+
+Run from the repository root:
+
+    python -m benchmarks.exposition [--devices 50] [--scrapes 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import time
+from collections.abc import Iterator
+from typing import Any
+from unittest.mock import patch
+
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import Metric
+
+from fritzexporter.exposition import FamilyRenderer
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from tests.fc_services_mock import (
+    call_action_mock,
+    call_http_mock,
+    create_fc_services,
+    fc_services_devices,
+)
+
+
+class TickingActions:
+    """call_action side effect whose traffic counters grow with every scrape."""
+
+    def __init__(self) -> None:
+        self.tick = 0
+
+    def __call__(self, service: str, action: str, **kwargs: Any) -> Any:  # noqa: ANN401
+        result = call_action_mock(service, action, **kwargs)
+        if not isinstance(result, dict):
+            return result
+        return {
+            key: value + self.tick * 1500
+            if isinstance(value, int) and ("Bytes" in key or "Packets" in key)
+            else value
+            for key, value in result.items()
+        }
+
+
+class Snapshot:
+    """Collector replaying one pre-collected list of families."""
+
+    def __init__(self, metrics: list[Metric]) -> None:
+        self.metrics = metrics
+
+    def collect(self) -> Iterator[Metric]:
+        return iter(self.metrics)
+
+
+def build_fleet(devices: int, actions: TickingActions) -> FritzCollector:
+    collector = FritzCollector()
+    with patch("fritzexporter.tr064_remote.FritzConnection") as fritzconnection:
+        fc = fritzconnection.return_value
+        fc.call_action.side_effect = actions
+        fc.call_http.side_effect = call_http_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+        for i in range(devices):
+            device = FritzDevice(
+                FritzCredentials(f"fritz-{i}", "user", "password"), f"Fritz {i}", host_info=True
+            )
+            device.serial = f"{i:012d}"
+            collector.register(device)
+    return collector
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--scrapes", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("fritzexporter").setLevel(logging.ERROR)
+
+    actions = TickingActions()
+    collector = build_fleet(args.devices, actions)
+    renderer = FamilyRenderer()
+    full, incremental = [], []
+    size = 0
+
+    for tick in range(args.scrapes):
+        actions.tick = tick
+        registry = CollectorRegistry()
+        registry.register(Snapshot(list(collector.collect())))
+
+        start = time.perf_counter()
+        expected = generate_latest(registry)
+        full.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        body = renderer.render(registry)
+        incremental.append(time.perf_counter() - start)
+
+        if body != expected:
+            msg = "incremental output differs from generate_latest"
+            raise RuntimeError(msg)
+        size = len(body)
+
+    # The first incremental render has nothing to reuse; report it separately.
+    print(f"{args.devices} devices, {size} bytes per scrape, {args.scrapes} scrapes")
+    print(f"generate_latest      median {statistics.median(full) * 1e3:8.3f} ms")
+    print(f"FamilyRenderer first        {incremental[0] * 1e3:8.3f} ms")
+    print(f"FamilyRenderer       median {statistics.median(incremental[1:]) * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""Fleet-scale load test: scrape latency, TR-064 calls, CPU and memory per collector mode.
+
+Starts a fleet of simulated devices (``fritzexporter.simulator``) with a mix of
+DSL and fiber routers, mesh repeaters, smart home heavy boxes and boxes with a
+500 entry host table in separate processes. For every collector mode the
+exporter side is then built in a fresh process, scraped repeatedly, and the
+following is reported:
+
+* p50/p99 scrape latency (collect and render; a full round of all targets
+  in probe mode),
+* TR-064 calls per scrape, as counted by the simulated devices,
+* exporter CPU seconds per scrape, worker processes included,
+* peak RSS of the exporter, worker processes summed up.
+
+Every device gets its own 127.x.y.z address, which needs Linux. Smart home
+boxes are served over TLS (fritzconnection only uses port 80 for plain-HTTP
+AHA calls) and need ``openssl`` to create a certificate; without it they are
+simulated as plain DSL routers.
+
+Run from the repository root:
+
+    python -m benchmarks.fleet [--boxes 200] [--scrapes 10] [--latency 0.005]
+                               [--modes inprocess workers:4 probe]
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import logging
+import math
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from prometheus_client import CollectorRegistry
+
+from fritzexporter.config import DeviceConfig
+from fritzexporter.exposition import FamilyRenderer
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from fritzexporter.probe import ProbeManager
+from fritzexporter.simulator import (
+    DeviceProfile,
+    SimulatedDevice,
+    add_homeautomation,
+    dsl_router,
+    fiber_router,
+    repeater,
+    start_simulator,
+    tls_context,
+)
+from fritzexporter.tr064_remote import ConnectionOptions
+from fritzexporter.workers import ShardedCollector, shard
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.context import SpawnContext
+
+USER = "monitor"
+PASSWORD = "simulator"  # noqa: S105 - the simulated devices' password
+
+# Capability mix per ten boxes.
+MIX = (
+    ("dsl", 4),
+    ("fiber", 2),
+    ("repeater", 2),
+    ("homeautomation", 1),
+    ("hostinfo", 1),
+)
+
+
+def fleet_kinds(boxes: int) -> list[str]:
+    pattern = [kind for kind, weight in MIX for _ in range(weight)]
+    return [pattern[i % len(pattern)] for i in range(boxes)]
+
+
+def build_profile(kind: str, index: int, *, tls: bool) -> DeviceProfile:
+    serial = f"SIM{index:09d}"
+    if kind == "fiber":
+        return fiber_router(serial)
+    if kind == "repeater":
+        return repeater(serial)
+    if kind == "hostinfo":
+        return dsl_router(serial, hosts=500)
+    if kind == "homeautomation" and tls:
+        return add_homeautomation(dsl_router(serial), 40)
+    return dsl_router(serial)
+
+
+def serve_fleet(
+    boxes: list[tuple[int, str]],
+    conn: Connection,
+    *,
+    latency: float,
+    jitter: float,
+    certfile: str | None,
+) -> None:
+    """Fleet process: start the simulators, report their addresses, answer call counts."""
+    tls = tls_context(certfile) if certfile else None
+    servers = []
+    for index, kind in boxes:
+        profile = build_profile(kind, index, tls=tls is not None)
+        profile.latency = latency
+        profile.jitter = jitter
+        device = SimulatedDevice(profile, user=USER, password=PASSWORD, seed=index)
+        address = f"127.1.{index // 250}.{index % 250 + 1}"
+        use_tls = kind == "homeautomation" and tls is not None
+        servers.append(start_simulator(device, host=address, tls=tls if use_tls else None))
+    conn.send(
+        [
+            (index, (server.server_address[0], server.port, server.tls))
+            for (index, _), server in zip(boxes, servers, strict=True)
+        ]
+    )
+    while (command := conn.recv()) != "stop":
+        if command != "calls":
+            msg = f"unknown command {command!r}"
+            raise ValueError(msg)
+        conn.send(
+            sum(
+                count
+                for server in servers
+                for key, count in server.device.calls.items()
+                if not key.startswith("aha/")
+            )
+        )
+    for server in servers:
+        server.stop()
+
+
+def build_collector(devices: list[DeviceConfig]) -> FritzCollector:
+    collector = FritzCollector()
+    for dev in devices:
+        collector.register(
+            FritzDevice(
+                FritzCredentials(dev.hostname, dev.username, dev.password or ""),
+                dev.name,
+                host_info=dev.host_info,
+                wifi_client_info=dev.wifi_client_info,
+                connection=ConnectionOptions(use_tls=dev.use_tls, port=dev.port),
+            )
+        )
+    return collector
+
+
+def proc_stats(pid: int) -> tuple[float, int]:
+    """CPU seconds and peak RSS (KiB) of another process, from /proc."""
+    try:
+        with Path(f"/proc/{pid}/stat").open() as stat:
+            fields = stat.read().rpartition(")")[2].split()
+        with Path(f"/proc/{pid}/status").open() as status:
+            hwm = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+    except OSError, StopIteration:
+        return 0.0, 0
+    # utime and stime are fields 14 and 15 of /proc/<pid>/stat.
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK"), hwm
+
+
+def build_mode(mode: str, devices: list[DeviceConfig]) -> tuple[Callable[[], Any], list[int]]:
+    """Return the scrape function and the pids of worker processes for ``mode``."""
+    if mode == "inprocess":
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(build_collector(devices))
+        renderer = FamilyRenderer()
+        return lambda: renderer.render(registry), []
+
+    if mode.startswith("workers:"):
+        shards = shard(devices, int(mode.partition(":")[2]))
+        collector = ShardedCollector(functools.partial(build_collector, s) for s in shards)
+        collector.start()
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(collector)
+        renderer = FamilyRenderer()
+        return lambda: renderer.render(registry), [w.process.pid for w in collector.workers]
+
+    if mode == "probe":
+        probes = ProbeManager(devices, lambda dev: build_collector([dev]), max_size=len(devices))
+        pool = ThreadPoolExecutor(max_workers=min(64, len(devices)))
+        names = [dev.hostname for dev in devices]
+        return lambda: list(pool.map(probes.probe, names)), []
+
+    msg = f"unknown mode {mode}"
+    raise ValueError(msg)
+
+
+def count_calls(conns: list[Connection]) -> int:
+    """Total TR-064 calls answered by the fleet processes behind ``conns`` so far."""
+    for conn in conns:
+        conn.send("calls")
+    return sum(conn.recv() for conn in conns)
+
+
+class Fleet:
+    """The simulator processes, each serving a share of the boxes."""
+
+    def __init__(
+        self,
+        ctx: SpawnContext,
+        kinds: list[str],
+        processes: int,
+        serve: Callable[[list[tuple[int, str]], Connection], None],
+    ) -> None:
+        self.conns: list[Connection] = []
+        self.processes: list[Any] = []
+        for boxes in shard(list(enumerate(kinds)), processes):
+            conn, child = ctx.Pipe()
+            process = ctx.Process(target=serve, args=(boxes, child), name="fleet")
+            process.start()
+            self.conns.append(conn)
+            self.processes.append(process)
+
+    def addresses(self) -> list[tuple[str, int, bool]]:
+        found = dict(item for conn in self.conns for item in conn.recv())
+        return [found[index] for index in sorted(found)]
+
+    def stop(self) -> None:
+        for conn, process in zip(self.conns, self.processes, strict=True):
+            conn.send("stop")
+            process.join()
+
+
+def run_mode(
+    mode: str,
+    devices: list[DeviceConfig],
+    scrapes: int,
+    fleet_conns: list[Connection],
+    results: Connection,
+) -> None:
+    """Mode process: build the exporter side for ``mode`` and scrape it ``scrapes`` times."""
+    # requests lets a CA bundle from the environment override verify=False.
+    os.environ.pop("REQUESTS_CA_BUNDLE", None)
+    os.environ.pop("CURL_CA_BUNDLE", None)
+    logging.getLogger("fritzexporter").setLevel(logging.ERROR)
+    logging.getLogger("fritzconnection").setLevel(logging.ERROR)
+
+    setup_start = time.perf_counter()
+    scrape, pids = build_mode(mode, devices)
+    # The first scrape connects probe targets and warms the renderer caches.
+    scrape()
+    setup = time.perf_counter() - setup_start
+
+    def cpu() -> float:
+        return time.process_time() + sum(proc_stats(pid)[0] for pid in pids)
+
+    latencies, calls, cpu_times = [], [], []
+    for _ in range(scrapes):
+        calls_before = count_calls(fleet_conns)
+        cpu_before = cpu()
+        start = time.perf_counter()
+        scrape()
+        latencies.append(time.perf_counter() - start)
+        cpu_times.append(cpu() - cpu_before)
+        calls.append(count_calls(fleet_conns) - calls_before)
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss += sum(proc_stats(pid)[1] for pid in pids)
+    results.send(
+        {
+            "setup": setup,
+            "latencies": latencies,
+            "calls": calls,
+            "cpu": cpu_times,
+            "rss_kib": rss,
+        }
+    )
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def make_certificate(directory: str) -> str | None:
+    if shutil.which("openssl") is None:
+        return None
+    cert = str(Path(directory) / "simulator.pem")
+    subprocess.run(  # noqa: S603 - fixed arguments, openssl found on PATH
+        [
+            *("openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"),
+            *("-subj", "/CN=fritz.box", "-keyout", cert, "-out", cert),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boxes", type=int, default=200)
+    parser.add_argument("--scrapes", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per TR-064 action")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument(
+        "--fleet-processes",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help="Processes serving the simulated boxes, so the fleet is not the bottleneck",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["inprocess", "workers:4", "probe"],
+        help="Collector modes: inprocess, workers:N, probe",
+    )
+    args = parser.parse_args()
+
+    ctx = get_context("spawn")
+    kinds = fleet_kinds(args.boxes)
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile = make_certificate(tmp)
+        fleet = Fleet(
+            ctx,
+            kinds,
+            args.fleet_processes,
+            functools.partial(
+                serve_fleet, latency=args.latency, jitter=args.jitter, certfile=certfile
+            ),
+        )
+        try:
+            addresses = fleet.addresses()
+            devices = [
+                DeviceConfig(
+                    hostname=host,
+                    username=USER,
+                    password=PASSWORD,
+                    name=f"{kind}-{index}",
+                    host_info=kind == "hostinfo",
+                    wifi_client_info=True,
+                    use_tls=tls,
+                    port=port,
+                )
+                for index, (kind, (host, port, tls)) in enumerate(
+                    zip(kinds, addresses, strict=True)
+                )
+            ]
+            summary = ", ".join(f"{kinds.count(kind)} {kind}" for kind, _ in MIX)
+            print(f"{args.boxes} boxes ({summary}), {args.scrapes} scrapes per mode")
+            if certfile is None:
+                print("openssl not found: smart home boxes are simulated as DSL routers")
+            print(
+                f"{'mode':<12} {'setup s':>8} {'p50 ms':>9} {'p99 ms':>9} "
+                f"{'calls/scrape':>13} {'cpu s/scrape':>13} {'peak RSS MiB':>13}"
+            )
+            for mode in args.modes:
+                results, results_child = ctx.Pipe()
+                runner = ctx.Process(
+                    target=run_mode,
+                    args=(mode, devices, args.scrapes, fleet.conns, results_child),
+                    name=f"mode-{mode}",
+                )
+                runner.start()
+                result = results.recv()
+                runner.join()
+                print(
+                    f"{mode:<12} {result['setup']:8.2f} "
+                    f"{percentile(result['latencies'], 50) * 1e3:9.1f} "
+                    f"{percentile(result['latencies'], 99) * 1e3:9.1f} "
+                    f"{sum(result['calls']) / len(result['calls']):13.1f} "
+                    f"{sum(result['cpu']) / len(result['cpu']):13.3f} "
+                    f"{result['rss_kib'] / 1024:13.1f}"
+                )
+        finally:
+            fleet.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Cost of the TR-064 request path per scrape for simulated devices.
+
+Compares fritzconnection's ``Soaper`` with ``FastSoaper`` on identical
+responses: every action without arguments of the simulator profiles is called
+once to record its response, then both build the requests and parse the
+recorded responses, without the network in between.
+
+Run from the repository root:
+
+    python -m benchmarks.soap [--rounds 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Any
+
+import requests
+from fritzconnection import FritzConnection  # type: ignore[import]
+from fritzconnection.core.soaper import Soaper  # type: ignore[import]
+
+from fritzexporter.simulator import (
+    DeviceProfile,
+    SimulatedDevice,
+    dsl_router,
+    fiber_router,
+    repeater,
+    start_simulator,
+)
+from fritzexporter.soap import FastSoaper
+from fritzexporter.tr064_remote import ConnectionOptions, create_fritz_connection
+
+USER = "monitor"
+PASSWORD = "secret"  # noqa: S105 - the simulated devices' password
+
+
+class Replay:
+    """Session answering each POST with the response recorded for its SOAPACTION."""
+
+    def __init__(self, responses: dict[str, requests.Response]) -> None:
+        self.responses = responses
+
+    def post(self, *_: object, headers: dict[str, str], **__: object) -> requests.Response:
+        return self.responses[headers["soapaction"]]
+
+
+def record(
+    profile: DeviceProfile,
+) -> tuple[FritzConnection, list[tuple[Any, str]], dict[str, requests.Response]]:
+    """The connection to a simulated ``profile`` and its recorded responses."""
+    server = start_simulator(SimulatedDevice(profile, user=USER, password=PASSWORD))
+    try:
+        fc = create_fritz_connection(
+            address=server.host,
+            user=USER,
+            password=PASSWORD,
+            connection=ConnectionOptions(port=server.port),
+        )
+        calls = [
+            (service_name, service, name)
+            for service_name, service in fc.services.items()
+            for name, action in service.actions.items()
+            if all(argument.direction != "in" for argument in action.arguments.values())
+        ]
+        recorded, responses = [], {}
+        fc.session.hooks["response"].append(lambda response, *_, **__: recorded.append(response))
+        for service_name, service, name in calls:
+            fc.call_action(service_name, name)
+            responses[f"{service.serviceType}#{name}"] = recorded[-1]
+        return fc, [(service, name) for _, service, name in calls], responses
+    finally:
+        server.stop()
+
+
+def run(
+    soaper: Soaper, calls: list[tuple[Any, str]], rounds: int
+) -> tuple[list[dict[str, Any]] | None, list[float]]:
+    results, times = None, []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        results = [soaper.execute(service, name, {}) for service, name in calls]
+        times.append(time.perf_counter() - start)
+    return results, times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    for profile in (dsl_router("BENCH"), fiber_router("BENCH"), repeater("BENCH")):
+        fc, calls, responses = record(profile)
+        stock = Soaper(fc.soaper.address, fc.soaper.port, USER, PASSWORD, session=Replay(responses))
+        fast = FastSoaper.from_soaper(stock)
+
+        expected, stock_times = run(stock, calls, args.rounds)
+        results, fast_times = run(fast, calls, args.rounds)
+        if results != expected:
+            msg = "FastSoaper results differ from Soaper"
+            raise RuntimeError(msg)
+
+        stock_ms = statistics.median(stock_times) * 1e3
+        fast_ms = statistics.median(fast_times) * 1e3
+        print(f"{profile.model}: {len(calls)} actions per round, {args.rounds} rounds")
+        print(f"  Soaper      median {stock_ms:8.3f} ms")
+        print(f"  FastSoaper  median {fast_ms:8.3f} ms  ({stock_ms / fast_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
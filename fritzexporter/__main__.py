@@ -1,22 +1,47 @@
 import argparse
+import functools
 import logging
 import os
+import signal
 import sys
 import threading
+from collections.abc import Callable
 from pathlib import Path
 
 from fritzconnection.core.exceptions import (  # type: ignore[import]
     FritzAuthorizationError,
     FritzConnectionException,
 )
-from prometheus_client import start_http_server
+from prometheus_client import CollectorRegistry, generate_latest, write_to_textfile
 from prometheus_client.core import REGISTRY
 
-from fritzexporter.config import DeviceConfig, ExporterError, get_config
-from fritzexporter.data_donation import donate_data
+from fritzexporter.cassette import cassette_path, close_recordings_on_sigterm
+from fritzexporter.circuit import BREAKER_COOLDOWN, BREAKER_THRESHOLD
+from fritzexporter.config import DeviceConfig, ExporterConfig, ExporterError, get_config
+from fritzexporter.data_donation import (
+    DONATION_CONCURRENCY,
+    DONATION_TIME_BUDGET,
+    DonationOptions,
+    donate_data,
+)
 from fritzexporter.exceptions import FritzDeviceHasNoCapabilitiesError
+from fritzexporter.exposition import start_http_server
 from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
-from fritzexporter.tr064_remote import ConnectionOptions
+from fritzexporter.probe import ProbeManager
+from fritzexporter.reload import ConfigReloader, DeviceDiff
+from fritzexporter.remote_write import (
+    REMOTE_WRITE_BATCH,
+    REMOTE_WRITE_INTERVAL,
+    REMOTE_WRITE_SPOOL_BYTES,
+    RemoteWriteOptions,
+    RemoteWriter,
+)
+from fritzexporter.resolver import DNS_TTL, HostResolver
+from fritzexporter.sampler import WAN_SAMPLE_WINDOW
+from fritzexporter.timeouts import TIMEOUT_FACTOR, TIMEOUT_MAX, TIMEOUT_MIN, TimeoutOptions
+from fritzexporter.tr064_remote import PREFLIGHT_TIMEOUT, ConnectionOptions
+from fritzexporter.transport import KEEP_ALIVE_INTERVAL
+from fritzexporter.workers import ShardedCollector, shard
 
 from . import __version__
 
@@ -54,6 +79,39 @@ def parse_cmdline() -> argparse.Namespace:
         help="Instead of displaying the collected data donation, upload it.",
     )
 
+    parser.add_argument(
+        "--donation-concurrency",
+        type=int,
+        default=DONATION_CONCURRENCY,
+        metavar="N",
+        help=f"Concurrent calls per device when collecting a data donation "
+        f"(default: {DONATION_CONCURRENCY})",
+    )
+
+    parser.add_argument(
+        "--donation-time-budget",
+        type=float,
+        default=DONATION_TIME_BUDGET,
+        metavar="SECONDS",
+        help=f"Time budget per device for collecting a data donation "
+        f"(default: {DONATION_TIME_BUDGET:g})",
+    )
+
+    parser.add_argument(
+        "--donation-format",
+        choices=("json", "ndjson"),
+        default="json",
+        help="json: one document at the end; ndjson: stream one record per action as it "
+        "completes (uploaded gzip-compressed with --upload-data and --donation-url)",
+    )
+
+    parser.add_argument(
+        "--donation-url",
+        metavar="URL",
+        help="Upload the data donation to URL instead of the project's server "
+        "(default: $FRITZ_DONATION_URL or the project's server)",
+    )
+
     parser.add_argument(
         "-s",
         "--sanitize",
@@ -63,6 +121,186 @@ def parse_cmdline() -> argparse.Namespace:
         help="Sanitize 'service, action, field' from the data donation output",
     )
 
+    parser.add_argument(
+        "--preflight-timeout",
+        type=float,
+        default=PREFLIGHT_TIMEOUT,
+        metavar="SECONDS",
+        help="TCP connect timeout for checking unavailable devices before talking TR-064 "
+        f"to them, 0 to disable (default: {PREFLIGHT_TIMEOUT:g})",
+    )
+
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=BREAKER_THRESHOLD,
+        metavar="N",
+        help="Stop contacting a device after N consecutive failed scrapes, 0 to disable "
+        f"(default: {BREAKER_THRESHOLD})",
+    )
+
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=BREAKER_COOLDOWN,
+        metavar="SECONDS",
+        help="How long a device is not contacted after --breaker-threshold failures "
+        f"(default: {BREAKER_COOLDOWN:g})",
+    )
+
+    parser.add_argument(
+        "--timeout-factor",
+        type=float,
+        default=TIMEOUT_FACTOR,
+        metavar="FACTOR",
+        help="Set each device's TR-064 timeout to its observed p99 latency times FACTOR, "
+        f"e.g. 3; 0 keeps the configured timeouts (default: {TIMEOUT_FACTOR:g})",
+    )
+
+    parser.add_argument(
+        "--timeout-min",
+        type=float,
+        default=TIMEOUT_MIN,
+        metavar="SECONDS",
+        help=f"Lower bound of the adapted timeouts (default: {TIMEOUT_MIN:g})",
+    )
+
+    parser.add_argument(
+        "--timeout-max",
+        type=float,
+        default=TIMEOUT_MAX,
+        metavar="SECONDS",
+        help="Upper bound of the adapted timeouts; a lower connection_timeout of a device "
+        f"takes precedence (default: {TIMEOUT_MAX:g})",
+    )
+
+    parser.add_argument(
+        "--dns-ttl",
+        type=float,
+        default=DNS_TTL,
+        metavar="SECONDS",
+        help="Reuse the resolved addresses of the devices for SECONDS, and beyond that "
+        f"while the resolver fails (default: {DNS_TTL:g}, 0 to disable)",
+    )
+
+    parser.add_argument(
+        "--keep-alive",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="Keep the connection to every TLS device open by a cheap request whenever it "
+        f"was idle for SECONDS, e.g. {KEEP_ALIVE_INTERVAL:g} (default: 0, disabled)",
+    )
+
+    parser.add_argument(
+        "--wan-sample-interval",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="Sample the WAN data rate of every device each SECONDS in the background and "
+        "export peak and quantiles (default: 0, disabled)",
+    )
+
+    parser.add_argument(
+        "--wan-sample-window",
+        type=float,
+        default=WAN_SAMPLE_WINDOW,
+        metavar="SECONDS",
+        help="Seconds of WAN samples the peak and quantiles cover "
+        f"(default: {WAN_SAMPLE_WINDOW:g})",
+    )
+
+    parser.add_argument(
+        "--once",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Collect once, write the metrics to FILE (atomically, e.g. for the node_exporter "
+        "textfile collector) or to stdout without FILE, and exit",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Cache service descriptions and detected capabilities of the devices in DIR "
+        "to speed up start-up",
+    )
+
+    parser.add_argument(
+        "--remote-write",
+        metavar="URL",
+        help="Do not start the HTTP listener, push the metrics to this Prometheus "
+        "remote-write endpoint instead",
+    )
+
+    parser.add_argument(
+        "--remote-write-interval",
+        type=float,
+        default=REMOTE_WRITE_INTERVAL,
+        metavar="SECONDS",
+        help=f"Seconds between collections in push mode (default: {REMOTE_WRITE_INTERVAL:g})",
+    )
+
+    parser.add_argument(
+        "--remote-write-batch",
+        type=int,
+        default=REMOTE_WRITE_BATCH,
+        metavar="N",
+        help=f"Collections sent per push (default: {REMOTE_WRITE_BATCH})",
+    )
+
+    parser.add_argument(
+        "--remote-write-spool",
+        metavar="DIR",
+        help="Keep batches the endpoint did not accept in DIR and send them again later "
+        "(default: drop them)",
+    )
+
+    parser.add_argument(
+        "--remote-write-spool-size",
+        type=int,
+        default=REMOTE_WRITE_SPOOL_BYTES // 2**20,
+        metavar="MIB",
+        help="Size limit of the spool; the oldest batches are dropped beyond it "
+        f"(default: {REMOTE_WRITE_SPOOL_BYTES // 2**20})",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Shard devices across N worker processes (default: 1, collect in-process)",
+    )
+
+    parser.add_argument(
+        "--watch-config",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Check the config file for changes every SECONDS and reload devices "
+        "(default: 0, reload on SIGHUP only)",
+    )
+
+    cassettes = parser.add_mutually_exclusive_group()
+    cassettes.add_argument(
+        "--record-cassettes",
+        metavar="DIR",
+        help="Record the TR-064 traffic of every device to DIR/<hostname>.jsonl.gz",
+    )
+    cassettes.add_argument(
+        "--replay-cassettes",
+        metavar="DIR",
+        help="Do not connect to devices, replay the traffic recorded in DIR instead",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        metavar="FACTOR",
+        help="Scale the recorded latencies on replay (default: 1.0, 0 to answer immediately)",
+    )
+
     parser.add_argument(
         "--version", action="store_const", const="version", help="Print version number and exit."
     )
@@ -79,16 +317,34 @@ def _resolve_password(dev: DeviceConfig) -> str:
     return password
 
 
+@functools.cache
+def _shared_resolver(ttl: float) -> HostResolver:
+    return HostResolver(ttl)
+
+
+def _resolver(args: argparse.Namespace) -> HostResolver | None:
+    """The host name cache shared by all devices, None if disabled."""
+    return _shared_resolver(args.dns_ttl) if args.dns_ttl > 0 else None
+
+
 def _register_device(
     dev: DeviceConfig, args: argparse.Namespace, fritzcollector: FritzCollector
 ) -> None:
     password = _resolve_password(dev)
     creds = FritzCredentials(dev.hostname, dev.username, password)
+    record_dir, replay_dir = args.record_cassettes, args.replay_cassettes
     connection = ConnectionOptions(
         connection_timeout=dev.connection_timeout,
         use_tls=dev.use_tls,
         port=dev.port,
         remote_access=dev.remote_access,
+        record_to=str(cassette_path(record_dir, dev.hostname)) if record_dir else None,
+        replay_from=str(cassette_path(replay_dir, dev.hostname)) if replay_dir else None,
+        replay_speed=args.replay_speed,
+        rate_limit=dev.rate_limit,
+        rate_burst=dev.rate_burst,
+        cache_dir=args.cache_dir,
+        resolver=_resolver(args),
     )
     try:
         fritz_device = FritzDevice(
@@ -114,17 +370,145 @@ def _register_device(
         return
 
     if args.donate_data == "donate":
-        donate_data(fritz_device, upload=args.upload_data == "upload", sanitation=args.sanitize)
+        donate_data(
+            fritz_device,
+            upload=args.upload_data == "upload",
+            sanitation=args.sanitize,
+            options=DonationOptions(
+                concurrency=args.donation_concurrency,
+                time_budget=args.donation_time_budget,
+                stream=args.donation_format == "ndjson",
+                url=args.donation_url,
+            ),
+        )
         sys.exit(0)
     else:
         logger.info("registering %s to collector", dev.hostname)
         fritzcollector.register(fritz_device)
 
 
-def main() -> None:
-    fritzcollector = FritzCollector()
+def _new_collector(args: argparse.Namespace) -> FritzCollector:
+    collector = FritzCollector(
+        preflight_timeout=args.preflight_timeout,
+        breaker_threshold=args.breaker_threshold,
+        breaker_cooldown=args.breaker_cooldown,
+        timeouts=TimeoutOptions(
+            factor=args.timeout_factor, minimum=args.timeout_min, maximum=args.timeout_max
+        ),
+    )
+    if args.wan_sample_interval > 0:
+        collector.sample_wan(args.wan_sample_interval, args.wan_sample_window)
+    if args.keep_alive > 0 and not args.once:
+        collector.keep_alive(args.keep_alive)
+    return collector
+
+
+def _build_shard_collector(devices: list[DeviceConfig], args: argparse.Namespace) -> FritzCollector:
+    fritzcollector = _new_collector(args)
+    for dev in devices:
+        _register_device(dev, args, fritzcollector)
+    return fritzcollector
+
+
+def _build_probe_collector(dev: DeviceConfig, args: argparse.Namespace) -> FritzCollector:
+    return _build_shard_collector([dev], args)
+
+
+def _apply_device_diff(
+    diff: DeviceDiff, args: argparse.Namespace, fritzcollector: FritzCollector
+) -> None:
+    for dev in [*diff.removed, *diff.changed]:
+        logger.info("removing %s from collector", dev.hostname)
+        fritzcollector.unregister(dev.hostname)
+    for dev in [*diff.changed, *diff.added]:
+        _register_device(dev, args, fritzcollector)
+
+
+def _setup_collection(
+    config: ExporterConfig, args: argparse.Namespace, fritzcollector: FritzCollector
+) -> tuple[ProbeManager | None, Callable[[DeviceDiff], None] | None]:
+    """Register the collector(s) for the configured mode.
+
+    Returns the probe manager (probe mode only) and the function applying device
+    changes on config reload, which is None where reloading is not supported.
+    """
+    single = args.donate_data or args.once
+    if config.probe_mode and not single:
+        logger.info(
+            "Probe mode: %d devices are connected on their first probe", len(config.devices)
+        )
+        probes = ProbeManager(
+            config.devices,
+            functools.partial(_build_probe_collector, args=args),
+            max_size=config.probe_cache_size,
+            idle_timeout=config.probe_idle_timeout,
+        )
+        return probes, probes.apply
+
+    if args.workers > 1 and not single:
+        shards = shard(config.devices, args.workers)
+        logger.info("Collecting %d devices in %d workers", len(config.devices), len(shards))
+        sharded = ShardedCollector(
+            functools.partial(_build_shard_collector, devices, args) for devices in shards
+        )
+        sharded.start()
+        REGISTRY.register(sharded)
+        if args.config:
+            logger.warning("Config reload is not supported with --workers, restart to apply")
+        return None, None
+
+    for dev in config.devices:
+        _register_device(dev, args, fritzcollector)
+    if not args.once:
+        # FritzCollector has no describe(): registering it collects once. _write_once
+        # registers it on a registry of its own.
+        REGISTRY.register(fritzcollector)
+    if single:
+        return None, None
+    return None, functools.partial(_apply_device_diff, args=args, fritzcollector=fritzcollector)
+
+
+def _write_once(output: str, fritzcollector: FritzCollector) -> None:
+    # Only the device metrics: process metrics would clash with node_exporter's own.
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(fritzcollector)
+    if output == "-":
+        sys.stdout.buffer.write(generate_latest(registry))
+        sys.stdout.flush()
+    else:
+        write_to_textfile(output, registry)
+        logger.info("Metrics written to %s", output)
+
+
+def _push(args: argparse.Namespace, probes: ProbeManager | None) -> None:
+    if probes is not None:
+        logger.critical("--remote-write does not support probe_mode. Exiting.")
+        sys.exit(1)
+    writer = RemoteWriter(
+        args.remote_write,
+        REGISTRY,
+        RemoteWriteOptions(
+            interval=args.remote_write_interval,
+            batch=args.remote_write_batch,
+            spool_dir=args.remote_write_spool,
+            spool_bytes=args.remote_write_spool_size * 2**20,
+        ),
+    )
+    logger.info("Exporter is ready")
+    # Avoid blocking forever when running tests
+    if os.getenv("FRITZ_EXPORTER_UNDER_TEST"):
+        writer.collect()
+        writer.flush()
+        return
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    writer.run(stop)
+
 
+def main() -> None:
     args = parse_cmdline()
+    fritzcollector = _new_collector(args)
 
     if args.version:
         print(__version__)  # noqa: T201
@@ -146,13 +530,32 @@ def main() -> None:
     for log in loggers:
         log.setLevel(log_level)
 
-    for dev in config.devices:
-        _register_device(dev, args, fritzcollector)
+    probes, apply_reload = _setup_collection(config, args, fritzcollector)
+    if args.record_cassettes:
+        close_recordings_on_sigterm()
+
+    if args.once:
+        _write_once(args.once, fritzcollector)
+        return
 
-    REGISTRY.register(fritzcollector)
+    if args.config and apply_reload is not None:
+        reloader = ConfigReloader(
+            args.config, config, apply_reload, watch_interval=args.watch_config
+        )
+        reloader.install_signal_handler()
+        reloader.start()
+
+    if args.remote_write:
+        _push(args, probes)
+        return
 
     logger.info("Starting listener at %s:%d", config.listen_address, config.exporter_port)
-    start_http_server(int(config.exporter_port), str(config.listen_address))
+    start_http_server(
+        int(config.exporter_port),
+        str(config.listen_address),
+        max_age=config.scrape_cache_ttl,
+        probes=probes,
+    )
 
     logger.info("Exporter is ready")
 
@@ -0,0 +1,75 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""On-disk cache of detected device capabilities.
+
+Detecting the capabilities of a device calls every action they require once,
+which dominates the start-up time of a short-lived exporter (``--once``). The
+outcome is stored per device together with everything it depends on (serial
+number, software version, exporter version and the ``host_info`` and
+``wifi_client_info`` settings) and reused while all of that matches and the
+entry is younger than ``CAPABILITY_CACHE_TTL``; the age limit also heals a
+detection that was disturbed by a transient device error.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger("fritzexporter.capability_cache")
+
+CAPABILITY_CACHE_TTL = 24 * 3600.0
+
+
+def capability_cache_path(directory: str, hostname: str) -> Path:
+    """The capability cache file for ``hostname`` in ``directory``."""
+    return Path(directory) / f"capabilities_{re.sub(r'[^A-Za-z0-9._-]', '_', hostname)}.json"
+
+
+def load_capabilities(
+    path: Path, key: dict[str, Any], ttl: float = CAPABILITY_CACHE_TTL
+) -> dict[str, dict[str, Any]] | None:
+    """The cached capability states in ``path`` if they were stored for ``key``."""
+    try:
+        cached = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as err:
+        logger.warning("Ignoring unreadable capability cache %s: %s", path, err)
+        return None
+    if not isinstance(cached, dict) or cached.get("key") != key:
+        logger.info("Capability cache %s is outdated", path)
+        return None
+    if time.time() - cached.get("created", 0) > ttl:
+        logger.info("Capability cache %s is expired", path)
+        return None
+    return cached.get("capabilities")
+
+
+def save_capabilities(path: Path, key: dict[str, Any], states: dict[str, dict[str, Any]]) -> None:
+    """Store ``states`` for ``key`` in ``path``, atomically; errors are only logged."""
+    content = json.dumps({"key": key, "created": time.time(), "capabilities": states})
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(content, encoding="utf-8")
+        tmp.replace(path)
+    except OSError as err:
+        logger.warning("Could not write capability cache %s: %s", path, err)
+        tmp.unlink(missing_ok=True)
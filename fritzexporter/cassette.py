@@ -0,0 +1,406 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Record and replay the TR-064 traffic of a device ("cassettes").
+
+``RecordingConnection`` wraps a live ``FritzConnection`` and writes every
+``call_action`` and ``call_http`` request, its response (or error) and its
+measured latency to a gzipped JSON lines file, together with the service
+layout used for capability detection and the HTTP GETs behind the mesh
+topology. ``ReplayConnection`` loads such a file and answers the same calls
+with the recorded responses after sleeping the recorded latency, so a slow
+scrape from production can be reproduced without access to the box.
+
+Repeated calls with the same arguments are answered in recorded order and
+start over from the first recording once exhausted, so counters jump back
+when a replay runs longer than the recording.
+
+Calls made inside ``with unrecorded():`` (the background WAN sampler) are
+not recorded; on replay they get the current response of their call without
+advancing the recorded order or sleeping.
+
+Open recordings are closed at exit and, with ``close_recordings_on_sigterm``,
+when the process is stopped. A cassette that was not closed (the process was
+killed) ends in a truncated gzip stream; it is replayed up to that point.
+"""
+
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import logging
+import re
+import signal
+import sys
+import threading
+import time
+import weakref
+import zlib
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+from typing import IO, Any
+from urllib.parse import urlsplit
+
+import requests
+from fritzconnection.core import exceptions as fritz_exceptions  # type: ignore[import]
+from fritzconnection.core.exceptions import FritzConnectionException  # type: ignore[import]
+
+logger = logging.getLogger("fritzexporter.cassette")
+
+CASSETTE_VERSION = 1
+MAX_RECORDED_CALLS = 100_000
+_FLUSH_EVERY = 100
+
+
+_recordings: weakref.WeakSet[RecordingConnection] = weakref.WeakSet()
+_unrecorded = threading.local()
+
+
+@contextmanager
+def unrecorded() -> Iterator[None]:
+    """Leave the calls of this thread in the block out of recordings and replay order."""
+    _unrecorded.active = True
+    try:
+        yield
+    finally:
+        _unrecorded.active = False
+
+
+def _is_unrecorded() -> bool:
+    return getattr(_unrecorded, "active", False)
+
+
+def close_recordings() -> None:
+    """Close all open recordings, completing their cassettes."""
+    for recording in list(_recordings):
+        recording.close()
+
+
+atexit.register(close_recordings)
+
+
+def recording() -> bool:
+    """Whether any recording is open."""
+    return bool(_recordings)
+
+
+def close_recordings_on_sigterm() -> None:
+    """Close all open recordings and exit on SIGTERM (docker or systemd stop).
+
+    Without this the process dies on SIGTERM without running the exit hooks.
+    """
+
+    def terminate(signum: int, _: FrameType | None) -> None:
+        close_recordings()
+        sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, terminate)
+
+
+def cassette_path(directory: str, hostname: str) -> Path:
+    """The cassette file for ``hostname`` in ``directory``."""
+    return Path(directory) / f"{re.sub(r'[^A-Za-z0-9._-]', '_', hostname)}.jsonl.gz"
+
+
+def _key(kind: str, name: str, arguments: dict[str, Any] | None) -> str:
+    return json.dumps([kind, name, arguments or {}], sort_keys=True, default=str)
+
+
+def _url_path(url: str) -> str:
+    # fritzconnection joins address and port without a scheme when the address has none.
+    return urlsplit(url if "://" in url else f"//{url}").path
+
+
+def _merged(arguments: dict[str, Any] | None, kwargs: dict[str, Any]) -> dict[str, Any]:
+    merged = dict(arguments or {})
+    merged.update(kwargs)
+    return merged
+
+
+class _RecordingSession:
+    """Proxy for ``FritzConnection.session`` recording GET requests (mesh topology)."""
+
+    def __init__(self, session: Any, recorder: RecordingConnection) -> None:  # noqa: ANN401
+        self._session = session
+        self._recorder = recorder
+
+    def get(self, url: str, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        start = time.perf_counter()
+        response = self._session.get(url, *args, **kwargs)
+        self._recorder.record(
+            {
+                "get": _url_path(url),
+                "status": response.status_code,
+                "text": response.text,
+                "latency": time.perf_counter() - start,
+            }
+        )
+        return response
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        return getattr(self._session, name)
+
+
+class RecordingConnection:
+    """Wraps a live ``FritzConnection`` and records its traffic to ``path``."""
+
+    def __init__(
+        self,
+        fc: Any,  # noqa: ANN401
+        path: str | Path,
+        *,
+        max_calls: int = MAX_RECORDED_CALLS,
+    ) -> None:
+        self.fc = fc
+        self.path = Path(path)
+        self.max_calls = max_calls
+        self.session = _RecordingSession(fc.session, self)
+        self._recorded = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: IO[str] | None = gzip.open(self.path, "wt", encoding="utf-8")  # noqa: SIM115
+        self._write(
+            {
+                "version": CASSETTE_VERSION,
+                "modelname": fc.modelname,
+                "system_version": fc.system_version,
+                "services": {name: list(svc.actions) for name, svc in fc.services.items()},
+            }
+        )
+        _recordings.add(self)
+        logger.info("Recording TR-064 traffic of %s to %s", fc.address, self.path)
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        return getattr(self.fc, name)
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+
+    def record(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(entry)
+            self._recorded += 1
+            if self._recorded >= self.max_calls:
+                logger.warning("Recorded %d calls to %s, stopping", self._recorded, self.path)
+                self._close()
+            elif self._recorded % _FLUSH_EVERY == 0:
+                self._file.flush()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _call[T](self, kind: str, name: str, arguments: dict[str, Any], call: Callable[[], T]) -> T:
+        if _is_unrecorded():
+            return call()
+        entry: dict[str, Any] = {kind: name, "arguments": arguments}
+        start = time.perf_counter()
+        try:
+            result = call()
+        except (FritzConnectionException, requests.RequestException) as err:
+            entry["error"] = [type(err).__name__, str(err)]
+            entry["latency"] = time.perf_counter() - start
+            self.record(entry)
+            raise
+        entry["result"] = result
+        entry["latency"] = time.perf_counter() - start
+        self.record(entry)
+        return result
+
+    def call_action(
+        self,
+        service_name: str,
+        action_name: str,
+        *,
+        arguments: dict[str, Any] | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> dict[str, Any]:
+        merged = _merged(arguments, kwargs)
+        return self._call(
+            "action",
+            f"{service_name}/{action_name}",
+            merged,
+            lambda: self.fc.call_action(service_name, action_name, arguments=merged),
+        )
+
+    def call_http(
+        self,
+        command: str,
+        identifier: str | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> dict[str, str]:
+        return self._call(
+            "http",
+            command,
+            {"identifier": identifier, **kwargs},
+            lambda: self.fc.call_http(command, identifier, **kwargs),
+        )
+
+
+class _ReplayService:
+    def __init__(self, actions: list[str]) -> None:
+        self.actions = dict.fromkeys(actions)
+
+
+class _ReplayResponse:
+    def __init__(self, status_code: int, text: str) -> None:
+        self.status_code = status_code
+        self.text = text
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400  # noqa: PLR2004
+
+    def json(self) -> Any:  # noqa: ANN401
+        return json.loads(self.text)
+
+    def __enter__(self) -> _ReplayResponse:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        return None
+
+
+class _ReplaySession:
+    def __init__(self, replay: ReplayConnection) -> None:
+        self._replay = replay
+
+    def get(self, url: str, *_: Any, **__: Any) -> _ReplayResponse:  # noqa: ANN401
+        entry = self._replay.next_entry(_key("get", _url_path(url), None))
+        return _ReplayResponse(entry["status"], entry["text"])
+
+
+class ReplayConnection:
+    """Answers ``FritzConnection`` calls from a cassette recorded by ``RecordingConnection``.
+
+    ``speed`` scales the recorded latencies: 1.0 replays the original timing,
+    0 answers immediately.
+    """
+
+    def __init__(self, path: str | Path, address: str = "", *, speed: float = 1.0) -> None:
+        self.path = Path(path)
+        self.address = address
+        self.port = 0
+        self.speed = speed
+        self.session = _ReplaySession(self)
+        self._entries: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._positions: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+        try:
+            header = self._load()
+        except OSError as err:
+            msg = f"Cannot read cassette {self.path}: {err}"
+            raise FritzConnectionException(msg) from err
+        self.modelname = header.get("modelname")
+        self.system_version = header.get("system_version")
+        self.services = {
+            name: _ReplayService(actions) for name, actions in header["services"].items()
+        }
+
+    def _load(self) -> dict[str, Any]:
+        """Read the entries of the cassette and return its header."""
+        with gzip.open(self.path, "rt", encoding="utf-8") as cassette:
+            try:
+                header = json.loads(cassette.readline())
+            except (EOFError, zlib.error, ValueError) as err:
+                msg = f"Cassette {self.path} has no header: {err}"
+                raise FritzConnectionException(msg) from err
+            if header.get("version") != CASSETTE_VERSION:
+                msg = f"Unsupported cassette version in {self.path}: {header.get('version')}"
+                raise FritzConnectionException(msg)
+            # A cassette that was not closed (the recording process was killed)
+            # ends within a gzip block, and possibly within an entry.
+            truncated = False
+            try:
+                for line in cassette:
+                    if not line.endswith("\n"):
+                        truncated = True
+                        break
+                    self._add(json.loads(line))
+            except EOFError, zlib.error:
+                truncated = True
+        if truncated:
+            logger.warning(
+                "Cassette %s is truncated, replaying the %d calls before", self.path, len(self)
+            )
+        return header
+
+    def _add(self, entry: dict[str, Any]) -> None:
+        if "action" in entry:
+            key = _key("action", entry["action"], entry["arguments"])
+        elif "http" in entry:
+            key = _key("http", entry["http"], entry["arguments"])
+        else:
+            key = _key("get", entry["get"], None)
+        self._entries[key].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def next_entry(self, key: str) -> dict[str, Any]:
+        entries = self._entries.get(key)
+        if not entries:
+            msg = f"No recorded response in {self.path} for {key}"
+            raise FritzConnectionException(msg)
+        if _is_unrecorded():
+            return entries[self._positions.get(key, 0) % len(entries)]
+        with self._lock:
+            position = self._positions[key]
+            self._positions[key] = (position + 1) % len(entries)
+        entry = entries[position]
+        if self.speed and entry.get("latency"):
+            time.sleep(entry["latency"] * self.speed)
+        return entry
+
+    def _answer(self, key: str) -> Any:  # noqa: ANN401
+        entry = self.next_entry(key)
+        if "error" in entry:
+            name, message = entry["error"]
+            error = getattr(fritz_exceptions, name, None) or getattr(
+                requests.exceptions, name, FritzConnectionException
+            )
+            raise error(message)
+        return entry["result"]
+
+    def call_action(
+        self,
+        service_name: str,
+        action_name: str,
+        *,
+        arguments: dict[str, Any] | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> dict[str, Any]:
+        merged = _merged(arguments, kwargs)
+        return self._answer(_key("action", f"{service_name}/{action_name}", merged))
+
+    def call_http(
+        self,
+        command: str,
+        identifier: str | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> dict[str, str]:
+        return self._answer(_key("http", command, {"identifier": identifier, **kwargs}))
@@ -0,0 +1,89 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Per-device circuit breaker.
+
+A device failing in ``threshold`` consecutive collections is not contacted
+for ``cooldown`` seconds (open). The first collection after that is a trial
+(half-open): the device is collected as usual, and since a failing call marks
+the device unavailable for the rest of the collection, a dead box costs a
+single call. Success closes the breaker, failure opens it again.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable
+from enum import IntEnum
+
+logger = logging.getLogger("fritzexporter.circuit")
+
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 60.0
+
+
+class BreakerState(IntEnum):
+    """Values of the ``fritz_device_circuit_state`` metric."""
+
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+
+class CircuitBreaker:
+    """Tracks consecutive failed collections of one device. ``threshold`` 0 disables it."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        threshold: int = BREAKER_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._clock = clock
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        """Whether the device may be contacted in this collection."""
+        if self.state is BreakerState.OPEN and self._clock() - self._opened_at >= self.cooldown:
+            logger.info("Circuit of %s half-open, trying it again", self.name)
+            self.state = BreakerState.HALF_OPEN
+        return self.state is not BreakerState.OPEN
+
+    def success(self) -> None:
+        if self.state is not BreakerState.CLOSED:
+            logger.info("Circuit of %s closed", self.name)
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.threshold <= 0:
+            return
+        if self.state is BreakerState.HALF_OPEN or self.failures >= self.threshold:
+            if self.state is not BreakerState.OPEN:
+                logger.warning(
+                    "Circuit of %s open after %d failed collections, skipping it for %ss",
+                    self.name,
+                    self.failures,
+                    self.cooldown,
+                )
+            self.state = BreakerState.OPEN
+            self._opened_at = self._clock()
@@ -11,6 +11,7 @@ import yaml
 from attrs import converters, define, field, validators
 
 from fritzexporter.fritzdevice import FRITZ_MAX_PASSWORD_LENGTH
+from fritzexporter.ratelimit import RATE_BURST
 
 from .exceptions import (
     ConfigError,
@@ -34,6 +35,15 @@ def _convert_optional_int(value: int | str | None) -> int | None:
     return timeout
 
 
+def _convert_optional_rate(value: float | str | None) -> float | None:
+    if value is None:
+        return None
+    rate = float(value)
+    if rate == 0:
+        return None
+    return rate
+
+
 def _convert_optional_port(value: int | str | None) -> int | None:
     if value is None:
         return None
@@ -70,6 +80,10 @@ def _read_config_from_env() -> dict:
     listen_address = os.getenv("FRITZ_LISTEN_ADDRESS")
     exporter_port = os.getenv("FRITZ_PORT")
     log_level = os.getenv("FRITZ_LOG_LEVEL")
+    scrape_cache_ttl = os.getenv("FRITZ_SCRAPE_CACHE_TTL")
+    probe_mode = os.getenv("FRITZ_PROBE_MODE")
+    probe_cache_size = os.getenv("FRITZ_PROBE_CACHE_SIZE")
+    probe_idle_timeout = os.getenv("FRITZ_PROBE_IDLE_TIMEOUT")
 
     hostname = os.getenv("FRITZ_HOSTNAME")
     name: str = os.getenv("FRITZ_NAME", "Fritz!Box")
@@ -83,6 +97,8 @@ def _read_config_from_env() -> dict:
     use_tls = os.getenv("FRITZ_USE_TLS", "False")
     device_port = os.getenv("FRITZ_DEVICE_PORT")
     remote_access = os.getenv("FRITZ_REMOTE_ACCESS", "False")
+    rate_limit = os.getenv("FRITZ_RATE_LIMIT")
+    rate_burst = os.getenv("FRITZ_RATE_BURST", str(RATE_BURST))
 
     config: dict[Any, Any] = {}
     if exporter_port is not None:
@@ -91,6 +107,14 @@ def _read_config_from_env() -> dict:
         config["log_level"] = log_level
     if listen_address is not None:
         config["listen_address"] = listen_address
+    if scrape_cache_ttl is not None:
+        config["scrape_cache_ttl"] = scrape_cache_ttl
+    if probe_mode is not None:
+        config["probe_mode"] = probe_mode
+    if probe_cache_size is not None:
+        config["probe_cache_size"] = probe_cache_size
+    if probe_idle_timeout is not None:
+        config["probe_idle_timeout"] = probe_idle_timeout
 
     config["devices"] = []
     device = {
@@ -104,6 +128,8 @@ def _read_config_from_env() -> dict:
         "use_tls": use_tls,
         "port": device_port,
         "remote_access": remote_access,
+        "rate_limit": rate_limit,
+        "rate_burst": rate_burst,
     }
     if hostname is not None:
         device["hostname"] = hostname
@@ -135,6 +161,10 @@ class ExporterConfig:
     )
     devices: list[DeviceConfig] = field(factory=list)
     listen_address: str = field(default="127.0.0.1")
+    scrape_cache_ttl: int = field(default=0, converter=int, validator=validators.ge(0))
+    probe_mode: bool = field(default=False, converter=converters.to_bool)
+    probe_cache_size: int = field(default=100, converter=int, validator=validators.ge(1))
+    probe_idle_timeout: int = field(default=600, converter=int, validator=validators.ge(0))
 
     @devices.validator  # ty: ignore[unresolved-attribute]
     def check_devices(self, _: attrs.Attribute, value: list[DeviceConfig]) -> None:
@@ -163,6 +193,10 @@ class ExporterConfig:
             DeviceConfig.from_config(dev) for dev in config.get("devices", [])
         ]
         listen_address = config.get("listen_address", "127.0.0.1")
+        scrape_cache_ttl = config.get("scrape_cache_ttl", 0)
+        probe_mode = config.get("probe_mode", False)
+        probe_cache_size = config.get("probe_cache_size", 100)
+        probe_idle_timeout = config.get("probe_idle_timeout", 600)
 
         if listen_address in ["0.0.0.0", "::"]:  # noqa: S104
             logger.warning(
@@ -176,6 +210,10 @@ class ExporterConfig:
             log_level=log_level,
             devices=devices,
             listen_address=listen_address,
+            scrape_cache_ttl=scrape_cache_ttl,
+            probe_mode=probe_mode,
+            probe_cache_size=probe_cache_size,
+            probe_idle_timeout=probe_idle_timeout,
         )
 
 
@@ -202,6 +240,12 @@ class DeviceConfig:
         ),
     )
     remote_access: bool = field(default=False, converter=converters.to_bool)
+    rate_limit: float | None = field(
+        default=None,
+        converter=_convert_optional_rate,
+        validator=validators.optional(validators.gt(0)),
+    )
+    rate_burst: int = field(default=RATE_BURST, converter=int, validator=validators.ge(1))
 
     @password.validator  # ty: ignore[unresolved-attribute]
     def check_password(self, _: attrs.Attribute, value: str | None) -> None:
@@ -237,6 +281,8 @@ class DeviceConfig:
         use_tls = device.get("use_tls", False)
         port = device.get("port")
         remote_access = device.get("remote_access", False)
+        rate_limit = device.get("rate_limit")
+        rate_burst = device.get("rate_burst", RATE_BURST)
 
         return cls(
             hostname=hostname,
@@ -250,4 +296,6 @@ class DeviceConfig:
             use_tls=use_tls,
             port=port,
             remote_access=remote_access,
+            rate_limit=rate_limit,
+            rate_burst=rate_burst,
         )
@@ -0,0 +1,77 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Wrap correction for the 32-bit traffic counters of a device.
+
+``GetTotalBytesReceived`` and friends are ``ui4`` and start over at zero after
+4 GiB. Prometheus reads every decrease as a counter reset, so unless each wrap
+is scraped ``rate()`` under-counts. A ``CounterExtender`` remembers the last
+raw value of every counter of one device and adds 2**32 for each wrap it sees,
+which keeps the exported value monotonic as long as a counter wraps at most
+once between two scrapes.
+
+A reboot also makes the counters drop. It is told apart from a wrap by the
+device uptime going down, and then the exported values drop with the raw ones.
+A counter can also be reset on its own, e.g. when the WAN connection is
+re-established. A drop is therefore only taken as a wrap if the counter would
+have advanced by at most ``MAX_WRAP_DELTA`` across it, i.e. if the last value
+was close to 2**32 and the new one is small; any other drop is a reset as well.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Hashable
+
+logger = logging.getLogger("fritzexporter.counters")
+
+COUNTER_WRAP = 2**32
+# The largest increase between two scrapes taken for a wrap: half the counter range.
+MAX_WRAP_DELTA = 2**31
+
+
+class CounterExtender:
+    """Monotonic 64-bit values for the 32-bit counters of one device."""
+
+    def __init__(self) -> None:
+        self.uptime: int | None = None
+        self._last: dict[Hashable, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe_uptime(self, uptime: int | str) -> None:
+        """Forget all counters if ``uptime`` shows the device restarted."""
+        uptime = int(uptime)
+        with self._lock:
+            if self.uptime is not None and uptime < self.uptime:
+                logger.info(
+                    "Device restarted (uptime %d < %d), counters reset", uptime, self.uptime
+                )
+                self._last.clear()
+            self.uptime = uptime
+
+    def extend(self, key: Hashable, value: int | str) -> int:
+        """The wrap-corrected ``value`` of the counter ``key``."""
+        raw = int(value)
+        with self._lock:
+            last_raw, offset = self._last.get(key, (raw, 0))
+            if raw < last_raw:
+                # Only 32-bit counters wrap here; a 64-bit one going down was reset.
+                if last_raw < COUNTER_WRAP and COUNTER_WRAP - last_raw + raw <= MAX_WRAP_DELTA:
+                    logger.debug("Counter %s wrapped (%d -> %d)", key, last_raw, raw)
+                    offset += COUNTER_WRAP
+                else:
+                    logger.debug("Counter %s reset (%d -> %d)", key, last_raw, raw)
+                    offset = 0
+            self._last[key] = (raw, offset)
+        return raw + offset
@@ -4,9 +4,14 @@ import json
 import logging
 import os
 import sys
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
 import requests
+from attrs import define
 from fritzconnection.core.exceptions import (  # type: ignore[import]
     FritzActionError,
     FritzArgumentError,
@@ -21,6 +26,14 @@ from .fritzdevice import FritzDevice
 logger = logging.getLogger("fritzexporter.donate_data")
 
 _SANITIZED = "<SANITIZED>"
+_TIME_BUDGET_EXCEEDED = "<TIME_BUDGET_EXCEEDED>"
+
+# Concurrent calls per device and overall time budget (seconds) of a donation.
+DONATION_CONCURRENCY = 4
+DONATION_TIME_BUDGET = 300.0
+
+# zlib window bits selecting the gzip container.
+_GZIP_WBITS = 31
 
 # A sanitation entry is [service, action] (blank the whole action) or
 # [service, action, field] (blank just that field).
@@ -144,11 +157,102 @@ def safe_call_action(device: FritzDevice, service: str, action: str) -> dict[str
 
     try:
         result = device.fc.call_action(service, action)
-    except (FritzServiceError, FritzActionError, FritzArgumentError, FritzConnectionException) as e:
+    except (
+        FritzServiceError,
+        FritzActionError,
+        FritzArgumentError,
+        FritzConnectionException,
+        requests.RequestException,
+    ) as e:
         result = {"error": f"{e}"}
     return result
 
 
+def _timed_call_action(
+    device: FritzDevice, service: str, action: str
+) -> tuple[dict[str, str], float]:
+    start = time.perf_counter()
+    result = safe_call_action(device, service, action)
+    return result, time.perf_counter() - start
+
+
+def donation_actions(services: dict[str, list[str]]) -> list[tuple[str, str]]:
+    """The (service, action) pairs a donation calls: plain Get actions without arguments."""
+    return [
+        (service, action)
+        for service, actions in services.items()
+        for action in actions
+        if action.startswith("Get")
+        and not (
+            "ByIP" in action
+            or "ByIndex" in action
+            or action.startswith(("GetSpecific", "GetGeneric"))
+        )
+    ]
+
+
+def iter_action_results(
+    device: FritzDevice,
+    calls: list[tuple[str, str]],
+    *,
+    concurrency: int = DONATION_CONCURRENCY,
+    time_budget: float = DONATION_TIME_BUDGET,
+) -> Iterator[tuple[tuple[str, str], dict, float | None]]:
+    """Call ``calls`` with up to ``concurrency`` requests in flight.
+
+    Yields ``(call, result, latency)`` as the calls complete. Calls not
+    completed within ``time_budget`` seconds are yielded last, as errors
+    without latency.
+    """
+    deadline = time.monotonic() + time_budget
+    pending = set(calls)
+    progress_step = max(1, len(calls) // 10)
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="donation")
+    futures = {executor.submit(_timed_call_action, device, *call): call for call in calls}
+    try:
+        for done, future in enumerate(
+            as_completed(futures, timeout=max(0.0, deadline - time.monotonic())), start=1
+        ):
+            call = futures[future]
+            result, latency = future.result()
+            pending.discard(call)
+            yield call, result, latency
+            if done % progress_step == 0 or done == len(calls):
+                logger.info("Collected %d of %d actions from %s", done, len(calls), device.host)
+    except TimeoutError:
+        logger.warning(
+            "Time budget of %ss exceeded, %d of %d actions from %s not collected",
+            time_budget,
+            len(pending),
+            len(calls),
+            device.host,
+        )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    for call in calls:
+        if call in pending:
+            yield call, {"error": _TIME_BUDGET_EXCEEDED}, None
+
+
+def collect_action_results(
+    device: FritzDevice,
+    calls: list[tuple[str, str]],
+    *,
+    concurrency: int = DONATION_CONCURRENCY,
+    time_budget: float = DONATION_TIME_BUDGET,
+) -> tuple[dict[tuple[str, str], dict], dict[tuple[str, str], float]]:
+    """Results of ``iter_action_results`` in the order of ``calls``, and the latencies."""
+    results: dict[tuple[str, str], dict] = {}
+    latencies: dict[tuple[str, str], float] = {}
+    for call, result, latency in iter_action_results(
+        device, calls, concurrency=concurrency, time_budget=time_budget
+    ):
+        results[call] = result
+        if latency is not None:
+            latencies[call] = latency
+    return {call: results[call] for call in calls}, latencies
+
+
 def _apply_builtin_sanitization(res: dict[tuple[str, str], dict]) -> None:
     for svc_action, svc_data in res.items():
         if svc_action in _SANITIZATION_BLACKLIST:
@@ -187,49 +291,145 @@ def jsonify_action_results(ar: dict[tuple[str, str], dict]) -> dict[str, dict]:
     return out
 
 
-def upload_data(basedata: dict[str, Any]) -> None:
-    donation_url = os.getenv("FRITZ_DONATION_URL", "https://fritz.dreker.de/data/donate")
-    headers = {"Content-Type": "application/json"}
-    resp = requests.post(donation_url, data=json.dumps(basedata), headers=headers, timeout=10)
+def jsonify_latencies(latencies: dict[tuple[str, str], float]) -> dict[str, dict[str, float]]:
+    out: dict[str, dict[str, float]] = {}
+    for (service, action), seconds in latencies.items():
+        out.setdefault(service, {})[action] = round(seconds, 3)
+    return out
+
 
+def _log_upload_response(resp: requests.Response, model: str) -> None:
     if resp.status_code == requests.codes.ok:
         donation_id = resp.json().get("donation_id")
         if donation_id:
             logger.info(
                 "Data donation for device %s registered under id %s",
-                basedata["fritzdevice"]["model"],
+                model,
                 donation_id,
             )
         else:
             logger.warning(
                 "Data donation for device  %s did not return a donation id.",
-                basedata["fritzdevice"]["model"],
+                model,
             )
     else:
         resp.raise_for_status()
 
 
+def _donation_url(url: str | None = None) -> str:
+    return url or os.getenv("FRITZ_DONATION_URL", "https://fritz.dreker.de/data/donate")
+
+
+def upload_data(basedata: dict[str, Any], url: str | None = None) -> None:
+    headers = {"Content-Type": "application/json"}
+    resp = requests.post(_donation_url(url), data=json.dumps(basedata), headers=headers, timeout=10)
+    _log_upload_response(resp, basedata["fritzdevice"]["model"])
+
+
+def donation_records(
+    device: FritzDevice,
+    *,
+    sanitation: list[list] | None = None,
+    concurrency: int = DONATION_CONCURRENCY,
+    time_budget: float = DONATION_TIME_BUDGET,
+) -> Iterator[dict[str, Any]]:
+    """The donation as NDJSON records: a header, then one record per action as it completes.
+
+    Each action record is sanitized on its own, so nothing is held back until
+    the collection is finished.
+    """
+    services = {s: list(device.fc.services[s].actions) for s in device.fc.services}
+    yield {
+        "exporter_version": __version__,
+        "model": device.model,
+        "os_version": get_sw_version(device),
+        "services": services,
+        "detected_capabilities": list(device.capabilities.capabilities),
+    }
+    for (service, action), result, latency in iter_action_results(
+        device, donation_actions(services), concurrency=concurrency, time_budget=time_budget
+    ):
+        sanitized = sanitize_results({(service, action): result}, sanitation or [])
+        yield {
+            "service": service,
+            "action": action,
+            "result": jsonify_action_results(sanitized)[service][action],
+            "latency": None if latency is None else round(latency, 3),
+        }
+
+
+def _ndjson(records: Iterable[dict[str, Any]]) -> Iterator[bytes]:
+    for record in records:
+        yield f"{json.dumps(record)}\n".encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip-compress a stream of chunks, yielding compressed data as it becomes available."""
+    compressor = zlib.compressobj(wbits=_GZIP_WBITS)
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+def upload_stream(model: str, records: Iterable[dict[str, Any]], url: str) -> None:
+    """Upload ``records`` to ``url`` as gzip-compressed NDJSON with chunked transfer encoding."""
+    headers = {"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+    resp = requests.post(url, data=gzip_chunks(_ndjson(records)), headers=headers, timeout=10)
+    _log_upload_response(resp, model)
+
+
+@define(frozen=True)
+class DonationOptions:
+    """How a donation is collected: calls in flight, time budget (seconds), NDJSON output.
+
+    ``url`` is a donation server given explicitly. Only such a server gets a
+    streamed upload; the project's server takes a single JSON document.
+    """
+
+    concurrency: int = DONATION_CONCURRENCY
+    time_budget: float = DONATION_TIME_BUDGET
+    stream: bool = False
+    url: str | None = None
+
+
 def donate_data(
-    device: FritzDevice, *, upload: bool = False, sanitation: list[list] | None = None
+    device: FritzDevice,
+    *,
+    upload: bool = False,
+    sanitation: list[list] | None = None,
+    options: DonationOptions | None = None,
 ) -> None:
     if not sanitation:
         sanitation = []
+    options = options or DonationOptions()
+    if options.stream and upload and options.url is None:
+        logger.info("The default donation server takes no NDJSON, uploading a JSON document")
+    elif options.stream:
+        records = donation_records(
+            device,
+            sanitation=sanitation,
+            concurrency=options.concurrency,
+            time_budget=options.time_budget,
+        )
+        if upload and options.url is not None:
+            upload_stream(device.model, records, options.url)
+        else:
+            for line in _ndjson(records):
+                sys.stdout.write(line.decode())
+                sys.stdout.flush()
+        return
+
     services = {s: list(device.fc.services[s].actions) for s in device.fc.services}
     model = device.model
     sw_version = get_sw_version(device)
 
     detected_capabilities = list(device.capabilities.capabilities)
 
-    action_results = {}
-    for service, actions in services.items():
-        for action in actions:
-            if action.startswith("Get") and not (
-                "ByIP" in action
-                or "ByIndex" in action
-                or action.startswith(("GetSpecific", "GetGeneric"))
-            ):
-                res = safe_call_action(device, service, action)
-                action_results[(service, action)] = res
+    calls = donation_actions(services)
+    action_results, latencies = collect_action_results(
+        device, calls, concurrency=options.concurrency, time_budget=options.time_budget
+    )
 
     basedata = {
         "exporter_version": __version__,
@@ -239,11 +439,12 @@ def donate_data(
             "services": services,
             "detected_capabilities": detected_capabilities,
             "action_results": jsonify_action_results(sanitize_results(action_results, sanitation)),
+            "action_latency": jsonify_latencies(latencies),
         },
     }
 
     if upload:
-        upload_data(basedata)
+        upload_data(basedata, options.url)
     else:
         sys.stdout.write(
             f"---------------- Donation data for device {model} ---------------------\n"
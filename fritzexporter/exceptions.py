@@ -2,6 +2,10 @@ class FritzDeviceHasNoCapabilitiesError(Exception):
     pass
 
 
+class UnknownProbeTargetError(Exception):
+    pass
+
+
 # Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
@@ -0,0 +1,370 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""HTTP exposition of the collector with a cached, pre-compressed body per snapshot.
+
+``prometheus_client.start_http_server`` serializes (and, for gzip-accepting
+scrapers, compresses) the whole registry on every request. With several
+Prometheus replicas scraping the same exporter that work is repeated for
+identical data. Here every completed collection is a *snapshot generation*:
+its text body is rendered once, compressed at most once, and served to every
+scrape that arrives while it is still fresh (``max_age``) or while it is
+being produced (concurrent scrapes are coalesced onto one collection).
+
+As with ``prometheus_client``, the format follows the ``Accept`` header
+(Prometheus asks for OpenMetrics) and ``name[]`` restricts the output to the
+given series. Each format of a snapshot is rendered at most once as well;
+restricted output is rendered per request from the collected families.
+
+Rendering itself is incremental (``FamilyRenderer``): most families are
+identical from one scrape to the next, or differ only in sample values, so
+their text and per-series label prefixes are kept between generations.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import socket
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs, urlsplit
+
+from attrs import define, field
+from prometheus_client import generate_latest
+from prometheus_client.core import REGISTRY, Metric
+from prometheus_client.exposition import choose_encoder
+from prometheus_client.utils import floatToGoString
+
+from fritzexporter.exceptions import UnknownProbeTargetError
+
+if TYPE_CHECKING:
+    from prometheus_client.registry import Collector, CollectorRegistry
+    from prometheus_client.samples import Sample
+
+    from fritzexporter.probe import ProbeManager
+
+logger = logging.getLogger("fritzexporter.exposition")
+
+# Content type of the text format, which scrapers get unless they ask for another.
+TEXT_CONTENT_TYPE = choose_encoder("")[1]
+METRICS_PATHS = ("/", "/metrics")
+
+
+class _Families:
+    """Collector yielding the given metric families, to render them with prometheus_client."""
+
+    def __init__(self, metrics: Iterable[Metric]) -> None:
+        self.metrics = metrics
+
+    def collect(self) -> Iterator[Metric]:
+        yield from self.metrics
+
+
+def restricted(metrics: Iterable[Metric], names: Iterable[str]) -> list[Metric]:
+    """The samples of ``metrics`` named in ``names``, like ``restricted_registry``."""
+    wanted = set(names)
+    families = []
+    for metric in metrics:
+        samples = [sample for sample in metric.samples if sample.name in wanted]
+        if samples:
+            family = _empty_copy(metric)
+            family.samples = samples
+            families.append(family)
+    return families
+
+
+@define
+class Snapshot:
+    """One collection: its families, the text body and the lazily rendered other formats.
+
+    Without ``families`` (rendered elsewhere, e.g. probes) only the text body is served.
+    """
+
+    generation: int
+    created: float
+    body: bytes
+    families: list[Metric] | None = None
+    _bodies: dict[str, bytes] = field(factory=dict, init=False)
+    _gzipped: dict[str, bytes] = field(factory=dict, init=False)
+    _lock: threading.Lock = field(factory=threading.Lock, init=False)
+
+    def encoded(self, accept: str = "") -> tuple[str, bytes]:
+        """Content type and body for a scrape with the ``Accept`` header ``accept``."""
+        encoder, content_type = choose_encoder(accept)
+        if encoder is generate_latest or self.families is None:
+            return TEXT_CONTENT_TYPE, self.body
+        with self._lock:
+            if content_type not in self._bodies:
+                self._bodies[content_type] = encoder(_Families(self.families))  # ty: ignore[invalid-argument-type]
+            return content_type, self._bodies[content_type]
+
+    def gzipped(self, accept: str = "") -> bytes:
+        """The compressed body of ``encoded(accept)``."""
+        content_type, body = self.encoded(accept)
+        with self._lock:
+            if content_type not in self._gzipped:
+                self._gzipped[content_type] = gzip.compress(body)
+            return self._gzipped[content_type]
+
+
+_SeriesKey = tuple[str, tuple[tuple[str, str], ...]]
+
+# Samples prometheus_client moves into separate families at the end of the output.
+_OPENMETRICS_SUFFIXES = ("_created", "_gsum", "_gcount")
+
+
+def _render_family(metric: Metric) -> str:
+    return generate_latest(_Families([metric])).decode("utf-8")  # ty: ignore[invalid-argument-type]
+
+
+def _empty_copy(metric: Metric) -> Metric:
+    return Metric(metric.name, metric.documentation, metric.type, metric.unit)
+
+
+@define
+class _RenderedFamily:
+    metric: Metric
+    header: str
+    text: str
+    prefixes: dict[_SeriesKey, str]
+
+
+class FamilyRenderer:
+    """Text exposition renderer that only re-renders families which changed.
+
+    A family equal to the one seen in the previous render (same help, type and
+    samples) reuses its text verbatim. For a changed family the header and the
+    ``name{labels}`` prefix of every series seen before are reused, so only
+    the sample values are formatted. Escaping and formatting of new series and
+    of anything unusual (timestamps, exemplars, OpenMetrics-only samples) is
+    left to ``prometheus_client`` itself, so the output is byte-identical to
+    ``generate_latest``.
+    """
+
+    def __init__(self) -> None:
+        self._families: dict[str, _RenderedFamily] = {}
+
+    def render(self, registry: Collector) -> bytes:
+        families: dict[str, _RenderedFamily] = {}
+        output: list[str] = []
+        for metric in registry.collect():
+            cached = self._families.get(metric.name)
+            if cached is None or cached.metric != metric:
+                cached = self._render(metric, cached)
+            families[metric.name] = cached
+            output.append(cached.text)
+        # Families that disappeared (e.g. a device removed) are dropped here.
+        self._families = families
+        return "".join(output).encode("utf-8")
+
+    def _render(self, metric: Metric, previous: _RenderedFamily | None) -> _RenderedFamily:
+        if not self._is_simple(metric):
+            return _RenderedFamily(metric, "", _render_family(metric), {})
+
+        if (
+            previous is not None
+            and previous.metric.documentation == metric.documentation
+            and previous.metric.type == metric.type
+        ):
+            header = previous.header
+            known = previous.prefixes
+        else:
+            header = _render_family(_empty_copy(metric))
+            known = {}
+
+        prefixes: dict[_SeriesKey, str] = {}
+        lines = [header]
+        for sample in metric.samples:
+            key = (sample.name, tuple(sample.labels.items()))
+            prefix = known.get(key) or prefixes.get(key)
+            if prefix is None:
+                prefix = self._series_prefix(metric, sample, header)
+            prefixes[key] = prefix
+            lines.append(f"{prefix} {floatToGoString(sample.value)}\n")
+        return _RenderedFamily(metric, header, "".join(lines), prefixes)
+
+    @staticmethod
+    def _is_simple(metric: Metric) -> bool:
+        return all(
+            sample.timestamp is None
+            and sample.exemplar is None
+            and not sample.name.endswith(_OPENMETRICS_SUFFIXES)
+            for sample in metric.samples
+        )
+
+    @staticmethod
+    def _series_prefix(metric: Metric, sample: Sample, header: str) -> str:
+        single = _empty_copy(metric)
+        single.add_sample(sample.name, sample.labels, 0)
+        line = _render_family(single).removeprefix(header)
+        return line[: line.rindex(" ")]
+
+
+class ExpositionCache:
+    """Renders the registry at most once per snapshot generation.
+
+    A snapshot younger than ``max_age`` seconds is served as-is. A scrape that
+    arrives while another one is rendering waits for that render and shares its
+    result instead of starting a second collection. With ``max_age=0`` only the
+    coalescing applies, so sequential scrapes always see fresh data.
+    """
+
+    def __init__(self, registry: CollectorRegistry = REGISTRY, *, max_age: float = 0.0) -> None:
+        self.registry = registry
+        self.max_age = max_age
+        self._snapshot: Snapshot | None = None
+        self._generation = 0
+        self._rendering = False
+        self._cond = threading.Condition()
+        self._renderer = FamilyRenderer()
+
+    def _fresh(self, now: float) -> Snapshot | None:
+        snapshot = self._snapshot
+        if snapshot is not None and now - snapshot.created < self.max_age:
+            return snapshot
+        return None
+
+    def snapshot(self) -> Snapshot:
+        with self._cond:
+            fresh = self._fresh(time.monotonic())
+            if fresh is not None:
+                return fresh
+            if self._rendering:
+                waiting_for = self._generation + 1
+                while self._rendering:
+                    self._cond.wait()
+                if self._snapshot is not None and self._snapshot.generation >= waiting_for:
+                    return self._snapshot
+                # The render we waited for failed - fall through and try ourselves.
+            self._rendering = True
+
+        try:
+            families = list(self.registry.collect())
+            body = self._renderer.render(_Families(families))  # ty: ignore[invalid-argument-type]
+        except BaseException:
+            with self._cond:
+                self._rendering = False
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._generation += 1
+            self._snapshot = Snapshot(self._generation, time.monotonic(), body, families)
+            self._rendering = False
+            self._cond.notify_all()
+            return self._snapshot
+
+
+def gzip_accepted(accept_encoding: str) -> bool:
+    return any(
+        encoding.split(";")[0].strip().lower() == "gzip" for encoding in accept_encoding.split(",")
+    )
+
+
+class ExpositionHandler(BaseHTTPRequestHandler):
+    cache: ExpositionCache
+    probes: ProbeManager | None = None
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/probe" and self.probes is not None:
+            self._probe(query.get("target", [""])[0])
+            return
+        if url.path not in METRICS_PATHS:
+            self.send_error(404)
+            return
+        try:
+            snapshot = self.cache.snapshot()
+        except Exception:
+            logger.exception("Failed to render metrics exposition")
+            self.send_error(500, "error generating metric output")
+            return
+        names = query.get("name[]")
+        if names and snapshot.families is not None:
+            # Rare enough not to be cached.
+            families = restricted(snapshot.families, names)
+            body = generate_latest(_Families(families))  # ty: ignore[invalid-argument-type]
+            snapshot = Snapshot(snapshot.generation, snapshot.created, body, families)
+        self._send_snapshot(snapshot)
+
+    def _probe(self, target: str) -> None:
+        if not target:
+            self.send_error(400, "target parameter is missing")
+            return
+        try:
+            body = self.probes.probe(target)  # ty: ignore[possibly-missing-attribute]
+        except UnknownProbeTargetError:
+            self.send_error(404, "unknown target")
+            return
+        except Exception:
+            logger.exception("Failed to probe %s", target)
+            self.send_error(500, "error generating metric output")
+            return
+        self._send_snapshot(Snapshot(0, time.monotonic(), body))
+
+    def _send_snapshot(self, snapshot: Snapshot) -> None:
+        accept = self.headers.get("Accept", "")
+        content_type, body = snapshot.encoded(accept)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Vary", "Accept, Accept-Encoding")
+        if gzip_accepted(self.headers.get("Accept-Encoding", "")):
+            body = snapshot.gzipped(accept)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Do not log every scrape to stderr."""
+
+
+class ExpositionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def _address_family(address: str, port: int) -> socket.AddressFamily:
+    infos = socket.getaddrinfo(address, port, type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE)
+    return infos[0][0]
+
+
+def start_http_server(
+    port: int,
+    addr: str = "0.0.0.0",  # noqa: S104
+    registry: CollectorRegistry = REGISTRY,
+    *,
+    max_age: float = 0.0,
+    probes: ProbeManager | None = None,
+) -> tuple[ExpositionServer, threading.Thread]:
+    """Serve ``registry`` on ``addr:port`` from a daemon thread, like prometheus_client does.
+
+    With ``probes`` set, ``/probe?target=<name>`` additionally serves single devices.
+    """
+    cache = ExpositionCache(registry, max_age=max_age)
+    handler = type(
+        "BoundExpositionHandler", (ExpositionHandler,), {"cache": cache, "probes": probes}
+    )
+    server_cls = type(
+        "BoundExpositionServer",
+        (ExpositionServer,),
+        {"address_family": _address_family(addr, port)},
+    )
+    httpd = server_cls((addr, port), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd, thread
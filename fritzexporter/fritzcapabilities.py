@@ -4,7 +4,7 @@ import logging
 from abc import ABC, abstractmethod
 from collections.abc import Generator, ItemsView, Iterator
 from contextlib import suppress
-from typing import TYPE_CHECKING, Any, ClassVar, cast
+from typing import TYPE_CHECKING, Any, ClassVar, NamedTuple, cast
 
 from fritzconnection.core.exceptions import (  # type: ignore[import]
     FritzActionError,
@@ -29,16 +29,19 @@ logger = logging.getLogger("fritzexporter.fritzcapability")
 
 class FritzCapability(ABC):
     subclasses: ClassVar[list[type[FritzCapability]]] = []
+    # Attributes set by check_capability, kept in the capability cache.
+    detected: ClassVar[tuple[str, ...]] = ("present",)
 
     def __init__(self) -> None:
         self.present: bool = False
         self.requirements: list[tuple[str, str]] = []
         self.metrics: dict[str, CounterMetricFamily | GaugeMetricFamily] = {}
 
-    def __init_subclass__(cls, **kwargs: dict[str, Any]) -> None:
+    def __init_subclass__(cls, *, register: bool = True, **kwargs: dict[str, Any]) -> None:
         super().__init_subclass__(**kwargs)
-        logger.debug("Capability subclass %s registered", cls.__name__)
-        FritzCapability.subclasses.append(cls)
+        if register:
+            logger.debug("Capability subclass %s registered", cls.__name__)
+            FritzCapability.subclasses.append(cls)
 
     def check_capability(self, device: FritzDevice) -> None:
         self.present = all(
@@ -72,6 +75,18 @@ class FritzCapability(ABC):
                     )
                     self.present = False
 
+    def state(self) -> dict[str, Any]:
+        """The outcome of ``check_capability``, for the capability cache."""
+        return {name: getattr(self, name) for name in self.detected}
+
+    def restore(self, state: dict[str, Any]) -> bool:
+        """Take over a cached ``state``; False if it lacks something."""
+        if any(name not in state for name in self.detected):
+            return False
+        for name in self.detected:
+            setattr(self, name, state[name])
+        return True
+
     def get_metrics(
         self, devices: list[FritzDevice], name: str
     ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
@@ -137,6 +152,141 @@ class FritzCapabilities:
         for c in self.capabilities:
             self.capabilities[c].check_capability(device)
 
+    def states(self) -> dict[str, dict[str, Any]]:
+        return {name: capa.state() for name, capa in self.capabilities.items()}
+
+    def restore(self, states: dict[str, dict[str, Any]]) -> bool:
+        """Set all capabilities from ``states``; False if one is missing there."""
+        return all(
+            name in states and capa.restore(states[name])
+            for name, capa in self.capabilities.items()
+        )
+
+
+class MetricSpec(NamedTuple):
+    """A metric family of a ``SpecCapability``; ``labels`` follow serial and friendly_name."""
+
+    key: str
+    name: str
+    documentation: str
+    labels: tuple[str, ...] = ()
+    unit: str = ""
+    counter: bool = False
+
+
+class SampleSpec(NamedTuple):
+    """One sample of ``metric``, taken from ``field`` of the result of ``service``/``action``.
+
+    ``labels`` are the values of the metric's own labels, where ``{NewSomething}``
+    is read from the result. The value is divided by ``divisor``; with ``match``
+    it is 1 if the field equals ``match`` and 0 otherwise, with ``wrap`` it is
+    corrected for 32-bit wraps (see ``CounterExtender``). Without a ``field``
+    the sample is an info sample of value 1.
+    """
+
+    service: str
+    action: str
+    field: str | None
+    metric: str
+    labels: tuple[str, ...] = ()
+    divisor: int = 1
+    match: str | None = None
+    wrap: bool = False
+
+
+# A SampleSpec prepared for filling: labels as (from_result, text) pairs.
+class _PlannedSample(NamedTuple):
+    metric: str
+    request: tuple[str, str]
+    field: str | None
+    labels: tuple[tuple[bool, str], ...]
+    divisor: int
+    match: str | None
+    wrap: bool
+
+
+def _plan(spec: SampleSpec) -> _PlannedSample:
+    labels = tuple(
+        (True, label[1:-1]) if label.startswith("{") else (False, label) for label in spec.labels
+    )
+    return _PlannedSample(
+        spec.metric,
+        (spec.service, spec.action),
+        spec.field,
+        labels,
+        spec.divisor,
+        spec.match,
+        spec.wrap,
+    )
+
+
+class SpecCapability(FritzCapability, register=False):
+    """A capability described by data instead of code.
+
+    Subclasses list their metric families in ``metric_specs`` and where each
+    sample comes from in ``sample_specs``. The samples are turned into a plan
+    once per class. Each scrape then calls every action once (through
+    ``FritzDevice.call_action_once``, shared with the other capabilities) and
+    fills all samples in one loop.
+    """
+
+    metric_specs: ClassVar[tuple[MetricSpec, ...]] = ()
+    sample_specs: ClassVar[tuple[SampleSpec, ...]] = ()
+    _samples: ClassVar[tuple[_PlannedSample, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs: dict[str, Any]) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._samples = tuple(_plan(spec) for spec in cls.sample_specs)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.requirements.extend(
+            dict.fromkeys((spec.service, spec.action) for spec in self.sample_specs)
+        )
+
+    def create_metrics(self) -> None:
+        for spec in self.metric_specs:
+            family = CounterMetricFamily if spec.counter else GaugeMetricFamily
+            self.metrics[spec.key] = family(
+                spec.name,
+                spec.documentation,
+                labels=["serial", "friendly_name", *spec.labels],
+                unit=spec.unit,
+            )
+
+    def _generate_metric_values(self, device: FritzDevice) -> None:
+        results = {request: device.call_action_once(*request) for request in self.requirements}
+        metrics, counters = self.metrics, device.counters
+        for metric, request, field, labels, divisor, match, wrap in self._samples:
+            result = results[request]
+            if field is None:
+                value = 1
+            elif match is not None:
+                value = 1 if result[field] == match else 0
+            elif wrap:
+                value = counters.extend((request[0], field), result[field])
+            else:
+                value = result[field]
+            if divisor != 1:
+                value /= divisor
+            metrics[metric].add_metric(
+                [
+                    device.serial,
+                    device.friendly_name,
+                    *(
+                        str(result.get(text) or "") if from_result else text
+                        for from_result, text in labels
+                    ),
+                ],
+                value,
+            )
+
+    def _get_metric_values(
+        self,
+    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        for spec in self.metric_specs:
+            yield self.metrics[spec.key]
+
 
 class DeviceInfo(FritzCapability):
     def __init__(self) -> None:
@@ -153,6 +303,7 @@ class DeviceInfo(FritzCapability):
 
     def _generate_metric_values(self, device: FritzDevice) -> None:
         info_result = device.fc.call_action("DeviceInfo1", "GetInfo")
+        device.counters.observe_uptime(info_result["NewUpTime"])
         self.metrics["uptime"].add_metric(
             [
                 info_result["NewModelName"],
@@ -167,30 +318,15 @@ class DeviceInfo(FritzCapability):
         yield self.metrics["uptime"]
 
 
-class HostNumberOfEntries(FritzCapability):
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("Hosts1", "GetHostNumberOfEntries"))
-
-    def create_metrics(self) -> None:
-        self.metrics["numhosts"] = GaugeMetricFamily(
-            "fritz_known_devices",
-            "Number of devices in hosts table",
-            labels=["serial", "friendly_name"],
-            unit="count",
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        num_hosts_result = device.fc.call_action("Hosts1", "GetHostNumberOfEntries")
-        self.metrics["numhosts"].add_metric(
-            [device.serial, device.friendly_name],
-            num_hosts_result["NewHostNumberOfEntries"],
-        )
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["numhosts"]
+class HostNumberOfEntries(SpecCapability):
+    metric_specs = (
+        MetricSpec(
+            "numhosts", "fritz_known_devices", "Number of devices in hosts table", unit="count"
+        ),
+    )
+    sample_specs = (
+        SampleSpec("Hosts1", "GetHostNumberOfEntries", "NewHostNumberOfEntries", "numhosts"),
+    )
 
 
 class UserInterface(FritzCapability):
@@ -223,534 +359,426 @@ class UserInterface(FritzCapability):
         yield self.metrics["update"]
 
 
-class LanInterfaceConfig(FritzCapability):
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("LANEthernetInterfaceConfig1", "GetInfo"))
-
-    def create_metrics(self) -> None:
-        self.metrics["lanenable"] = GaugeMetricFamily(
-            "fritz_lan_status_enabled",
-            "LAN Interface enabled",
-            labels=["serial", "friendly_name"],
-        )
-        self.metrics["lanstatus"] = GaugeMetricFamily(
-            "fritz_lan_status",
-            "LAN Interface status",
-            labels=["serial", "friendly_name"],
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        lanstatus_result = device.fc.call_action("LANEthernetInterfaceConfig1", "GetInfo")
-        self.metrics["lanenable"].add_metric(
-            [device.serial, device.friendly_name], lanstatus_result["NewEnable"]
-        )
+class LanInterfaceConfig(SpecCapability):
+    metric_specs = (
+        MetricSpec("lanenable", "fritz_lan_status_enabled", "LAN Interface enabled"),
+        MetricSpec("lanstatus", "fritz_lan_status", "LAN Interface status"),
+    )
+    sample_specs = (
+        SampleSpec("LANEthernetInterfaceConfig1", "GetInfo", "NewEnable", "lanenable"),
+        SampleSpec("LANEthernetInterfaceConfig1", "GetInfo", "NewStatus", "lanstatus", match="Up"),
+    )
 
-        lanstatus = 1 if lanstatus_result["NewStatus"] == "Up" else 0
-        self.metrics["lanstatus"].add_metric([device.serial, device.friendly_name], lanstatus)
 
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["lanenable"]
-        yield self.metrics["lanstatus"]
-
-
-class LanInterfaceConfigStatistics(FritzCapability):
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("LANEthernetInterfaceConfig1", "GetStatistics"))
-
-    def create_metrics(self) -> None:
-        self.metrics["lanbytes"] = CounterMetricFamily(
+class LanInterfaceConfigStatistics(SpecCapability):
+    metric_specs = (
+        MetricSpec(
+            "lanbytes",
             "fritz_lan_data",
             "LAN bytes received",
-            labels=["serial", "friendly_name", "direction"],
+            ("direction",),
             unit="bytes",
-        )
-        self.metrics["lanpackets"] = CounterMetricFamily(
+            counter=True,
+        ),
+        MetricSpec(
+            "lanpackets",
             "fritz_lan_packet",
             "LAN packets transmitted",
-            labels=["serial", "friendly_name", "direction"],
+            ("direction",),
             unit="count",
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        lanstats_result = device.fc.call_action("LANEthernetInterfaceConfig1", "GetStatistics")
-        self.metrics["lanbytes"].add_metric(
-            [device.serial, device.friendly_name, "rx"],
-            lanstats_result["NewBytesReceived"],
-        )
-        self.metrics["lanbytes"].add_metric(
-            [device.serial, device.friendly_name, "tx"], lanstats_result["NewBytesSent"]
-        )
-        self.metrics["lanpackets"].add_metric(
-            [device.serial, device.friendly_name, "rx"],
-            lanstats_result["NewPacketsReceived"],
-        )
-        self.metrics["lanpackets"].add_metric(
-            [device.serial, device.friendly_name, "tx"],
-            lanstats_result["NewPacketsSent"],
-        )
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["lanbytes"]
-        yield self.metrics["lanpackets"]
-
-
-class WanDSLInterfaceConfig(FritzCapability):
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("WANDSLInterfaceConfig1", "GetInfo"))
-
-    def create_metrics(self) -> None:
-        self.metrics["enable"] = GaugeMetricFamily(
-            "fritz_dsl_status_enabled",
-            "DSL enabled",
-            labels=["serial", "friendly_name"],
-        )
-        self.metrics["datarate"] = GaugeMetricFamily(
-            "fritz_dsl_datarate",
-            "DSL datarate in kbps",
-            labels=["serial", "friendly_name", "direction", "type"],
-            unit="kbps",
-        )
-        self.metrics["noisemargin"] = GaugeMetricFamily(
-            "fritz_dsl_noise_margin",
-            "Noise Margin in dB",
-            labels=["serial", "friendly_name", "direction"],
-            unit="dB",
-        )
-        self.metrics["attenuation"] = GaugeMetricFamily(
-            "fritz_dsl_attenuation",
-            "Line attenuation in dB",
-            labels=["serial", "friendly_name", "direction"],
-            unit="dB",
-        )
-        self.metrics["status"] = GaugeMetricFamily(
-            "fritz_dsl_status", "DSL status", labels=["serial", "friendly_name"]
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        fritz_dslinfo_result = device.fc.call_action("WANDSLInterfaceConfig1", "GetInfo")
-        self.metrics["enable"].add_metric(
-            [device.serial, device.friendly_name], fritz_dslinfo_result["NewEnable"]
-        )
-
-        dslstatus = 1 if fritz_dslinfo_result["NewStatus"] == "Up" else 0
-        self.metrics["status"].add_metric([device.serial, device.friendly_name], dslstatus)
-        self.metrics["datarate"].add_metric(
-            [device.serial, device.friendly_name, "tx", "curr"],
-            fritz_dslinfo_result["NewUpstreamCurrRate"],
-        )
-        self.metrics["datarate"].add_metric(
-            [device.serial, device.friendly_name, "rx", "curr"],
-            fritz_dslinfo_result["NewDownstreamCurrRate"],
-        )
-        self.metrics["datarate"].add_metric(
-            [device.serial, device.friendly_name, "tx", "max"],
-            fritz_dslinfo_result["NewUpstreamMaxRate"],
-        )
-        self.metrics["datarate"].add_metric(
-            [device.serial, device.friendly_name, "rx", "max"],
-            fritz_dslinfo_result["NewDownstreamMaxRate"],
-        )
-        self.metrics["noisemargin"].add_metric(
-            [device.serial, device.friendly_name, "tx"],
-            fritz_dslinfo_result["NewUpstreamNoiseMargin"] / 10,
-        )
-        self.metrics["noisemargin"].add_metric(
-            [device.serial, device.friendly_name, "rx"],
-            fritz_dslinfo_result["NewDownstreamNoiseMargin"] / 10,
-        )
-        self.metrics["attenuation"].add_metric(
-            [device.serial, device.friendly_name, "tx"],
-            fritz_dslinfo_result["NewUpstreamAttenuation"] / 10,
-        )
-        self.metrics["attenuation"].add_metric(
-            [device.serial, device.friendly_name, "rx"],
-            fritz_dslinfo_result["NewDownstreamAttenuation"] / 10,
-        )
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["enable"]
-        yield self.metrics["status"]
-        yield self.metrics["datarate"]
-        yield self.metrics["noisemargin"]
-        yield self.metrics["attenuation"]
-
-
-class WanDSLInterfaceConfigAVM(FritzCapability):
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("WANDSLInterfaceConfig1", "X_AVM-DE_GetDSLInfo"))
-
-    def create_metrics(self) -> None:
-        self.metrics["fec"] = CounterMetricFamily(
+            counter=True,
+        ),
+    )
+    sample_specs = tuple(
+        SampleSpec(
+            "LANEthernetInterfaceConfig1",
+            "GetStatistics",
+            f"New{kind}{field}",
+            metric,
+            (direction,),
+            wrap=True,
+        )
+        for metric, kind in (("lanbytes", "Bytes"), ("lanpackets", "Packets"))
+        for direction, field in (("rx", "Received"), ("tx", "Sent"))
+    )
+
+
+class WanDSLInterfaceConfig(SpecCapability):
+    metric_specs = (
+        MetricSpec("enable", "fritz_dsl_status_enabled", "DSL enabled"),
+        MetricSpec("status", "fritz_dsl_status", "DSL status"),
+        MetricSpec(
+            "datarate", "fritz_dsl_datarate", "DSL datarate in kbps", ("direction", "type"), "kbps"
+        ),
+        MetricSpec(
+            "noisemargin", "fritz_dsl_noise_margin", "Noise Margin in dB", ("direction",), "dB"
+        ),
+        MetricSpec(
+            "attenuation", "fritz_dsl_attenuation", "Line attenuation in dB", ("direction",), "dB"
+        ),
+    )
+    sample_specs = (
+        SampleSpec("WANDSLInterfaceConfig1", "GetInfo", "NewEnable", "enable"),
+        SampleSpec("WANDSLInterfaceConfig1", "GetInfo", "NewStatus", "status", match="Up"),
+        SampleSpec(
+            "WANDSLInterfaceConfig1", "GetInfo", "NewUpstreamCurrRate", "datarate", ("tx", "curr")
+        ),
+        SampleSpec(
+            "WANDSLInterfaceConfig1", "GetInfo", "NewDownstreamCurrRate", "datarate", ("rx", "curr")
+        ),
+        SampleSpec(
+            "WANDSLInterfaceConfig1", "GetInfo", "NewUpstreamMaxRate", "datarate", ("tx", "max")
+        ),
+        SampleSpec(
+            "WANDSLInterfaceConfig1", "GetInfo", "NewDownstreamMaxRate", "datarate", ("rx", "max")
+        ),
+        # Noise margin and attenuation are reported in tenths of a dB.
+        SampleSpec(
+            "WANDSLInterfaceConfig1",
+            "GetInfo",
+            "NewUpstreamNoiseMargin",
+            "noisemargin",
+            ("tx",),
+            divisor=10,
+        ),
+        SampleSpec(
+            "WANDSLInterfaceConfig1",
+            "GetInfo",
+            "NewDownstreamNoiseMargin",
+            "noisemargin",
+            ("rx",),
+            divisor=10,
+        ),
+        SampleSpec(
+            "WANDSLInterfaceConfig1",
+            "GetInfo",
+            "NewUpstreamAttenuation",
+            "attenuation",
+            ("tx",),
+            divisor=10,
+        ),
+        SampleSpec(
+            "WANDSLInterfaceConfig1",
+            "GetInfo",
+            "NewDownstreamAttenuation",
+            "attenuation",
+            ("rx",),
+            divisor=10,
+        ),
+    )
+
+
+class WanDSLInterfaceConfigAVM(SpecCapability):
+    metric_specs = (
+        MetricSpec(
+            "fec",
             "fritz_dsl_fec_errors_count",
             "Number of Forward Error Correction Errors",
-            labels=["serial", "friendly_name"],
-        )
-        self.metrics["crc"] = CounterMetricFamily(
-            "fritz_dsl_crc_errors_count",
-            "Number of CRC Errors",
-            labels=["serial", "friendly_name"],
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        fritz_avm_dsl_result = device.fc.call_action(
-            "WANDSLInterfaceConfig1", "X_AVM-DE_GetDSLInfo"
-        )
-        self.metrics["fec"].add_metric(
-            [device.serial, device.friendly_name], fritz_avm_dsl_result["NewFECErrors"]
-        )
-        self.metrics["crc"].add_metric(
-            [device.serial, device.friendly_name], fritz_avm_dsl_result["NewCRCErrors"]
-        )
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["fec"]
-        yield self.metrics["crc"]
+            counter=True,
+        ),
+        MetricSpec("crc", "fritz_dsl_crc_errors_count", "Number of CRC Errors", counter=True),
+    )
+    sample_specs = (
+        SampleSpec("WANDSLInterfaceConfig1", "X_AVM-DE_GetDSLInfo", "NewFECErrors", "fec"),
+        SampleSpec("WANDSLInterfaceConfig1", "X_AVM-DE_GetDSLInfo", "NewCRCErrors", "crc"),
+    )
 
 
-class WanFiberInterfaceConfig(FritzCapability):
+class WanFiberInterfaceConfig(SpecCapability):
     """Optical / SFP metrics from X_AVM-DE_WANFiber.GetInfo."""
 
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("X_AVM-DE_WANFiber1", "GetInfo"))
-
-    def create_metrics(self) -> None:
-        self.metrics["optical_signal"] = GaugeMetricFamily(
+    metric_specs = (
+        MetricSpec(
+            "optical_signal",
             "fritz_fiber_optical_signal_level",
             "Current received optical signal level",
-            labels=["serial", "friendly_name"],
             unit="dBm",
-        )
-        self.metrics["optical_threshold"] = GaugeMetricFamily(
+        ),
+        MetricSpec(
+            "optical_threshold",
             "fritz_fiber_optical_threshold",
             "Optical receive power threshold",
-            labels=["serial", "friendly_name", "bound"],
-            unit="dBm",
-        )
-        self.metrics["transmit_optical"] = GaugeMetricFamily(
+            ("bound",),
+            "dBm",
+        ),
+        MetricSpec(
+            "transmit_optical",
             "fritz_fiber_transmit_optical_level",
             "Current transmit optical power level",
-            labels=["serial", "friendly_name"],
             unit="dBm",
-        )
-        self.metrics["transmit_threshold"] = GaugeMetricFamily(
+        ),
+        MetricSpec(
+            "transmit_threshold",
             "fritz_fiber_transmit_power_threshold",
             "Transmit optical power threshold",
-            labels=["serial", "friendly_name", "bound"],
-            unit="dBm",
-        )
-        self.metrics["tx_wavelength"] = GaugeMetricFamily(
-            "fritz_fiber_tx_wavelength",
-            "Fibre TX wavelength",
-            labels=["serial", "friendly_name"],
-            unit="nm",
-        )
-        self.metrics["info"] = GaugeMetricFamily(
+            ("bound",),
+            "dBm",
+        ),
+        MetricSpec("tx_wavelength", "fritz_fiber_tx_wavelength", "Fibre TX wavelength", unit="nm"),
+        MetricSpec(
+            "info",
             "fritz_fiber_info",
             "Fibre / SFP module information (always 1 if present)",
-            labels=[
-                "serial",
-                "friendly_name",
-                "fiber_mode",
-                "sfp_vendor",
-                "sfp_part_number",
-                "sfp_serial_number",
-                "sfp_type",
-            ],
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        result = device.fc.call_action("X_AVM-DE_WANFiber1", "GetInfo")
-        labels = [device.serial, device.friendly_name]
-
-        self.metrics["optical_signal"].add_metric(labels, result["NewOpticalSignalLevel"] / 1000)
-        self.metrics["optical_threshold"].add_metric(
-            [*labels, "lower"], result["NewLowerOpticalThreshold"] / 1000
-        )
-        self.metrics["optical_threshold"].add_metric(
-            [*labels, "upper"], result["NewUpperOpticalThreshold"] / 1000
-        )
-        self.metrics["transmit_optical"].add_metric(
-            labels, result["NewTransmitOpticalLevel"] / 1000
-        )
-        self.metrics["transmit_threshold"].add_metric(
-            [*labels, "lower"], result["NewLowerTransmitPowerThreshold"] / 1000
-        )
-        self.metrics["transmit_threshold"].add_metric(
-            [*labels, "upper"], result["NewUpperTransmitPowerThreshold"] / 1000
-        )
-        self.metrics["tx_wavelength"].add_metric(labels, result["NewTXWaveLength"])
-        self.metrics["info"].add_metric(
-            [
-                *labels,
-                str(result.get("NewFiberMode") or ""),
-                str(result.get("NewSFPVendor") or ""),
-                str(result.get("NewSFPPartNumber") or ""),
-                str(result.get("NewSFPSerialNumber") or ""),
-                str(result.get("NewSFPType") or ""),
-            ],
-            1,
-        )
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["optical_signal"]
-        yield self.metrics["optical_threshold"]
-        yield self.metrics["transmit_optical"]
-        yield self.metrics["transmit_threshold"]
-        yield self.metrics["tx_wavelength"]
-        yield self.metrics["info"]
+            ("fiber_mode", "sfp_vendor", "sfp_part_number", "sfp_serial_number", "sfp_type"),
+        ),
+    )
+    # Optical levels are reported in thousandths of a dBm.
+    sample_specs = (
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetInfo",
+            "NewOpticalSignalLevel",
+            "optical_signal",
+            divisor=1000,
+        ),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetInfo",
+            "NewLowerOpticalThreshold",
+            "optical_threshold",
+            ("lower",),
+            divisor=1000,
+        ),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetInfo",
+            "NewUpperOpticalThreshold",
+            "optical_threshold",
+            ("upper",),
+            divisor=1000,
+        ),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetInfo",
+            "NewTransmitOpticalLevel",
+            "transmit_optical",
+            divisor=1000,
+        ),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetInfo",
+            "NewLowerTransmitPowerThreshold",
+            "transmit_threshold",
+            ("lower",),
+            divisor=1000,
+        ),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetInfo",
+            "NewUpperTransmitPowerThreshold",
+            "transmit_threshold",
+            ("upper",),
+            divisor=1000,
+        ),
+        SampleSpec("X_AVM-DE_WANFiber1", "GetInfo", "NewTXWaveLength", "tx_wavelength"),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetInfo",
+            None,
+            "info",
+            (
+                "{NewFiberMode}",
+                "{NewSFPVendor}",
+                "{NewSFPPartNumber}",
+                "{NewSFPSerialNumber}",
+                "{NewSFPType}",
+            ),
+        ),
+    )
 
 
-class WanFiberGPONInfo(FritzCapability):
+class WanFiberGPONInfo(SpecCapability):
     """GPON identity metrics from X_AVM-DE_WANFiber.GetInfoGPON."""
 
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("X_AVM-DE_WANFiber1", "GetInfoGPON"))
-
-    def create_metrics(self) -> None:
-        self.metrics["gpon_info"] = GaugeMetricFamily(
+    metric_specs = (
+        MetricSpec(
+            "gpon_info",
             "fritz_fiber_gpon_info",
             "GPON identity information (always 1 if present)",
-            labels=["serial", "friendly_name", "gpon_serial", "pon_id", "uni_type"],
-        )
-        self.metrics["onu_id"] = GaugeMetricFamily(
-            "fritz_fiber_gpon_onu_id",
-            "GPON ONU identifier",
-            labels=["serial", "friendly_name"],
-        )
-        self.metrics["gem_ports"] = GaugeMetricFamily(
-            "fritz_fiber_gpon_gem_port_count",
-            "Number of GPON GEM ports",
-            labels=["serial", "friendly_name"],
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        result = device.fc.call_action("X_AVM-DE_WANFiber1", "GetInfoGPON")
-        labels = [device.serial, device.friendly_name]
-        self.metrics["gpon_info"].add_metric(
-            [
-                *labels,
-                str(result.get("NewGPONSerial") or ""),
-                str(result.get("NewPONId") or ""),
-                str(result.get("NewUNIType") or ""),
-            ],
-            1,
-        )
-        self.metrics["onu_id"].add_metric(labels, result["NewONUId"])
-        self.metrics["gem_ports"].add_metric(labels, result["NewGEMPortCount"])
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["gpon_info"]
-        yield self.metrics["onu_id"]
-        yield self.metrics["gem_ports"]
-
-
-class WanFiberStatistics(FritzCapability):
+            ("gpon_serial", "pon_id", "uni_type"),
+        ),
+        MetricSpec("onu_id", "fritz_fiber_gpon_onu_id", "GPON ONU identifier"),
+        MetricSpec("gem_ports", "fritz_fiber_gpon_gem_port_count", "Number of GPON GEM ports"),
+    )
+    sample_specs = (
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetInfoGPON",
+            None,
+            "gpon_info",
+            ("{NewGPONSerial}", "{NewPONId}", "{NewUNIType}"),
+        ),
+        SampleSpec("X_AVM-DE_WANFiber1", "GetInfoGPON", "NewONUId", "onu_id"),
+        SampleSpec("X_AVM-DE_WANFiber1", "GetInfoGPON", "NewGEMPortCount", "gem_ports"),
+    )
+
+
+class WanFiberStatistics(SpecCapability):
     """Fibre link statistics from X_AVM-DE_WANFiber.GetStatistics."""
 
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("X_AVM-DE_WANFiber1", "GetStatistics"))
-
-    def create_metrics(self) -> None:
-        self.metrics["data"] = CounterMetricFamily(
+    metric_specs = (
+        MetricSpec(
+            "data",
             "fritz_fiber_data",
             "Fibre data transferred",
-            labels=["serial", "friendly_name", "direction"],
-            unit="bytes",
-        )
-        self.metrics["packets"] = CounterMetricFamily(
+            ("direction",),
+            "bytes",
+            counter=True,
+        ),
+        MetricSpec(
+            "packets",
             "fritz_fiber_data_packets",
             "Fibre packets transferred",
-            labels=["serial", "friendly_name", "direction"],
-        )
-        self.metrics["packet_errors"] = CounterMetricFamily(
+            ("direction",),
+            counter=True,
+        ),
+        MetricSpec(
+            "packet_errors",
             "fritz_fiber_packet_errors",
             "Fibre packet errors",
-            labels=["serial", "friendly_name", "direction"],
-        )
-        self.metrics["multicast"] = CounterMetricFamily(
-            "fritz_fiber_packets_multicast",
-            "Fibre multicast packets",
-            labels=["serial", "friendly_name"],
-        )
-        self.metrics["connection_rate"] = GaugeMetricFamily(
+            ("direction",),
+            counter=True,
+        ),
+        MetricSpec(
+            "multicast", "fritz_fiber_packets_multicast", "Fibre multicast packets", counter=True
+        ),
+        MetricSpec(
+            "connection_rate",
             "fritz_fiber_connection_rate",
             "Fibre connection rate as reported by the device (see docs for unit quirks)",
-            labels=["serial", "friendly_name", "direction"],
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        result = device.fc.call_action("X_AVM-DE_WANFiber1", "GetStatistics")
-        labels = [device.serial, device.friendly_name]
-
-        self.metrics["data"].add_metric([*labels, "tx"], result["NewBytesSent"])
-        self.metrics["data"].add_metric([*labels, "rx"], result["NewBytesReceived"])
-        self.metrics["packets"].add_metric([*labels, "tx"], result["NewPacketsSent"])
-        self.metrics["packets"].add_metric([*labels, "rx"], result["NewPacketsReceived"])
-        self.metrics["packet_errors"].add_metric([*labels, "tx"], result["NewPacketErrorsSent"])
-        self.metrics["packet_errors"].add_metric([*labels, "rx"], result["NewPacketErrorsReceived"])
-        self.metrics["multicast"].add_metric(labels, result["NewPacketsMulticast"])
-        self.metrics["connection_rate"].add_metric([*labels, "rx"], result["NewConnectionRateDown"])
-        self.metrics["connection_rate"].add_metric([*labels, "tx"], result["NewConnectionRateUp"])
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["data"]
-        yield self.metrics["packets"]
-        yield self.metrics["packet_errors"]
-        yield self.metrics["multicast"]
-        yield self.metrics["connection_rate"]
-
-
-class WanPPPConnectionStatus(FritzCapability):
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("WANPPPConnection1", "GetStatusInfo"))
-
-    def create_metrics(self) -> None:
-        self.metrics["uptime"] = CounterMetricFamily(
+            ("direction",),
+        ),
+    )
+    sample_specs = (
+        SampleSpec("X_AVM-DE_WANFiber1", "GetStatistics", "NewBytesSent", "data", ("tx",)),
+        SampleSpec("X_AVM-DE_WANFiber1", "GetStatistics", "NewBytesReceived", "data", ("rx",)),
+        SampleSpec("X_AVM-DE_WANFiber1", "GetStatistics", "NewPacketsSent", "packets", ("tx",)),
+        SampleSpec("X_AVM-DE_WANFiber1", "GetStatistics", "NewPacketsReceived", "packets", ("rx",)),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1", "GetStatistics", "NewPacketErrorsSent", "packet_errors", ("tx",)
+        ),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetStatistics",
+            "NewPacketErrorsReceived",
+            "packet_errors",
+            ("rx",),
+        ),
+        SampleSpec("X_AVM-DE_WANFiber1", "GetStatistics", "NewPacketsMulticast", "multicast"),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetStatistics",
+            "NewConnectionRateDown",
+            "connection_rate",
+            ("rx",),
+        ),
+        SampleSpec(
+            "X_AVM-DE_WANFiber1",
+            "GetStatistics",
+            "NewConnectionRateUp",
+            "connection_rate",
+            ("tx",),
+        ),
+    )
+
+
+class WanPPPConnectionStatus(SpecCapability):
+    metric_specs = (
+        MetricSpec(
+            "uptime",
             "fritz_ppp_connection_uptime",
             "PPP connection uptime",
-            labels=["serial", "friendly_name"],
             unit="seconds",
-        )
-        self.metrics["connected"] = GaugeMetricFamily(
-            "fritz_ppp_connection_state",
-            "PPP connection state",
-            labels=["serial", "friendly_name", "last_error"],
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        fritz_pppstatus_result = device.fc.call_action("WANPPPConnection1", "GetStatusInfo")
-        pppconnected = 1 if fritz_pppstatus_result["NewConnectionStatus"] == "Connected" else 0
-        self.metrics["uptime"].add_metric(
-            [device.serial, device.friendly_name], fritz_pppstatus_result["NewUptime"]
-        )
-        self.metrics["connected"].add_metric(
-            [
-                device.serial,
-                device.friendly_name,
-                fritz_pppstatus_result["NewLastConnectionError"],
-            ],
-            pppconnected,
-        )
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["uptime"]
-        yield self.metrics["connected"]
-
-
-class WanCommonInterfaceConfig(FritzCapability):
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("WANCommonInterfaceConfig1", "GetCommonLinkProperties"))
-
-    def create_metrics(self) -> None:
-        self.metrics["wanconfig"] = GaugeMetricFamily(
+            counter=True,
+        ),
+        MetricSpec(
+            "connected", "fritz_ppp_connection_state", "PPP connection state", ("last_error",)
+        ),
+    )
+    sample_specs = (
+        SampleSpec("WANPPPConnection1", "GetStatusInfo", "NewUptime", "uptime"),
+        SampleSpec(
+            "WANPPPConnection1",
+            "GetStatusInfo",
+            "NewConnectionStatus",
+            "connected",
+            ("{NewLastConnectionError}",),
+            match="Connected",
+        ),
+    )
+
+
+class WanCommonInterfaceConfig(SpecCapability):
+    metric_specs = (
+        MetricSpec(
+            "wanconfig",
             "fritz_wan_max_bitrate",
             "max bitrate at the physical layer",
-            labels=["serial", "friendly_name", "wantype", "direction"],
-            unit="bps",
-        )
-        self.metrics["wanlinkstatus"] = GaugeMetricFamily(
+            ("wantype", "direction"),
+            "bps",
+        ),
+        MetricSpec(
+            "wanlinkstatus",
             "fritz_wan_phys_link_status",
             "link status at the physical layer",
-            labels=["serial", "friendly_name", "wantype"],
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        wanstatus_result = device.fc.call_action(
-            "WANCommonInterfaceConfig1", "GetCommonLinkProperties"
-        )
-        self.metrics["wanconfig"].add_metric(
-            [
-                device.serial,
-                device.friendly_name,
-                wanstatus_result["NewWANAccessType"],
-                "tx",
-            ],
-            wanstatus_result["NewLayer1UpstreamMaxBitRate"],
-        )
-        self.metrics["wanconfig"].add_metric(
-            [
-                device.serial,
-                device.friendly_name,
-                wanstatus_result["NewWANAccessType"],
-                "rx",
-            ],
-            wanstatus_result["NewLayer1DownstreamMaxBitRate"],
-        )
-        l1_status = wanstatus_result["NewPhysicalLinkStatus"]
-        wanstatus = 1 if l1_status == "Up" else 0
-        self.metrics["wanlinkstatus"].add_metric(
-            [device.serial, device.friendly_name, wanstatus_result["NewWANAccessType"]],
-            wanstatus,
-        )
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["wanconfig"]
-        yield self.metrics["wanlinkstatus"]
-
-
-class WanCommonInterfaceDataBytes(FritzCapability):
-    WAN_COMMON_INTERFACE_SERVICE: str = "WANCommonInterfaceConfig1"
-
-    def __init__(self) -> None:
-        super().__init__()
-        self.requirements.append(("WANCommonInterfaceConfig1", "GetTotalBytesReceived"))
-        self.requirements.append(("WANCommonInterfaceConfig1", "GetTotalBytesSent"))
-
-    def create_metrics(self) -> None:
-        self.metrics["wanbytes"] = CounterMetricFamily(
+            ("wantype",),
+        ),
+    )
+    sample_specs = (
+        SampleSpec(
+            "WANCommonInterfaceConfig1",
+            "GetCommonLinkProperties",
+            "NewLayer1UpstreamMaxBitRate",
+            "wanconfig",
+            ("{NewWANAccessType}", "tx"),
+        ),
+        SampleSpec(
+            "WANCommonInterfaceConfig1",
+            "GetCommonLinkProperties",
+            "NewLayer1DownstreamMaxBitRate",
+            "wanconfig",
+            ("{NewWANAccessType}", "rx"),
+        ),
+        SampleSpec(
+            "WANCommonInterfaceConfig1",
+            "GetCommonLinkProperties",
+            "NewPhysicalLinkStatus",
+            "wanlinkstatus",
+            ("{NewWANAccessType}",),
+            match="Up",
+        ),
+    )
+
+
+class WanCommonInterfaceDataBytes(SpecCapability):
+    metric_specs = (
+        MetricSpec(
+            "wanbytes",
             "fritz_wan_data",
             "WAN data in bytes",
-            labels=["serial", "friendly_name", "direction"],
-            unit="bytes",
-        )
-
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        fritz_wan_result = device.fc.call_action(
-            self.WAN_COMMON_INTERFACE_SERVICE, "GetTotalBytesReceived"
-        )
-        wan_bytes_rx = fritz_wan_result["NewTotalBytesReceived"]
-        fritz_wan_result = device.fc.call_action(
-            self.WAN_COMMON_INTERFACE_SERVICE, "GetTotalBytesSent"
-        )
-        wan_bytes_tx = fritz_wan_result["NewTotalBytesSent"]
-        self.metrics["wanbytes"].add_metric(
-            [device.serial, device.friendly_name, "tx"], wan_bytes_tx
-        )
-        self.metrics["wanbytes"].add_metric(
-            [device.serial, device.friendly_name, "rx"], wan_bytes_rx
-        )
-
-    def _get_metric_values(
-        self,
-    ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["wanbytes"]
+            ("direction",),
+            "bytes",
+            counter=True,
+        ),
+    )
+    sample_specs = (
+        SampleSpec(
+            "WANCommonInterfaceConfig1",
+            "GetTotalBytesReceived",
+            "NewTotalBytesReceived",
+            "wanbytes",
+            ("rx",),
+            wrap=True,
+        ),
+        SampleSpec(
+            "WANCommonInterfaceConfig1",
+            "GetTotalBytesSent",
+            "NewTotalBytesSent",
+            "wanbytes",
+            ("tx",),
+            wrap=True,
+        ),
+    )
 
 
 class WanCommonInterfaceByteRate(FritzCapability):
@@ -808,46 +836,119 @@ class WanCommonInterfaceByteRate(FritzCapability):
         yield self.metrics["layer1max"]
 
 
-class WanCommonInterfaceDataPackets(FritzCapability):
-    WAN_COMMON_INTERFACE_SERVICE: str = "WANCommonInterfaceConfig1"
+class WanOnlineMonitor(FritzCapability):
+    """Peak and average WAN data rate from the online monitor history.
+
+    ``X_AVM-DE_GetOnlineMonitor`` returns the data rates the box itself sampled
+    in the recent past (20 values, 5 seconds apart, on current FRITZ!OS) as
+    comma-separated lists, so one call per scrape shows bursts shorter than the
+    scrape interval. Only the first sync group (the internet connection) is read.
+    """
+
+    SERVICE: str = "WANCommonInterfaceConfig1"
+    ACTION: str = "X_AVM-DE_GetOnlineMonitor"
+    DIRECTIONS: ClassVar[dict[str, str]] = {"rx": "Newds_current_bps", "tx": "Newus_current_bps"}
 
     def __init__(self) -> None:
         super().__init__()
-        self.requirements.append(("WANCommonInterfaceConfig1", "GetTotalPacketsReceived"))
-        self.requirements.append(("WANCommonInterfaceConfig1", "GetTotalPacketsSent"))
+        self.requirements.append((self.SERVICE, self.ACTION))
 
-    def create_metrics(self) -> None:
-        self.metrics["wanpackets"] = CounterMetricFamily(
-            "fritz_wan_data_packets",
-            "WAN data in packets",
-            labels=["serial", "friendly_name", "direction"],
-            unit="count",
-        )
+    def _monitor_data(self, device: FritzDevice) -> dict[str, Any]:
+        return device.fc.call_action(self.SERVICE, self.ACTION, arguments={"NewSyncGroupIndex": 0})
 
-    def _generate_metric_values(self, device: FritzDevice) -> None:
-        fritz_wan_result = device.fc.call_action(
-            self.WAN_COMMON_INTERFACE_SERVICE, "GetTotalPacketsReceived"
+    def check_capability(self, device: FritzDevice) -> None:
+        # The generic check calls the action without the sync group index it needs.
+        self.present = (
+            self.SERVICE in device.fc.services
+            and self.ACTION in device.fc.services[self.SERVICE].actions
         )
-        wan_packets_rx = fritz_wan_result["NewTotalPacketsReceived"]
-        fritz_wan_result = device.fc.call_action(
-            self.WAN_COMMON_INTERFACE_SERVICE, "GetTotalPacketsSent"
+        if self.present:
+            try:
+                self._monitor_data(device)
+            except (
+                FritzServiceError,
+                FritzActionError,
+                FritzInternalError,
+                FritzArgumentError,
+                FritzConnectionException,
+            ) as e:
+                logger.warning(
+                    "disabling metrics at service %s, action %s - fritzconnection.call_action "
+                    "returned %s",
+                    self.SERVICE,
+                    self.ACTION,
+                    str(e),
+                )
+                self.present = False
+        logger.debug(
+            "Capability %s set to %s on device %s", type(self).__name__, self.present, device.host
         )
-        wan_packets_tx = fritz_wan_result["NewTotalPacketsSent"]
-        self.metrics["wanpackets"].add_metric(
-            [device.serial, device.friendly_name, "tx"], wan_packets_tx
+
+    def create_metrics(self) -> None:
+        self.metrics["peak"] = GaugeMetricFamily(
+            "fritz_wan_monitor_datarate_peak",
+            "Peak WAN data rate in bytes/s within the online monitor history",
+            labels=["serial", "friendly_name", "direction"],
+            unit="bytes",
         )
-        self.metrics["wanpackets"].add_metric(
-            [device.serial, device.friendly_name, "rx"], wan_packets_rx
+        self.metrics["average"] = GaugeMetricFamily(
+            "fritz_wan_monitor_datarate_average",
+            "Average WAN data rate in bytes/s within the online monitor history",
+            labels=["serial", "friendly_name", "direction"],
+            unit="bytes",
         )
 
+    def _generate_metric_values(self, device: FritzDevice) -> None:
+        monitor_data = self._monitor_data(device)
+        for direction, key in self.DIRECTIONS.items():
+            rates = [int(value) for value in str(monitor_data.get(key, "")).split(",") if value]
+            if not rates:
+                continue
+            labels = [device.serial, device.friendly_name, direction]
+            self.metrics["peak"].add_metric(labels, max(rates))
+            self.metrics["average"].add_metric(labels, sum(rates) / len(rates))
+
     def _get_metric_values(
         self,
     ) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
-        yield self.metrics["wanpackets"]
+        yield self.metrics["peak"]
+        yield self.metrics["average"]
+
+
+class WanCommonInterfaceDataPackets(SpecCapability):
+    metric_specs = (
+        MetricSpec(
+            "wanpackets",
+            "fritz_wan_data_packets",
+            "WAN data in packets",
+            ("direction",),
+            "count",
+            counter=True,
+        ),
+    )
+    sample_specs = (
+        SampleSpec(
+            "WANCommonInterfaceConfig1",
+            "GetTotalPacketsReceived",
+            "NewTotalPacketsReceived",
+            "wanpackets",
+            ("rx",),
+            wrap=True,
+        ),
+        SampleSpec(
+            "WANCommonInterfaceConfig1",
+            "GetTotalPacketsSent",
+            "NewTotalPacketsSent",
+            "wanpackets",
+            ("tx",),
+            wrap=True,
+        ),
+    )
 
 
 class WlanConfigurationInfo(FritzCapability):
     WIFI_NAMES: ClassVar[list[str]] = ["2.4GHz", "5GHz", "Guest", "WLAN4"]
+    detected: ClassVar[tuple[str, ...]] = ("present", "wifi_present")
 
     def __init__(self) -> None:
         super().__init__()
@@ -1029,7 +1130,10 @@ class WlanConfigurationInfo(FritzCapability):
                         str(index + 1),
                         self.WIFI_NAMES[index],
                     ],
-                    packet_stats_result["NewTotalPacketsReceived"],
+                    device.counters.extend(
+                        (index, "NewTotalPacketsReceived"),
+                        packet_stats_result["NewTotalPacketsReceived"],
+                    ),
                 )
                 self.metrics["wlanpackets"].add_metric(
                     [
@@ -1042,7 +1146,10 @@ class WlanConfigurationInfo(FritzCapability):
                         str(index + 1),
                         self.WIFI_NAMES[index],
                     ],
-                    packet_stats_result["NewTotalPacketsSent"],
+                    device.counters.extend(
+                        (index, "NewTotalPacketsSent"),
+                        packet_stats_result["NewTotalPacketsSent"],
+                    ),
                 )
 
     def _get_metric_values(
@@ -1064,6 +1171,7 @@ class WlanAssociatedDevices(FritzCapability):
     """
 
     WIFI_NAMES: ClassVar[list[str]] = ["2.4GHz", "5GHz", "Guest", "WLAN4"]
+    detected: ClassVar[tuple[str, ...]] = ("present", "wifi_present")
 
     def __init__(self) -> None:
         super().__init__()
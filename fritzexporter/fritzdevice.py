@@ -1,8 +1,9 @@
 import collections
 import logging
+import math
 import sys
 import threading
-from typing import NamedTuple
+from typing import Any, NamedTuple
 
 from fritzconnection import FritzConnection  # type: ignore[import]
 from fritzconnection.core.exceptions import (  # type: ignore[import]
@@ -14,9 +15,28 @@ from fritzconnection.core.exceptions import (  # type: ignore[import]
 from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 from prometheus_client.registry import Collector
 
+from fritzexporter import __version__
+from fritzexporter.capability_cache import (
+    capability_cache_path,
+    load_capabilities,
+    save_capabilities,
+)
+from fritzexporter.circuit import BREAKER_COOLDOWN, BREAKER_THRESHOLD, CircuitBreaker
+from fritzexporter.counters import CounterExtender
 from fritzexporter.exceptions import FritzDeviceHasNoCapabilitiesError
 from fritzexporter.fritzcapabilities import FritzCapabilities
-from fritzexporter.tr064_remote import ConnectionOptions, create_fritz_connection
+from fritzexporter.ratelimit import RateLimitedConnection, TokenBucket
+from fritzexporter.resolver import HostResolver
+from fritzexporter.sampler import QUANTILES, WAN_SAMPLE_WINDOW, ThroughputSampler
+from fritzexporter.timeouts import AdaptiveTimeout, TimeoutOptions, percentile
+from fritzexporter.tr064_remote import (
+    PREFLIGHT_TIMEOUT,
+    ConnectionOptions,
+    create_fritz_connection,
+    tr064_endpoint,
+    unreachable_endpoints,
+)
+from fritzexporter.transport import KEEP_ALIVE_INTERVAL, KeepAlive, transport_of, uses_tls
 
 logger = logging.getLogger("fritzexporter.fritzdevice")
 
@@ -39,6 +59,16 @@ class OfflineDevice(NamedTuple):
     use_tls: bool = False
     port: int | None = None
     remote_access: bool = False
+    connection: ConnectionOptions | None = None
+
+    @property
+    def options(self) -> ConnectionOptions:
+        return self.connection or ConnectionOptions(
+            connection_timeout=self.connection_timeout,
+            use_tls=self.use_tls,
+            port=self.port,
+            remote_access=self.remote_access,
+        )
 
 
 class FritzDevice:
@@ -55,10 +85,17 @@ class FritzDevice:
         self.host: str = creds.host
         self.serial: str = "n/a"
         self.model: str = "n/a"
+        self.software_version: str = "n/a"
         self.friendly_name: str = name
         self.host_info: bool = host_info
         self.wifi_client_info: bool = wifi_client_info
         self.available: bool = True
+        self.connection_timeout: int | None = connection.connection_timeout
+        self.endpoint: tuple[str, int] | None = tr064_endpoint(creds.host, connection)
+        self.resolver: HostResolver | None = connection.resolver
+        self.counters = CounterExtender()
+        # Results of argument-less actions in the current collection, see call_action_once.
+        self.action_results: dict[tuple[str, str], dict[str, Any]] = {}
 
         if len(creds.password) > FRITZ_MAX_PASSWORD_LENGTH:
             logger.warning(
@@ -77,10 +114,15 @@ class FritzDevice:
             logger.exception("unable to connect to %s.", creds.host)
             raise
 
+        self.rate_limit: TokenBucket | None = (
+            self.fc.bucket if isinstance(self.fc, RateLimitedConnection) else None
+        )
+        self.transport = transport_of(self.fc)
+
         self.get_device_info()
 
         logger.info("Connection to %s successful, reading capabilities", creds.host)
-        self.capabilities = FritzCapabilities(self)
+        self.capabilities = self._detect_capabilities(connection.cache_dir)
 
         logger.info(
             "Reading capabilities for %s, got serial %s, model name %s completed",
@@ -99,11 +141,21 @@ class FritzDevice:
             logger.critical("Device %s has no detected capabilities. Exiting.", creds.host)
             raise FritzDeviceHasNoCapabilitiesError
 
+    def call_action_once(self, service: str, action: str) -> dict[str, Any]:
+        """``fc.call_action(service, action)``, called only once per collection."""
+        result = self.action_results.get((service, action))
+        if result is None:
+            result = self.action_results[service, action] = self.fc.call_action(service, action)
+        return result
+
     def get_device_info(self) -> None:
         try:
             device_info: dict[str, str] = self.fc.call_action("DeviceInfo1", "GetInfo")
             self.serial = device_info["NewSerialNumber"]
             self.model = device_info["NewModelName"]
+            self.software_version = device_info.get("NewSoftwareVersion", "n/a")
+            if "NewUpTime" in device_info:
+                self.counters.observe_uptime(device_info["NewUpTime"])
 
         except FritzServiceError, FritzActionError:
             logger.exception(
@@ -118,6 +170,27 @@ class FritzDevice:
             )
             raise
 
+    def _detect_capabilities(self, cache_dir: str | None) -> FritzCapabilities:
+        """Detect the capabilities, or take them from the capability cache in ``cache_dir``."""
+        if cache_dir is None:
+            return FritzCapabilities(self)
+        path = capability_cache_path(cache_dir, self.host)
+        key = {
+            "serial": self.serial,
+            "software_version": self.software_version,
+            "exporter_version": __version__,
+            "host_info": self.host_info,
+            "wifi_client_info": self.wifi_client_info,
+        }
+        capabilities = FritzCapabilities()
+        states = load_capabilities(path, key)
+        if states is not None and capabilities.restore(states):
+            logger.info("Capabilities of %s read from %s", self.host, path)
+            return capabilities
+        capabilities.check_present(self)
+        save_capabilities(path, key, capabilities.states())
+        return capabilities
+
     def get_connection_mode(self) -> GaugeMetricFamily | None:
         """
         Returns a metric to detect whether device is in DSL, fibre, mobile fallback or offline mode.
@@ -161,19 +234,74 @@ class FritzDevice:
 
 
 class FritzCollector(Collector):
-    def __init__(self) -> None:
+    """Collects all registered devices.
+
+    Devices that were unavailable in the previous collection and offline devices
+    are probed with a TCP connect first (``preflight_timeout`` seconds, 0 to
+    disable); those not accepting connections are skipped for the collection
+    instead of waiting out their connection timeout. A device failing in
+    ``breaker_threshold`` consecutive collections is not contacted for
+    ``breaker_cooldown`` seconds (see ``fritzexporter.circuit``). The SOAP
+    timeout of every device follows its observed latency (see
+    ``fritzexporter.timeouts``). With ``keep_alive`` the connections of the
+    TLS devices are kept open between collections (see ``fritzexporter.transport``).
+    """
+
+    def __init__(
+        self,
+        *,
+        preflight_timeout: float = PREFLIGHT_TIMEOUT,
+        breaker_threshold: int = BREAKER_THRESHOLD,
+        breaker_cooldown: float = BREAKER_COOLDOWN,
+        timeouts: TimeoutOptions | None = None,
+    ) -> None:
+        self.preflight_timeout = preflight_timeout
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.timeouts = timeouts or TimeoutOptions()
         self.devices: list[FritzDevice] = []
         self.offline_devices: list[OfflineDevice] = []
         # One shared instance per capability class, used to drive the scrape loop and
         # accumulate metrics across all devices. Distinct from per-device capabilities,
         # which are the authority on what each device actually supports.
         self._capability_instances: FritzCapabilities = FritzCapabilities()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._timeouts: dict[str, AdaptiveTimeout] = {}
+        self._samplers: dict[str, ThroughputSampler] = {}
+        self._wan_sampling: tuple[float, float] | None = None
+        self._keepalives: dict[str, KeepAlive] = {}
+        self._keepalive_interval: float | None = None
         self._collect_lock = threading.RLock()
 
     def register(self, fritzdev: FritzDevice) -> None:
-        self.devices.append(fritzdev)
+        with self._collect_lock:
+            self.devices.append(fritzdev)
         logger.debug("registered device %s (%s) to collector", fritzdev.host, fritzdev.model)
 
+    def unregister(self, host: str) -> None:
+        """Remove the (online or offline) device with hostname ``host`` from the collector."""
+        with self._collect_lock:
+            self.devices = [dev for dev in self.devices if dev.host != host]
+            self.offline_devices = [dev for dev in self.offline_devices if dev.creds.host != host]
+            self._breakers.pop(host, None)
+            self._timeouts.pop(host, None)
+            self._stop_threads(host)
+        logger.debug("unregistered device %s from collector", host)
+
+    def close(self) -> None:
+        """Stop the background threads (WAN samplers, keep-alives) of all devices."""
+        with self._collect_lock:
+            for host in {*self._samplers, *self._keepalives}:
+                self._stop_threads(host)
+
+    def _stop_threads(self, host: str) -> None:
+        sampler = self._samplers.pop(host, None)
+        if sampler is not None:
+            sampler.stop()
+        keepalive = self._keepalives.pop(host, None)
+        if keepalive is not None:
+            keepalive.stop()
+
     def register_offline(
         self,
         creds: FritzCredentials,
@@ -184,67 +312,290 @@ class FritzCollector(Collector):
         connection: ConnectionOptions | None = None,
     ) -> None:
         connection = connection or ConnectionOptions()
-        self.offline_devices.append(
-            OfflineDevice(
-                creds,
-                friendly_name,
-                host_info,
-                connection.connection_timeout,
-                wifi_client_info,
-                connection.use_tls,
-                connection.port,
-                connection.remote_access,
-            )
+        offline = OfflineDevice(
+            creds,
+            friendly_name,
+            host_info,
+            connection.connection_timeout,
+            wifi_client_info,
+            connection.use_tls,
+            connection.port,
+            connection.remote_access,
+            connection,
         )
+        with self._collect_lock:
+            self.offline_devices.append(offline)
         logger.debug("registered offline device %s (%s) to collector", creds.host, friendly_name)
 
-    def _retry_offline_devices(self) -> None:
-        still_offline: list[OfflineDevice] = []
-        for offline in self.offline_devices:
+    def breaker(self, host: str) -> CircuitBreaker:
+        """The circuit breaker of the (online or offline) device with hostname ``host``."""
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(
+                host, threshold=self.breaker_threshold, cooldown=self.breaker_cooldown
+            )
+        return self._breakers[host]
+
+    def sample_wan(self, interval: float, window: float = WAN_SAMPLE_WINDOW) -> None:
+        """Sample the WAN data rate of every device each ``interval`` seconds in the background.
+
+        The peak and percentiles of the last ``window`` seconds are exported.
+        """
+        self._wan_sampling = (interval, window)
+
+    def _start_samplers(self) -> None:
+        if self._wan_sampling is None:
+            return
+        for dev in self.devices:
+            sampler = self._samplers.get(dev.host)
+            if sampler is not None and sampler.device is dev:
+                continue
+            if sampler is not None:
+                # The device was reconnected or reconfigured.
+                del self._samplers[dev.host]
+                sampler.stop()
+            if dev.capabilities["WanCommonInterfaceByteRate"].present:
+                self._samplers[dev.host] = ThroughputSampler(dev, *self._wan_sampling)
+                self._samplers[dev.host].start()
+
+    def keep_alive(self, interval: float = KEEP_ALIVE_INTERVAL) -> None:
+        """Keep the connection of every TLS device open when idle for ``interval`` seconds."""
+        self._keepalive_interval = interval
+
+    def _start_keepalives(self) -> None:
+        if self._keepalive_interval is None:
+            return
+        for dev in self.devices:
+            keepalive = self._keepalives.get(dev.host)
+            if keepalive is not None and keepalive.device is dev:
+                continue
+            if keepalive is not None:
+                # The device was reconnected or reconfigured.
+                keepalive.stop()
+                del self._keepalives[dev.host]
+            # A plain HTTP connection is cheap to set up again.
+            if dev.transport is not None and uses_tls(dev.fc):
+                self._keepalives[dev.host] = KeepAlive(dev, self._keepalive_interval)
+                self._keepalives[dev.host].start()
+
+    def _wan_sample_metrics(self) -> list[GaugeMetricFamily]:
+        if not self._samplers:
+            return []
+        labels = ["serial", "friendly_name", "direction"]
+        peak = GaugeMetricFamily(
+            "fritz_wan_datarate_peak",
+            "Highest WAN data rate sampled in the last sampling window in bytes/s",
+            labels=labels,
+            unit="bytes",
+        )
+        quantile = GaugeMetricFamily(
+            "fritz_wan_datarate_quantile",
+            "Quantiles of the WAN data rates sampled in the last sampling window in bytes/s",
+            labels=[*labels, "quantile"],
+            unit="bytes",
+        )
+        for dev in self.devices:
+            sampler = self._samplers.get(dev.host)
+            if sampler is None:
+                continue
+            for direction, rates in sampler.rates().items():
+                if not rates:
+                    continue
+                series = [dev.serial, dev.friendly_name, direction]
+                peak.add_metric(series, max(rates))
+                for q in QUANTILES:
+                    quantile.add_metric([*series, str(q)], percentile(rates, q * 100))
+        return [peak, quantile]
+
+    def adaptive_timeout(self, dev: FritzDevice) -> AdaptiveTimeout:
+        """The latency samples and effective timeout of ``dev``."""
+        if dev.host not in self._timeouts:
+            self._timeouts[dev.host] = AdaptiveTimeout(
+                dev.host, dev.connection_timeout, self.timeouts
+            )
+        return self._timeouts[dev.host]
+
+    def _preflight(
+        self, endpoints: list[tuple[tuple[str, int] | None, HostResolver | None]]
+    ) -> set[tuple[str, int]]:
+        """The endpoints among ``endpoints`` not accepting TCP connections.
+
+        ``endpoints`` pairs each endpoint with the resolver of its device.
+        """
+        probe = [endpoint for endpoint, _ in endpoints if endpoint is not None]
+        if not probe or self.preflight_timeout <= 0:
+            return set()
+        resolvers = {
+            endpoint[0]: resolver
+            for endpoint, resolver in endpoints
+            if endpoint is not None and resolver is not None
+        }
+        return unreachable_endpoints(probe, self.preflight_timeout, resolvers)
+
+    def _retry_offline_devices(
+        self, retry: list[OfflineDevice], dead: set[tuple[str, int]]
+    ) -> None:
+        still_offline: list[OfflineDevice] = [
+            offline for offline in self.offline_devices if offline not in retry
+        ]
+        for offline in retry:
+            breaker = self.breaker(offline.creds.host)
+            if tr064_endpoint(offline.creds.host, offline.options) in dead:
+                logger.debug("Offline device %s still refuses connections", offline.creds.host)
+                breaker.failure()
+                still_offline.append(offline)
+                continue
             try:
                 fritz_device = FritzDevice(
                     offline.creds,
                     offline.friendly_name,
                     host_info=offline.host_info,
                     wifi_client_info=offline.wifi_client_info,
-                    connection=ConnectionOptions(
-                        connection_timeout=offline.connection_timeout,
-                        use_tls=offline.use_tls,
-                        port=offline.port,
-                        remote_access=offline.remote_access,
-                    ),
+                    connection=offline.options,
                 )
                 logger.info(
                     "Device %s (%s) is back online, registering to collector.",
                     offline.creds.host,
                     offline.friendly_name,
                 )
+                breaker.success()
                 self.register(fritz_device)
             except (
                 FritzConnectionException,
                 FritzAuthorizationError,
                 FritzDeviceHasNoCapabilitiesError,
             ):
+                breaker.failure()
                 still_offline.append(offline)
         self.offline_devices = still_offline
 
+    def _prepare_devices(self) -> list[FritzDevice]:
+        """Decide which devices are contacted in this collection; returns the skipped ones.
+
+        Devices behind an open circuit are skipped. Devices that failed last
+        time and offline devices get a TCP preflight first; offline devices
+        passing it are reconnected.
+        """
+        blocked = [dev for dev in self.devices if not self.breaker(dev.host).allow()]
+        suspects = [dev for dev in self.devices if not dev.available and dev not in blocked]
+        retry = [off for off in self.offline_devices if self.breaker(off.creds.host).allow()]
+        dead = self._preflight(
+            [(dev.endpoint, dev.resolver) for dev in suspects]
+            + [(tr064_endpoint(off.creds.host, off.options), off.options.resolver) for off in retry]
+        )
+
+        # Attempt to bring offline devices back online before collecting
+        self._retry_offline_devices(retry, dead)
+
+        # Reset availability for this collection cycle, skipping blocked and dead devices
+        for dev in self.devices:
+            dev.action_results.clear()
+            dev.available = dev not in blocked and (dev not in suspects or dev.endpoint not in dead)
+            if dev in suspects and not dev.available:
+                logger.debug("Device %s refuses connections, skipping", dev.host)
+            elif dev.available:
+                self.adaptive_timeout(dev).apply(dev.fc)
+        return blocked
+
+    def _record_outcomes(self, blocked: list[FritzDevice]) -> None:
+        for dev in self.devices:
+            if dev in blocked:
+                continue
+            if dev.available:
+                self.breaker(dev.host).success()
+            else:
+                self.breaker(dev.host).failure()
+                self.adaptive_timeout(dev).reset()
+
+    def _circuit_metric(self) -> GaugeMetricFamily:
+        circuit = GaugeMetricFamily(
+            "fritz_device_circuit_state",
+            "Circuit breaker state of the device (0=closed, 1=open, 2=half-open)",
+            labels=["serial", "friendly_name"],
+        )
+        for dev in self.devices:
+            circuit.add_metric([dev.serial, dev.friendly_name], self.breaker(dev.host).state)
+        for offline in self.offline_devices:
+            circuit.add_metric(
+                ["n/a", offline.friendly_name], self.breaker(offline.creds.host).state
+            )
+        return circuit
+
+    def _timeout_metric(self) -> GaugeMetricFamily:
+        timeout = GaugeMetricFamily(
+            "fritz_device_timeout_seconds",
+            "Effective TR-064 timeout of the device (+Inf for none)",
+            labels=["serial", "friendly_name"],
+        )
+        for dev in self.devices:
+            seconds = self.adaptive_timeout(dev).effective
+            timeout.add_metric(
+                [dev.serial, dev.friendly_name], math.inf if seconds is None else seconds
+            )
+        return timeout
+
+    def _rate_limit_metrics(self) -> list[CounterMetricFamily]:
+        waited = CounterMetricFamily(
+            "fritz_device_rate_limit_wait_seconds",
+            "Time TR-064 calls to the device were queued by its rate limit",
+            labels=["serial", "friendly_name"],
+        )
+        delayed = CounterMetricFamily(
+            "fritz_device_rate_limit_delayed_calls",
+            "TR-064 calls to the device queued by its rate limit",
+            labels=["serial", "friendly_name"],
+        )
+        for dev in self.devices:
+            if dev.rate_limit is not None:
+                waited.add_metric([dev.serial, dev.friendly_name], dev.rate_limit.waited)
+                delayed.add_metric([dev.serial, dev.friendly_name], dev.rate_limit.delayed)
+        return [waited, delayed] if waited.samples else []
+
+    def _tls_metrics(self) -> list[CounterMetricFamily]:
+        handshakes = CounterMetricFamily(
+            "fritz_device_tls_handshakes",
+            "TLS handshakes with the device",
+            labels=["serial", "friendly_name"],
+        )
+        resumed = CounterMetricFamily(
+            "fritz_device_tls_resumed_handshakes",
+            "TLS handshakes with the device resuming an earlier session",
+            labels=["serial", "friendly_name"],
+        )
+        for dev in self.devices:
+            if dev.transport is not None and dev.transport.tls.handshakes:
+                handshakes.add_metric([dev.serial, dev.friendly_name], dev.transport.tls.handshakes)
+                resumed.add_metric([dev.serial, dev.friendly_name], dev.transport.tls.resumed)
+        return [handshakes, resumed] if handshakes.samples else []
+
+    def _auth_metric(self) -> list[CounterMetricFamily]:
+        challenges = CounterMetricFamily(
+            "fritz_device_auth_challenges",
+            "HTTP digest auth challenges (401 round trips) answered for the device",
+            labels=["serial", "friendly_name"],
+        )
+        for dev in self.devices:
+            if dev.transport is not None and dev.transport.auth is not None:
+                challenges.add_metric(
+                    [dev.serial, dev.friendly_name], dev.transport.auth.challenges
+                )
+        return [challenges] if challenges.samples else []
+
     def collect(self) -> collections.abc.Iterable[CounterMetricFamily | GaugeMetricFamily]:
         with self._collect_lock:
-            # Attempt to bring offline devices back online before collecting
-            self._retry_offline_devices()
+            blocked = self._prepare_devices()
+            self._start_samplers()
+            self._start_keepalives()
 
             if not self.devices and not self.offline_devices:
                 logger.critical("No devices registered in collector! Exiting.")
                 sys.exit(1)
 
-            # Reset availability for this collection cycle
-            for dev in self.devices:
-                dev.available = True
-
             # Eagerly collect all metrics so we know device availability before yielding
             collected: list[CounterMetricFamily | GaugeMetricFamily] = []
 
             for dev in self.devices:
+                if not dev.available:
+                    continue
                 mode_metric = dev.get_connection_mode()
                 if mode_metric:
                     collected.append(mode_metric)
@@ -252,6 +603,8 @@ class FritzCollector(Collector):
             for name, capa in self._capability_instances.items():
                 collected.extend(list(capa.get_metrics(self.devices, name)))
 
+            self._record_outcomes(blocked)
+
             # Yield device availability metric for all known devices
             device_up = GaugeMetricFamily(
                 "fritz_device_reachable",
@@ -263,6 +616,12 @@ class FritzCollector(Collector):
             for offline in self.offline_devices:
                 device_up.add_metric(["n/a", offline.friendly_name], 0.0)
             yield device_up
+            yield self._circuit_metric()
+            yield self._timeout_metric()
+            yield from self._rate_limit_metrics()
+            yield from self._tls_metrics()
+            yield from self._auth_metric()
+            yield from self._wan_sample_metrics()
 
             yield from collected
 
@@ -0,0 +1,171 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Blackbox-style ``/probe?target=<name>`` scraping of single devices.
+
+In probe mode no device is connected at startup. Prometheus scrapes every
+configured device as its own target, so targets are collected in parallel
+and each gets its own scrape timeout. The ``FritzCollector`` for a target is
+built on its first probe and kept warm in an LRU; targets not probed for
+``idle_timeout`` seconds, or pushed out by ``max_size``, are dropped and
+reconnected on their next probe.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from prometheus_client import CollectorRegistry
+
+from fritzexporter.exceptions import UnknownProbeTargetError
+from fritzexporter.exposition import FamilyRenderer
+
+if TYPE_CHECKING:
+    from fritzexporter.config import DeviceConfig
+    from fritzexporter.fritzdevice import FritzCollector
+    from fritzexporter.reload import DeviceDiff
+
+logger = logging.getLogger("fritzexporter.probe")
+
+
+class ProbeTarget:
+    """A lazily connected device and the renderer for its exposition."""
+
+    def __init__(self, device: DeviceConfig, build: Callable[[DeviceConfig], FritzCollector]):
+        self.device = device
+        self.build = build
+        self.last_used = time.monotonic()
+        self._collector: FritzCollector | None = None
+        self._registry: CollectorRegistry | None = None
+        self._renderer = FamilyRenderer()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def render(self) -> bytes:
+        # Serializes probes of the same target; different targets run in parallel.
+        with self._lock:
+            if self._registry is None:
+                logger.info(
+                    "Connecting probe target %s (%s)", self.device.name, self.device.hostname
+                )
+                registry = CollectorRegistry(auto_describe=False)
+                self._collector = self.build(self.device)
+                registry.register(self._collector)
+                self._registry = registry
+            body = self._renderer.render(self._registry)
+            if self._closed:
+                # Evicted while this probe was waiting; don't leave its threads behind.
+                self._close()
+            return body
+
+    def close(self) -> None:
+        """Stop the background threads of the collector, if it was built."""
+        with self._lock:
+            self._closed = True
+            self._close()
+
+    def _close(self) -> None:
+        if self._collector is not None:
+            self._collector.close()
+        self._collector = None
+        self._registry = None
+
+
+class ProbeManager:
+    """LRU of warm probe targets, keyed by configured device name or hostname."""
+
+    def __init__(
+        self,
+        devices: list[DeviceConfig],
+        build: Callable[[DeviceConfig], FritzCollector],
+        *,
+        max_size: int = 100,
+        idle_timeout: float = 600.0,
+    ) -> None:
+        self.build = build
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._devices: dict[str, DeviceConfig] = {}
+        for dev in devices:
+            self._add_device(dev)
+        self._targets: OrderedDict[str, ProbeTarget] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _add_device(self, dev: DeviceConfig) -> None:
+        self._devices.setdefault(dev.hostname, dev)
+        if dev.name:
+            self._devices.setdefault(dev.name, dev)
+
+    def apply(self, diff: DeviceDiff) -> None:
+        """Apply a config reload; warm targets of removed or changed devices are dropped."""
+        with self._lock:
+            stale = {dev.hostname for dev in [*diff.removed, *diff.changed]}
+            self._devices = {
+                key: dev for key, dev in self._devices.items() if dev.hostname not in stale
+            }
+            dropped = [self._targets.pop(hostname, None) for hostname in stale]
+            for dev in [*diff.changed, *diff.added]:
+                self._add_device(dev)
+        self._close_targets(dropped)
+
+    @staticmethod
+    def _close_targets(targets: list[ProbeTarget | None]) -> None:
+        # Outside the manager lock: closing waits for a running probe of the target.
+        for target in targets:
+            if target is not None:
+                target.close()
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def target(self, name: str) -> ProbeTarget:
+        device = self._devices.get(name)
+        if device is None:
+            raise UnknownProbeTargetError(name)
+
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._evict_idle(now)
+            target = self._targets.get(device.hostname)
+            if target is None:
+                target = ProbeTarget(device, self.build)
+                self._targets[device.hostname] = target
+                while len(self._targets) > self.max_size:
+                    hostname, lru = self._targets.popitem(last=False)
+                    logger.debug("Evicting least recently probed target %s", hostname)
+                    evicted.append(lru)
+            else:
+                self._targets.move_to_end(device.hostname)
+            target.last_used = now
+        self._close_targets(evicted)
+        return target
+
+    def probe(self, name: str) -> bytes:
+        return self.target(name).render()
+
+    def _evict_idle(self, now: float) -> list[ProbeTarget | None]:
+        evicted: list[ProbeTarget | None] = []
+        if not self.idle_timeout:
+            return evicted
+        while self._targets:
+            hostname, oldest = next(iter(self._targets.items()))
+            if now - oldest.last_used < self.idle_timeout:
+                break
+            logger.debug("Evicting idle probe target %s", hostname)
+            evicted.append(self._targets.pop(hostname))
+        return evicted
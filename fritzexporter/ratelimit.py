@@ -0,0 +1,86 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Per-device rate limit of TR-064 calls.
+
+A token bucket holds up to ``burst`` calls and refills at ``rate`` calls per
+second. Every ``call_action`` and ``call_http`` of a ``RateLimitedConnection``
+takes a token; without one, the call is queued until its token is due. Calls
+are served in arrival order, also when several threads call at once.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+RATE_BURST = 10
+
+
+class TokenBucket:
+    """Admits ``rate`` calls per second on average and up to ``burst`` at once."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = RATE_BURST,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.waited = 0.0
+        self.delayed = 0
+        self._tokens = float(burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, waiting until it is due; returns the seconds waited."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens may go negative: each queued call reserves the next free token.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait:
+                self.waited += wait
+                self.delayed += 1
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+class RateLimitedConnection:
+    """Wraps a ``FritzConnection`` (or cassette connection) and rate limits its calls."""
+
+    def __init__(self, fc: Any, bucket: TokenBucket) -> None:  # noqa: ANN401
+        self.fc = fc
+        self.bucket = bucket
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        return getattr(self.fc, name)
+
+    def call_action(self, *args: Any, **kwargs: Any) -> dict[str, Any]:  # noqa: ANN401
+        self.bucket.acquire()
+        return self.fc.call_action(*args, **kwargs)
+
+    def call_http(self, *args: Any, **kwargs: Any) -> dict[str, str]:  # noqa: ANN401
+        self.bucket.acquire()
+        return self.fc.call_http(*args, **kwargs)
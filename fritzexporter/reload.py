@@ -0,0 +1,141 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Hot reload of the device list on SIGHUP or when the config file changes.
+
+Devices are identified by hostname. On reload only devices that were added,
+removed or whose configuration changed are touched; every other device keeps
+its connection, capabilities and caches.
+"""
+
+from __future__ import annotations
+
+import logging
+import signal
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+import attrs
+import yaml
+from attrs import define, field
+
+from fritzexporter.config import DeviceConfig, ExporterConfig, ExporterError, get_config
+
+logger = logging.getLogger("fritzexporter.reload")
+
+
+@define
+class DeviceDiff:
+    added: list[DeviceConfig] = field(factory=list)
+    removed: list[DeviceConfig] = field(factory=list)
+    changed: list[DeviceConfig] = field(factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_devices(old: list[DeviceConfig], new: list[DeviceConfig]) -> DeviceDiff:
+    """Compare two device lists by hostname; ``changed`` holds the new configurations."""
+    old_by_host = {dev.hostname: dev for dev in old}
+    new_by_host = {dev.hostname: dev for dev in new}
+    diff = DeviceDiff()
+    for hostname, dev in new_by_host.items():
+        previous = old_by_host.get(hostname)
+        if previous is None:
+            diff.added.append(dev)
+        elif previous != dev:
+            diff.changed.append(dev)
+    diff.removed = [dev for hostname, dev in old_by_host.items() if hostname not in new_by_host]
+    return diff
+
+
+class ConfigReloader:
+    """Re-reads the config file and hands the device diff to ``apply``.
+
+    Reloads are triggered by ``request()`` (wired to SIGHUP) and, with a
+    ``watch_interval`` greater than 0, when the config file's modification time
+    changes. They run on a background thread, never in the signal handler. A
+    config that fails to load or validate is logged and the running devices
+    are kept.
+    """
+
+    def __init__(
+        self,
+        config_path: str,
+        config: ExporterConfig,
+        apply: Callable[[DeviceDiff], None],
+        *,
+        watch_interval: float = 0.0,
+    ) -> None:
+        self.config_path = config_path
+        self.config = config
+        self.apply = apply
+        self.watch_interval = watch_interval
+        self._mtime = self._read_mtime()
+        self._requested = threading.Event()
+        self._lock = threading.Lock()
+
+    def _read_mtime(self) -> int | None:
+        try:
+            return Path(self.config_path).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def request(self) -> None:
+        self._requested.set()
+
+    def install_signal_handler(self) -> None:
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda *_: self.request())
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run, name="config-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self) -> None:
+        while True:
+            requested = self._requested.wait(self.watch_interval or None)
+            self._requested.clear()
+            if requested or self._read_mtime() != self._mtime:
+                self.reload()
+
+    def reload(self) -> DeviceDiff | None:
+        with self._lock:
+            self._mtime = self._read_mtime()
+            try:
+                config = get_config(self.config_path)
+            except ExporterError, yaml.YAMLError, ValueError, TypeError:
+                logger.exception("Reloading %s failed, keeping running config", self.config_path)
+                return None
+
+            diff = diff_devices(self.config.devices, config.devices)
+            settings_changed = any(
+                getattr(config, attr.name) != getattr(self.config, attr.name)
+                for attr in attrs.fields(ExporterConfig)
+                if attr.name != "devices"
+            )
+            if settings_changed:
+                logger.warning("Only device changes are applied on reload, restart for the rest")
+            logger.info(
+                "Reloaded %s: %d added, %d removed, %d changed devices",
+                self.config_path,
+                len(diff.added),
+                len(diff.removed),
+                len(diff.changed),
+            )
+            if diff:
+                self.apply(diff)
+            self.config.devices = config.devices
+            return diff
@@ -0,0 +1,293 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Push mode: send collected samples with the Prometheus remote-write protocol.
+
+``RemoteWriter`` collects the registry every ``interval`` seconds and sends
+``batch`` collections at once as a snappy-compressed protobuf ``WriteRequest``
+(remote-write 1.0). A batch the endpoint does not accept because it is
+unreachable, overloaded (429) or failing (5xx) is spooled to ``spool_dir``,
+oldest files being dropped beyond ``spool_bytes``. Spooled batches are sent
+again oldest first before any newer one, also after a restart; while they
+cannot be sent, newer batches are spooled behind them.
+
+The protobuf messages and the snappy block format are simple enough to be
+encoded here, so the push mode needs no additional dependencies. The
+compressor only looks for matches of four or more bytes within the previous
+64 KiB, which is what remote-write payloads (repeated label names and values)
+are made of.
+"""
+
+from __future__ import annotations
+
+import logging
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import requests
+from attrs import define
+from prometheus_client.core import REGISTRY
+
+if TYPE_CHECKING:
+    from prometheus_client.registry import CollectorRegistry
+
+logger = logging.getLogger("fritzexporter.remote_write")
+
+REMOTE_WRITE_INTERVAL = 30.0
+REMOTE_WRITE_BATCH = 4
+REMOTE_WRITE_SPOOL_BYTES = 100 * 1024 * 1024
+REMOTE_WRITE_TIMEOUT = 10.0
+
+HEADERS = {
+    "Content-Type": "application/x-protobuf",
+    "Content-Encoding": "snappy",
+    "X-Prometheus-Remote-Write-Version": "0.1.0",
+}
+
+_HTTP_TOO_MANY_REQUESTS = 429
+_HTTP_SERVER_ERROR = 500
+
+# A labelset: sorted (name, value) pairs, __name__ included. Samples go with it
+# as (value, timestamp in milliseconds).
+Series = tuple[tuple[str, str], ...]
+
+
+def _uvarint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:  # noqa: PLR2004
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """A length-delimited protobuf field."""
+    return _uvarint(number << 3 | 2) + _uvarint(len(payload)) + payload
+
+
+def _label(name: str, value: str) -> bytes:
+    return _field(1, name.encode()) + _field(2, value.encode())
+
+
+def _sample(value: float, timestamp_ms: int) -> bytes:
+    # value: field 1, 64-bit; timestamp: field 2, varint (two's complement for int64).
+    return b"\x09" + struct.pack("<d", value) + b"\x10" + _uvarint(timestamp_ms & (2**64 - 1))
+
+
+def encode_write_request(series: dict[Series, list[tuple[float, int]]]) -> bytes:
+    """The protobuf ``prometheus.WriteRequest`` for ``series``."""
+    out = bytearray()
+    for labels, samples in series.items():
+        timeseries = b"".join(_field(1, _label(name, value)) for name, value in labels)
+        ordered = sorted(samples, key=lambda sample: sample[1])
+        timeseries += b"".join(_field(2, _sample(*sample)) for sample in ordered)
+        out += _field(1, timeseries)
+    return bytes(out)
+
+
+def _literal(out: bytearray, data: bytes) -> None:
+    if not data:
+        return
+    n = len(data) - 1
+    if n < 60:  # noqa: PLR2004
+        out.append(n << 2)
+    else:
+        size = (n.bit_length() + 7) // 8
+        out.append((59 + size) << 2)
+        out += n.to_bytes(size, "little")
+    out += data
+
+
+def _copy(out: bytearray, offset: int, length: int) -> None:
+    # Copies with a 2-byte offset hold 1 to 64 bytes, with a 1-byte offset 4 to 11.
+    while length >= 68:  # noqa: PLR2004
+        out += bytes(((63 << 2) | 2,)) + offset.to_bytes(2, "little")
+        length -= 64
+    if length > 64:  # noqa: PLR2004
+        out += bytes(((59 << 2) | 2,)) + offset.to_bytes(2, "little")
+        length -= 60
+    if length >= 12 or offset >= 2048:  # noqa: PLR2004
+        out += bytes((((length - 1) << 2) | 2,)) + offset.to_bytes(2, "little")
+    else:
+        out += bytes((((offset >> 8) << 5) | ((length - 4) << 2) | 1, offset & 0xFF))
+
+
+def snappy_compress(data: bytes) -> bytes:
+    """``data`` in the snappy block format (not the framed stream format)."""
+    out = bytearray(_uvarint(len(data)))
+    last: dict[bytes, int] = {}
+    literal_start = position = 0
+    end = len(data)
+    while position + 4 <= end:
+        key = data[position : position + 4]
+        candidate = last.get(key)
+        last[key] = position
+        if candidate is None or position - candidate > 0xFFFF:  # noqa: PLR2004
+            position += 1
+            continue
+        length = 4
+        while position + length < end and data[candidate + length] == data[position + length]:
+            length += 1
+        _literal(out, data[literal_start:position])
+        _copy(out, position - candidate, length)
+        position += length
+        literal_start = position
+    _literal(out, data[literal_start:])
+    return bytes(out)
+
+
+def registry_series(
+    registry: CollectorRegistry, timestamp_ms: int
+) -> dict[Series, tuple[float, int]]:
+    """One sample per series of ``registry``, stamped ``timestamp_ms`` unless it has its own."""
+    series: dict[Series, tuple[float, int]] = {}
+    for metric in registry.collect():
+        for sample in metric.samples:
+            labels = tuple(sorted({**sample.labels, "__name__": sample.name}.items()))
+            stamp = timestamp_ms if sample.timestamp is None else int(sample.timestamp * 1000)
+            series[labels] = (sample.value, stamp)
+    return series
+
+
+@define(frozen=True)
+class RemoteWriteOptions:
+    """Settings of ``RemoteWriter``; without ``spool_dir`` failed batches are dropped."""
+
+    interval: float = REMOTE_WRITE_INTERVAL
+    batch: int = REMOTE_WRITE_BATCH
+    spool_dir: str | None = None
+    spool_bytes: int = REMOTE_WRITE_SPOOL_BYTES
+    timeout: float = REMOTE_WRITE_TIMEOUT
+
+
+class RemoteWriter:
+    """Collects ``registry`` periodically and pushes the samples to ``url``."""
+
+    def __init__(
+        self,
+        url: str,
+        registry: CollectorRegistry = REGISTRY,
+        options: RemoteWriteOptions | None = None,
+    ) -> None:
+        self.url = url
+        self.registry = registry
+        self.options = options or RemoteWriteOptions()
+        self.pending: list[dict[Series, tuple[float, int]]] = []
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.spool = Path(self.options.spool_dir) if self.options.spool_dir else None
+        if self.spool is not None:
+            self.spool.mkdir(parents=True, exist_ok=True)
+        self._sequence = 0
+
+    def collect(self) -> None:
+        """Collect the registry once; pushes when ``batch`` collections are pending."""
+        self.pending.append(registry_series(self.registry, int(time.time() * 1000)))
+        if len(self.pending) >= self.options.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        """Push the pending collections, then the spooled batches if that worked."""
+        if not self.pending:
+            return
+        series: dict[Series, list[tuple[float, int]]] = {}
+        for cycle in self.pending:
+            for labels, sample in cycle.items():
+                series.setdefault(labels, []).append(sample)
+        self.pending = []
+        payload = snappy_compress(encode_write_request(series))
+        # The spooled batches are older; sent after this one they would be out of order.
+        # While they cannot be sent, this one is spooled behind them.
+        if not self._drain_spool() or self._send(payload) is False:
+            self._spool(payload)
+
+    def _send(self, payload: bytes) -> bool | None:
+        """True if accepted, False if worth retrying, None if rejected for good."""
+        try:
+            response = self.session.post(self.url, data=payload, timeout=self.options.timeout)
+        except requests.RequestException as err:
+            logger.warning("Remote write to %s failed: %s", self.url, err)
+            return False
+        if response.ok:
+            return True
+        status = response.status_code
+        if status == _HTTP_TOO_MANY_REQUESTS or status >= _HTTP_SERVER_ERROR:
+            logger.warning("Remote write to %s failed with HTTP %d", self.url, status)
+            return False
+        logger.error(
+            "Remote write to %s rejected with HTTP %d, dropping batch: %s",
+            self.url,
+            status,
+            response.text[:200],
+        )
+        return None
+
+    def _spooled(self) -> list[Path]:
+        if self.spool is None:
+            return []
+        return sorted(self.spool.glob("*.rw"))
+
+    def _spool(self, payload: bytes) -> None:
+        if self.spool is None:
+            logger.warning("No spool directory, dropping batch of %d bytes", len(payload))
+            return
+        self._sequence += 1
+        path = self.spool / f"{time.time_ns():020d}-{self._sequence:06d}.rw"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(payload)
+        tmp.replace(path)
+        self._trim_spool()
+
+    def _trim_spool(self) -> None:
+        files = [(path, path.stat().st_size) for path in self._spooled()]
+        total = sum(size for _, size in files)
+        for path, size in files:
+            if total <= self.options.spool_bytes:
+                break
+            logger.warning("Remote write spool full, dropping %s", path.name)
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _drain_spool(self) -> bool:
+        """Send the spooled batches oldest first; False if one of them has to wait."""
+        for path in self._spooled():
+            sent = self._send(path.read_bytes())
+            if sent is False:
+                return False
+            if sent is None:
+                logger.warning("Discarding spooled batch %s rejected by %s", path.name, self.url)
+            path.unlink(missing_ok=True)
+        return True
+
+    def run(self, stop: threading.Event) -> None:
+        """Collect and push until ``stop`` is set; pending collections are pushed then."""
+        logger.info(
+            "Pushing to %s every %ss in batches of %d collections",
+            self.url,
+            self.options.interval,
+            self.options.batch,
+        )
+        self._drain_spool()
+        next_run = time.monotonic()
+        while not stop.is_set():
+            try:
+                self.collect()
+            except Exception:
+                logger.exception("Collection for remote write failed")
+            next_run += self.options.interval
+            stop.wait(max(0.0, next_run - time.monotonic()))
+        self.flush()
@@ -0,0 +1,116 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Cached host name resolution for the device connections.
+
+Devices are usually configured by name (``fritz.box``), which the system
+resolver looks up again for every new connection. A ``HostResolver`` keeps the
+addresses of a name for ``ttl`` seconds. Only the very first lookup of a name
+is waited for: when the addresses are older than ``ttl`` they are still used
+while a background thread looks the name up again, and if that lookup fails
+they are kept until the next attempt, one ``ttl`` later. A slow or failing
+resolver therefore never holds up a connection to a device that was resolved
+before.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger("fritzexporter.resolver")
+
+DNS_TTL = 300.0
+
+
+def lookup(host: str) -> list[str]:
+    """The addresses of ``host`` from the system resolver, in its order."""
+    infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return list(dict.fromkeys(str(info[4][0]) for info in infos))
+
+
+class HostResolver:
+    """Addresses of host names, cached for ``ttl`` seconds and refreshed in the background."""
+
+    def __init__(
+        self,
+        ttl: float = DNS_TTL,
+        *,
+        resolve: Callable[[str], list[str]] = lookup,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.failures = 0
+        self._resolve = resolve
+        self._clock = clock
+        # host -> (addresses, time of the next lookup)
+        self._cache: dict[str, tuple[list[str], float]] = {}
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+
+    def addresses(self, host: str) -> list[str]:
+        """The addresses to connect to for ``host``; ``[host]`` if it cannot be resolved here.
+
+        Address literals are returned as they are, as are names that never
+        resolved, so that the connection reports the resolver error itself.
+        """
+        try:
+            ipaddress.ip_address(host.strip("[]"))
+        except ValueError:
+            pass
+        else:
+            return [host]
+        with self._lock:
+            cached = self._cache.get(host)
+            stale = cached is not None and self._clock() >= cached[1]
+            if stale and host not in self._refreshing:
+                self._refreshing.add(host)
+                threading.Thread(
+                    target=self._refresh, args=(host,), name=f"resolve-{host}", daemon=True
+                ).start()
+        if cached is not None:
+            return cached[0]
+        return self._lookup(host) or [host]
+
+    def _lookup(self, host: str) -> list[str] | None:
+        try:
+            addresses = self._resolve(host)
+        except OSError as err:
+            with self._lock:
+                self.failures += 1
+                cached = self._cache.get(host)
+                if cached is not None:
+                    self._cache[host] = (cached[0], self._clock() + self.ttl)
+            if cached is None:
+                logger.warning("Resolving %s failed: %s", host, err)
+            else:
+                logger.warning(
+                    "Resolving %s failed, keeping %s: %s", host, ", ".join(cached[0]), err
+                )
+            return None
+        if not addresses:
+            return None
+        with self._lock:
+            self._cache[host] = (addresses, self._clock() + self.ttl)
+        return addresses
+
+    def _refresh(self, host: str) -> None:
+        try:
+            self._lookup(host)
+        finally:
+            with self._lock:
+                self._refreshing.discard(host)
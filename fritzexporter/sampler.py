@@ -0,0 +1,137 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Background sampling of the WAN data rate.
+
+``fritz_wan_datarate`` is the rate at scrape time, so bursts between scrapes
+go unnoticed. A ``ThroughputSampler`` polls ``GetAddonInfos`` of one device
+every ``interval`` seconds into fixed-size ring buffers holding the last
+``window`` seconds; at scrape time their peak and percentiles are exported.
+The buffers are flat ``array`` objects, so a sampler costs a few KiB however
+long it runs. The polls are left out of cassettes.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from array import array
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from fritzconnection.core.exceptions import FritzConnectionException  # type: ignore[import]
+from requests import RequestException
+
+from fritzexporter.cassette import unrecorded
+
+if TYPE_CHECKING:
+    from fritzexporter.fritzdevice import FritzDevice
+
+logger = logging.getLogger("fritzexporter.sampler")
+
+WAN_SAMPLE_WINDOW = 60.0
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class RingBuffer:
+    """The last ``capacity`` floats appended, oldest first."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value: float) -> None:
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def values(self) -> list[float]:
+        start = (self._next - self._size) % self.capacity
+        if start + self._size <= self.capacity:
+            return self._data[start : start + self._size].tolist()
+        return (self._data[start:] + self._data[: self._next]).tolist()
+
+
+class ThroughputSampler:
+    """Polls the WAN data rate of ``device`` in a daemon thread."""
+
+    def __init__(
+        self,
+        device: FritzDevice,
+        interval: float,
+        window: float = WAN_SAMPLE_WINDOW,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.device = device
+        self.interval = interval
+        self.window = window
+        capacity = max(1, math.ceil(window / interval))
+        self.times = RingBuffer(capacity)
+        self.rx = RingBuffer(capacity)
+        self.tx = RingBuffer(capacity)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def sample(self) -> None:
+        """Take one sample; devices marked unavailable are left alone."""
+        if not self.device.available:
+            return
+        try:
+            # Kept out of cassettes: a sample per second would crowd out the scrapes.
+            with unrecorded():
+                result = self.device.fc.call_action("WANCommonIFC1", "GetAddonInfos")
+            rx, tx = float(result["NewByteReceiveRate"]), float(result["NewByteSendRate"])
+        except (FritzConnectionException, RequestException, KeyError, ValueError) as err:
+            logger.debug("Sampling WAN data rate of %s failed: %s", self.device.host, err)
+            return
+        with self._lock:
+            self.times.append(self._clock())
+            self.rx.append(rx)
+            self.tx.append(tx)
+
+    def rates(self) -> dict[str, list[float]]:
+        """The samples of the last ``window`` seconds per direction."""
+        with self._lock:
+            times, rx, tx = self.times.values(), self.rx.values(), self.tx.values()
+        oldest = self._clock() - self.window
+        first = next((i for i, t in enumerate(times) if t >= oldest), len(times))
+        return {"rx": rx[first:], "tx": tx[first:]}
+
+    def _run(self) -> None:
+        next_sample = self._clock()
+        while not self._stop.is_set():
+            self.sample()
+            next_sample += self.interval
+            now = self._clock()
+            # After a slow answer, skip the missed samples instead of catching up.
+            next_sample = max(next_sample, now)
+            self._stop.wait(next_sample - now)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name=f"wan-sampler-{self.device.host}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,58 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local TR-064 device simulator for benchmarks and end-to-end tests.
+
+A simulated device serves ``tr64desc.xml`` and the SCPD documents generated
+from a ``DeviceProfile``, answers SOAP actions behind digest auth (optionally
+over TLS) with configurable latency and jitter, and provides the mesh list and
+AHA HTTP endpoints. The exporter connects to it like to a real box, so the
+whole stack from ``create_fritz_connection`` through ``FritzCollector.collect``
+is exercised. ``donation_profiles`` builds profiles from ``--donate-data``
+dumps to simulate the exact service layout of real models.
+"""
+
+from .donation import donation_profile, donation_profiles, load_donations
+from .profile import DeviceProfile, SimAction, SoapFault
+from .profiles import (
+    PROFILES,
+    add_homeautomation,
+    add_hosts,
+    associated_devices,
+    base_profile,
+    dsl_router,
+    fiber_router,
+    repeater,
+)
+from .server import SimulatedDevice, SimulatorServer, start_simulator, tls_context
+
+__all__ = [
+    "PROFILES",
+    "DeviceProfile",
+    "SimAction",
+    "SimulatedDevice",
+    "SimulatorServer",
+    "SoapFault",
+    "add_homeautomation",
+    "add_hosts",
+    "associated_devices",
+    "base_profile",
+    "donation_profile",
+    "donation_profiles",
+    "dsl_router",
+    "fiber_router",
+    "load_donations",
+    "repeater",
+    "start_simulator",
+    "tls_context",
+]
@@ -0,0 +1,104 @@
+import argparse
+import logging
+import threading
+
+from fritzexporter.simulator import (
+    PROFILES,
+    SimulatedDevice,
+    add_homeautomation,
+    donation_profiles,
+    start_simulator,
+    tls_context,
+)
+
+logger = logging.getLogger("fritzexporter.simulator")
+
+
+def parse_cmdline() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate FRITZ! devices speaking TR-064")
+    parser.add_argument(
+        "profile", nargs="?", choices=sorted(PROFILES), help="Device profile to simulate"
+    )
+    parser.add_argument(
+        "--donation",
+        metavar="PATH",
+        help="Simulate the devices of a --donate-data dump (file or directory) instead",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=49000, help="TR-064 port (default: 49000)")
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=1,
+        help="Number of devices, on consecutive ports (a donation has one per dump)",
+    )
+    parser.add_argument(
+        "--hosts", type=int, help="Size of the host table (default: 20, donated size)"
+    )
+    parser.add_argument("--wifi-clients", type=int, default=3, help="WiFi clients per band")
+    parser.add_argument(
+        "--homeautomation", type=int, default=0, metavar="N", help="Add N smart home devices"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per action")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max. latency deviation")
+    parser.add_argument("--user", default="monitor")
+    parser.add_argument("--password", default="simulator")
+    parser.add_argument("--tls-cert", help="Serve HTTPS using this certificate (PEM)")
+    parser.add_argument("--tls-key", help="Private key for --tls-cert, if not included")
+    parser.add_argument(
+        "--http-port", type=int, help="Also serve the web interface (AHA) on this port"
+    )
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    if (args.profile is None) == (args.donation is None):
+        parser.error("give either a profile or --donation")
+    return args
+
+
+def main() -> None:
+    args = parse_cmdline()
+    logging.basicConfig(level=args.log_level)
+    tls = tls_context(args.tls_cert, args.tls_key) if args.tls_cert else None
+    if args.donation:
+        profiles = donation_profiles(args.donation, hosts=args.hosts)
+    else:
+        profiles = [
+            PROFILES[args.profile](
+                f"SIM{index:09d}",
+                hosts=20 if args.hosts is None else args.hosts,
+                wifi_clients=args.wifi_clients,
+            )
+            for index in range(args.count)
+        ]
+    for index, profile in enumerate(profiles):
+        logger.info("Simulating %s on port %d", profile.model, args.port + index)
+        profile.latency = args.latency
+        profile.jitter = args.jitter
+        if args.homeautomation:
+            add_homeautomation(profile, args.homeautomation)
+        start_simulator(
+            SimulatedDevice(profile, user=args.user, password=args.password),
+            host=args.host,
+            port=args.port + index,
+            tls=tls,
+            http_port=args.http_port if index == 0 else None,
+        )
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
+
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
@@ -0,0 +1,237 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Device profiles built from ``--donate-data`` dumps.
+
+A donation lists every service and action of a real device and the results of
+its plain ``Get`` actions, all values as strings. The profile offers exactly
+that service layout, answers the donated results (with the data types guessed
+back from the strings) and replays donated errors as SOAP faults, so capability
+detection behaves as on the donating model. Host and WiFi client tables are not
+part of a donation; they are generated with the donated sizes. Actions without
+donated result (everything not starting with ``Get``) answer like the built-in
+DSL and fiber profiles if these know the action, and fail otherwise.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any
+
+from fritzexporter.simulator.profile import ActionHandler, DeviceProfile, SimAction, SoapFault
+from fritzexporter.simulator.profiles import (
+    ARRAY_INDEX_INVALID,
+    NO_SUCH_ENTRY,
+    add_hosts,
+    associated_devices,
+    dsl_router,
+    fiber_router,
+)
+
+ACTION_FAILED = (501, "Action Failed")
+
+_BLOCK_START = re.compile(r"^-+ Donation data for device .* -+$")
+_BLOCK_END = re.compile(r"^-+ END -+$")
+_ERROR_CODE = re.compile(r"errorCode: (\d+)")
+_INTEGER = re.compile(r"-?(0|[1-9]\d{0,19})")
+
+
+def load_donations(path: str | Path) -> list[dict[str, Any]]:
+    """Read the donations in ``path``: a file or a directory of files.
+
+    A file holds either one donation as JSON, the output of ``--donate-data``
+    (one or more donations between the ``Donation data`` and ``END`` lines) or
+    the records of ``--donation-format ndjson``.
+    """
+    path = Path(path)
+    files = sorted(f for f in path.iterdir() if f.is_file()) if path.is_dir() else [path]
+    donations = []
+    for file in files:
+        text = file.read_text(encoding="utf-8")
+        try:
+            donations.append(json.loads(text))
+            continue
+        except json.JSONDecodeError:
+            pass
+        blocks = _donation_blocks(text)
+        if blocks:
+            donations.extend(json.loads(block) for block in blocks)
+            continue
+        try:
+            streamed = _ndjson_donations(text)
+        except json.JSONDecodeError:
+            streamed = []
+        if not streamed:
+            msg = f"No data donation found in {file}"
+            raise ValueError(msg)
+        donations.extend(streamed)
+    return donations
+
+
+def _ndjson_donations(text: str) -> list[dict[str, Any]]:
+    """Reassemble ``--donation-format ndjson`` records (header, then one per action)."""
+    donations: list[dict[str, Any]] = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "services" in record:
+            donations.append({**record, "action_results": {}, "action_latency": {}})
+        elif donations and "action" in record:
+            device, service, action = donations[-1], record["service"], record["action"]
+            device["action_results"].setdefault(service, {})[action] = record["result"]
+            if record.get("latency") is not None:
+                device["action_latency"].setdefault(service, {})[action] = record["latency"]
+    return donations
+
+
+def _donation_blocks(text: str) -> list[str]:
+    blocks: list[str] = []
+    lines: list[str] | None = None
+    for line in text.splitlines():
+        if _BLOCK_START.match(line):
+            lines = []
+        elif _BLOCK_END.match(line) and lines is not None:
+            blocks.append("\n".join(lines))
+            lines = None
+        elif lines is not None:
+            lines.append(line)
+    return blocks
+
+
+def _typed(value: str) -> Any:  # noqa: ANN401
+    """Undo the ``str()`` of the donation so the SCPD gets plausible data types."""
+    if value in ("True", "False"):
+        return value == "True"
+    if _INTEGER.fullmatch(value):
+        return int(value)
+    return value
+
+
+def _fault(code: int, description: str) -> ActionHandler:
+    def handler(_: dict[str, str]) -> dict[str, Any]:
+        raise SoapFault(code, description)
+
+    return handler
+
+
+def _donated_fault(error: str) -> ActionHandler:
+    match = _ERROR_CODE.search(error)
+    if match is None:
+        return _fault(*ACTION_FAILED)
+    return _fault(int(match.group(1)), error.rpartition("errorDescription: ")[2] or "Error")
+
+
+def _missing(action: str) -> ActionHandler:
+    """Fault for an action without donated result (not a plain ``Get`` action)."""
+    if action.startswith("GetGeneric") or "ByIndex" in action:
+        return _fault(*ARRAY_INDEX_INVALID)
+    if action.startswith("GetSpecific") or "ByIP" in action:
+        return _fault(*NO_SUCH_ENTRY)
+    return _fault(*ACTION_FAILED)
+
+
+def _count(results: dict[str, dict[str, str]], action: str, field: str) -> int:
+    value = results.get(action, {}).get(field, "")
+    return int(value) if value.isdigit() else 0
+
+
+def _generated_tables(
+    service: str, results: dict[str, dict[str, str]], hosts: int | None
+) -> DeviceProfile:
+    """The host table or WiFi client list of ``service``, sized as donated."""
+    generated = DeviceProfile(model="", serial="")
+    if service == "Hosts1":
+        count = _count(results, "GetHostNumberOfEntries", "NewHostNumberOfEntries")
+        add_hosts(generated, count if hosts is None else hosts)
+    elif service.startswith("WLANConfiguration"):
+        count = _count(results, "GetTotalAssociations", "NewTotalAssociations")
+        generated.add(
+            service,
+            "GetGenericAssociatedDeviceInfo",
+            associated_devices(1)({"NewAssociatedDeviceIndex": "0"}),
+            handler=associated_devices(count),
+            inputs=("NewAssociatedDeviceIndex",),
+        )
+    return generated
+
+
+def _reference() -> DeviceProfile:
+    """Built-in actions, for those a donation has no result for (e.g. ``X_AVM-DE_Get...``)."""
+    reference = dsl_router("")
+    for service, actions in fiber_router("").services.items():
+        reference.services.setdefault(service, {}).update(actions)
+    return reference
+
+
+def _donated_action(
+    service: str, action: str, result: dict[str, str] | None, reference: DeviceProfile
+) -> SimAction:
+    if result is None:
+        return reference.action(service, action) or SimAction({}, handler=_missing(action))
+    if set(result) == {"error"}:
+        return SimAction({}, handler=_donated_fault(result["error"]))
+    return SimAction({k: _typed(v) for k, v in result.items()})
+
+
+def donation_profile(
+    donation: dict[str, Any], serial: str = "DON000000001", *, hosts: int | None = None
+) -> DeviceProfile:
+    """A profile with the service layout and action results of ``donation``.
+
+    ``hosts`` overrides the donated size of the host table. Donated latencies
+    become the ``action_latency`` of the profile. Sanitized values
+    stay ``<SANITIZED>``, except the serial number (replaced by ``serial``) and
+    the mesh list path; the mesh topology itself is not donated, so the mesh
+    list answers 404 like on a mesh slave.
+    """
+    device = donation.get("fritzdevice", donation)
+    os_version = device.get("os_version", "")
+    profile = DeviceProfile(model=device["model"], serial=serial)
+    if os_version and not os_version.startswith("ERROR"):
+        profile.software_version = os_version
+    results: dict[str, dict[str, dict[str, str]]] = device.get("action_results", {})
+    reference = _reference()
+
+    for service, actions in device["services"].items():
+        service_results = results.get(service, {})
+        generated = _generated_tables(service, service_results, hosts)
+        for action in actions:
+            result = service_results.get(action)
+            sim_action = generated.action(service, action)
+            if sim_action is None or (result is not None and service != "Hosts1"):
+                sim_action = _donated_action(service, action, result, reference)
+            profile.services.setdefault(service, {})[action] = sim_action
+
+    profile.action_latency = {
+        f"{service}/{action}": seconds
+        for service, actions in device.get("action_latency", {}).items()
+        for action, seconds in actions.items()
+    }
+    info = profile.action("DeviceInfo1", "GetInfo")
+    if info is not None and "NewSerialNumber" in info.response:
+        info.response["NewSerialNumber"] = serial
+    mesh = profile.action("Hosts1", "X_AVM-DE_GetMeshListPath")
+    if mesh is not None and "NewX_AVM-DE_MeshListPath" in mesh.response:
+        mesh.response["NewX_AVM-DE_MeshListPath"] = "/meshlist.lua"
+    return profile
+
+
+def donation_profiles(path: str | Path, *, hosts: int | None = None) -> list[DeviceProfile]:
+    """One profile per donation in ``path`` (see ``load_donations``)."""
+    return [
+        donation_profile(donation, f"DON{index:09d}", hosts=hosts)
+        for index, donation in enumerate(load_donations(path), start=1)
+    ]
@@ -0,0 +1,89 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from attrs import define, field
+
+ActionHandler = Callable[[dict[str, str]], dict[str, Any]]
+
+
+class SoapFault(Exception):  # noqa: N818 - named after the SOAP element it produces
+    """Raised by an action handler to answer with a UPnP error (e.g. 713, 714)."""
+
+    def __init__(self, code: int, description: str) -> None:
+        super().__init__(f"{code} {description}")
+        self.code = code
+        self.description = description
+
+
+@define
+class SimAction:
+    """One TR-064 action of a simulated device.
+
+    ``response`` is returned as-is unless a ``handler`` computes the response
+    from the call arguments; it also serves as the template from which the
+    SCPD argument list and data types are generated, so a handler must return
+    the same keys. ``inputs`` are the names of the action's in-arguments.
+    """
+
+    response: dict[str, Any]
+    handler: ActionHandler | None = None
+    inputs: tuple[str, ...] = ()
+
+    def call(self, arguments: dict[str, str]) -> dict[str, Any]:
+        if self.handler is None:
+            return self.response
+        return self.handler(arguments)
+
+
+@define
+class DeviceProfile:
+    """Everything a ``SimulatedDevice`` answers with: services, actions and timings.
+
+    Latencies are in seconds. Each action waits ``action_latency["Service/Action"]``
+    (or ``latency``) plus a uniformly distributed deviation of up to ``jitter``.
+    """
+
+    model: str
+    serial: str
+    software_version: str = "154.07.57"
+    services: dict[str, dict[str, SimAction]] = field(factory=dict)
+    latency: float = 0.0
+    jitter: float = 0.0
+    action_latency: dict[str, float] = field(factory=dict)
+    mesh_topology: dict[str, Any] | None = None
+    aha_devicelist: str | None = None
+
+    def add(
+        self,
+        service: str,
+        action: str,
+        response: dict[str, Any] | None = None,
+        *,
+        handler: ActionHandler | None = None,
+        inputs: tuple[str, ...] = (),
+    ) -> None:
+        self.services.setdefault(service, {})[action] = SimAction(
+            response or {}, handler=handler, inputs=inputs
+        )
+
+    def action(self, service: str, action: str) -> SimAction | None:
+        return self.services.get(service, {}).get(action)
+
+    def latency_for(self, service: str, action: str) -> float:
+        return self.action_latency.get(f"{service}/{action}", self.latency)
@@ -0,0 +1,467 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Built-in device profiles: DSL and fiber routers, mesh repeaters, smart home.
+
+Values are modelled on real FRITZ!Box responses. Traffic counters and uptime
+advance with wall-clock time, the host table and WiFi client lists are
+generated with the requested sizes.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from typing import Any
+
+from fritzexporter.simulator.profile import ActionHandler, DeviceProfile, SoapFault
+
+WLAN_BANDS = ("2.4GHz", "5GHz", "Guest")
+
+ARRAY_INDEX_INVALID = (713, "SpecifiedArrayIndexInvalid")
+NO_SUCH_ENTRY = (714, "NoSuchEntryInArray")
+
+
+def _elapsed() -> Callable[[], float]:
+    started = time.monotonic()
+    return lambda: time.monotonic() - started
+
+
+def _counting(response: dict[str, Any], rates: dict[str, int]) -> ActionHandler:
+    """Handler returning ``response`` with the ``rates`` keys growing per second."""
+    elapsed = _elapsed()
+
+    def handler(_: dict[str, str]) -> dict[str, Any]:
+        seconds = elapsed()
+        return {key: value + int(rates.get(key, 0) * seconds) for key, value in response.items()}
+
+    return handler
+
+
+def _host(index: int) -> dict[str, Any]:
+    return {
+        "NewIPAddress": f"192.168.{178 + index // 250}.{2 + index % 250}",
+        "NewMACAddress": f"02:00:00:00:{index // 256:02X}:{index % 256:02X}",
+        "NewHostName": f"host-{index:04d}",
+        "NewActive": index % 3 != 0,
+    }
+
+
+def add_hosts(profile: DeviceProfile, count: int) -> None:
+    """Add a ``Hosts1`` service with a host table of ``count`` entries."""
+    hosts = [_host(i) for i in range(count)]
+    by_ip = {host["NewIPAddress"]: i for i, host in enumerate(hosts)}
+
+    def generic_entry(arguments: dict[str, str]) -> dict[str, Any]:
+        index = int(arguments.get("NewIndex", -1))
+        if not 0 <= index < len(hosts):
+            raise SoapFault(*ARRAY_INDEX_INVALID)
+        return hosts[index]
+
+    def entry_by_ip(arguments: dict[str, str]) -> dict[str, Any]:
+        index = by_ip.get(arguments.get("NewIPAddress", ""))
+        if index is None:
+            raise SoapFault(*NO_SUCH_ENTRY)
+        return {
+            "NewInterfaceType": "802.11" if index % 2 else "Ethernet",
+            "NewX_AVM-DE_Port": index % 4 + 1,
+            "NewX_AVM-DE_Model": "",
+            "NewX_AVM-DE_Speed": 866 if index % 2 else 1000,
+        }
+
+    profile.add("Hosts1", "GetHostNumberOfEntries", {"NewHostNumberOfEntries": count})
+    profile.add(
+        "Hosts1", "GetGenericHostEntry", _host(0), handler=generic_entry, inputs=("NewIndex",)
+    )
+    profile.add(
+        "Hosts1",
+        "X_AVM-DE_GetSpecificHostEntryByIP",
+        entry_by_ip({"NewIPAddress": _host(0)["NewIPAddress"]}) if hosts else {},
+        handler=entry_by_ip,
+        inputs=("NewIPAddress",),
+    )
+
+
+def associated_devices(count: int) -> ActionHandler:
+    """Handler for ``GetGenericAssociatedDeviceInfo`` with ``count`` WiFi clients."""
+
+    def associated(arguments: dict[str, str]) -> dict[str, Any]:
+        client = int(arguments.get("NewAssociatedDeviceIndex", -1))
+        if not 0 <= client < count:
+            raise SoapFault(*ARRAY_INDEX_INVALID)
+        host = _host(client)
+        return {
+            "NewAssociatedDeviceMACAddress": host["NewMACAddress"],
+            "NewAssociatedDeviceIPAddress": host["NewIPAddress"],
+            "NewAssociatedDeviceAuthState": True,
+            "NewX_AVM-DE_Speed": 866 - client % 7 * 100,
+            "NewX_AVM-DE_SignalStrength": 40 + client % 50,
+        }
+
+    return associated
+
+
+def _add_wlan(profile: DeviceProfile, clients: int) -> None:
+    for index, band in enumerate(WLAN_BANDS, start=1):
+        service = f"WLANConfiguration{index}"
+        band_clients = clients if band != "Guest" else 0
+
+        profile.add(
+            service,
+            "GetInfo",
+            {
+                "NewEnable": True,
+                "NewStatus": "Up",
+                "NewChannel": 6 if index == 1 else 36,
+                "NewSSID": f"FRITZ!Box {band}",
+                "NewStandard": "n" if index == 1 else "ac",
+            },
+        )
+        profile.add(service, "GetTotalAssociations", {"NewTotalAssociations": band_clients})
+        profile.add(
+            service,
+            "GetPacketStatistics",
+            handler=_counting(
+                {"NewTotalPacketsSent": 10_000_000, "NewTotalPacketsReceived": 5_000_000},
+                {"NewTotalPacketsSent": 400, "NewTotalPacketsReceived": 150},
+            ),
+            response={"NewTotalPacketsSent": 0, "NewTotalPacketsReceived": 0},
+        )
+        profile.add(
+            service,
+            "GetGenericAssociatedDeviceInfo",
+            associated_devices(1)({"NewAssociatedDeviceIndex": "0"}),
+            handler=associated_devices(band_clients),
+            inputs=("NewAssociatedDeviceIndex",),
+        )
+
+
+def base_profile(
+    model: str, serial: str, *, hosts: int = 20, wifi_clients: int = 3
+) -> DeviceProfile:
+    """Services every FRITZ! device has: device info, LAN, WLAN and the host table."""
+    profile = DeviceProfile(model=model, serial=serial)
+    uptime = _elapsed()
+    profile.add(
+        "DeviceInfo1",
+        "GetInfo",
+        {
+            "NewManufacturerName": "AVM",
+            "NewModelName": model,
+            "NewSerialNumber": serial,
+            "NewSoftwareVersion": profile.software_version,
+            "NewUpTime": 0,
+        },
+        handler=lambda _: {
+            **profile.services["DeviceInfo1"]["GetInfo"].response,
+            "NewUpTime": 86_400 + int(uptime()),
+        },
+    )
+    profile.add(
+        "UserInterface1",
+        "GetInfo",
+        {"NewUpgradeAvailable": False, "NewX_AVM-DE_Version": ""},
+    )
+    profile.add("LANEthernetInterfaceConfig1", "GetInfo", {"NewEnable": True, "NewStatus": "Up"})
+    profile.add(
+        "LANEthernetInterfaceConfig1",
+        "GetStatistics",
+        {"NewBytesSent": 0, "NewBytesReceived": 0, "NewPacketsSent": 0, "NewPacketsReceived": 0},
+        handler=_counting(
+            {
+                "NewBytesSent": 3_000_000_000,
+                "NewBytesReceived": 900_000_000,
+                "NewPacketsSent": 2_000_000,
+                "NewPacketsReceived": 800_000,
+            },
+            {
+                "NewBytesSent": 250_000,
+                "NewBytesReceived": 40_000,
+                "NewPacketsSent": 200,
+                "NewPacketsReceived": 60,
+            },
+        ),
+    )
+    add_hosts(profile, hosts)
+    _add_wlan(profile, wifi_clients)
+    return profile
+
+
+def _add_wan_common(profile: DeviceProfile, access_type: str, down: int, up: int) -> None:
+    profile.add(
+        "WANCommonInterfaceConfig1",
+        "GetCommonLinkProperties",
+        {
+            "NewWANAccessType": access_type,
+            "NewLayer1UpstreamMaxBitRate": up,
+            "NewLayer1DownstreamMaxBitRate": down,
+            "NewPhysicalLinkStatus": "Up",
+        },
+    )
+    totals = _counting(
+        {
+            "NewTotalBytesReceived": 1_500_000_000,
+            "NewTotalBytesSent": 300_000_000,
+            "NewTotalPacketsReceived": 1_200_000,
+            "NewTotalPacketsSent": 400_000,
+        },
+        {
+            "NewTotalBytesReceived": 500_000,
+            "NewTotalBytesSent": 60_000,
+            "NewTotalPacketsReceived": 400,
+            "NewTotalPacketsSent": 120,
+        },
+    )
+    for name in ("BytesReceived", "BytesSent", "PacketsReceived", "PacketsSent"):
+        key = f"NewTotal{name}"
+        profile.add(
+            "WANCommonInterfaceConfig1",
+            f"GetTotal{name}",
+            {key: 0},
+            handler=lambda arguments, key=key: {key: totals(arguments)[key]},
+        )
+    profile.add(
+        "WANCommonInterfaceConfig1",
+        "X_AVM-DE_GetOnlineMonitor",
+        {
+            "NewTotalNumberSyncGroups": 1,
+            "NewSyncGroupName": "sync_dsl",
+            "NewSyncGroupMode": "VDSL",
+            "Newmax_ds": down // 8,
+            "Newmax_us": up // 8,
+            "Newds_current_bps": ",".join(str(500_000 + 25_000 * i) for i in range(20)),
+            "Newmc_current_bps": ",".join(["0"] * 20),
+            "Newus_current_bps": ",".join(str(60_000 + 5_000 * i) for i in range(20)),
+        },
+        inputs=("NewSyncGroupIndex",),
+    )
+    profile.add(
+        "WANCommonIFC1",
+        "GetAddonInfos",
+        {
+            "NewByteSendRate": 60_000,
+            "NewByteReceiveRate": 500_000,
+            "NewPacketSendRate": 120,
+            "NewPacketReceiveRate": 400,
+            "NewTotalBytesSent": 300_000_000,
+            "NewTotalBytesReceived": 1_500_000_000,
+            "NewX_AVM_DE_TotalBytesSent64": "300000000",
+            "NewX_AVM_DE_TotalBytesReceived64": "1500000000",
+        },
+    )
+    profile.add(
+        "WANPPPConnection1",
+        "GetStatusInfo",
+        {
+            "NewConnectionStatus": "Connected",
+            "NewLastConnectionError": "ERROR_NONE",
+            "NewUptime": 86_000,
+        },
+    )
+
+
+def _mesh_topology(serial: str, repeaters: int) -> dict[str, Any]:
+    master = {
+        "uid": f"n-{serial}",
+        "device_name": "fritz.box",
+        "is_meshed": True,
+        "mesh_role": "master",
+        "node_interfaces": [],
+    }
+    nodes = [master]
+    for i in range(repeaters):
+        link = {
+            "uid": f"nl-{serial}-{i}",
+            "type": "LINK",
+            "state": "CONNECTED",
+            "node_1_uid": master["uid"],
+            "node_2_uid": f"n-{serial}-rep{i}",
+            "cur_data_rate_rx": 866_000,
+            "cur_data_rate_tx": 780_000,
+            "max_data_rate_rx": 1_733_000,
+            "max_data_rate_tx": 1_733_000,
+        }
+        master["node_interfaces"].append({"name": "AP:5G:0", "type": "WLAN", "node_links": [link]})
+        nodes.append(
+            {
+                "uid": link["node_2_uid"],
+                "device_name": f"repeater-{i}",
+                "is_meshed": True,
+                "mesh_role": "slave",
+                "node_interfaces": [{"name": "UPLINK:5G:0", "type": "WLAN", "node_links": [link]}],
+            }
+        )
+    return {"schema_version": "5.2", "nodes": nodes}
+
+
+def dsl_router(
+    serial: str = "DSL000000001", *, hosts: int = 20, wifi_clients: int = 3, repeaters: int = 1
+) -> DeviceProfile:
+    """A FRITZ!Box 7590 on VDSL, mesh master for ``repeaters`` repeaters."""
+    profile = base_profile("FRITZ!Box 7590", serial, hosts=hosts, wifi_clients=wifi_clients)
+    _add_wan_common(profile, "DSL", 116_790_000, 41_500_000)
+    profile.add(
+        "WANDSLInterfaceConfig1",
+        "GetInfo",
+        {
+            "NewEnable": True,
+            "NewStatus": "Up",
+            "NewUpstreamCurrRate": 40_000,
+            "NewDownstreamCurrRate": 109_000,
+            "NewUpstreamMaxRate": 47_000,
+            "NewDownstreamMaxRate": 130_000,
+            "NewUpstreamNoiseMargin": 80,
+            "NewDownstreamNoiseMargin": 90,
+            "NewUpstreamAttenuation": 110,
+            "NewDownstreamAttenuation": 140,
+        },
+    )
+    profile.add(
+        "WANDSLInterfaceConfig1",
+        "X_AVM-DE_GetDSLInfo",
+        handler=_counting({"NewFECErrors": 0, "NewCRCErrors": 12}, {"NewCRCErrors": 0}),
+        response={"NewFECErrors": 0, "NewCRCErrors": 0},
+    )
+    profile.add("Hosts1", "X_AVM-DE_GetMeshListPath", {"NewX_AVM-DE_MeshListPath": "/meshlist.lua"})
+    profile.mesh_topology = _mesh_topology(serial, repeaters)
+    return profile
+
+
+def fiber_router(
+    serial: str = "FIB000000001", *, hosts: int = 20, wifi_clients: int = 3, repeaters: int = 1
+) -> DeviceProfile:
+    """A FRITZ!Box 5590 Fiber on GPON, mesh master for ``repeaters`` repeaters."""
+    profile = base_profile("FRITZ!Box 5590 Fiber", serial, hosts=hosts, wifi_clients=wifi_clients)
+    _add_wan_common(profile, "X_AVM-DE_Fiber", 1_000_000_000, 500_000_000)
+    profile.add(
+        "X_AVM-DE_WANFiber1",
+        "GetInfo",
+        {
+            "NewOpticalSignalLevel": -18_200,
+            "NewLowerOpticalThreshold": -28_000,
+            "NewUpperOpticalThreshold": -8_000,
+            "NewTransmitOpticalLevel": 2_300,
+            "NewLowerTransmitPowerThreshold": 500,
+            "NewUpperTransmitPowerThreshold": 5_000,
+            "NewSFPVendor": "AVM",
+            "NewSFPPartNumber": "FRITZ!SFP GPON",
+            "NewSFPSerialNumber": f"SFP{serial}",
+            "NewSFPType": 1,
+            "NewTXWaveLength": 1310,
+            "NewFiberMode": "GPON",
+        },
+    )
+    profile.add(
+        "X_AVM-DE_WANFiber1",
+        "GetInfoGPON",
+        {
+            "NewGPONSerial": f"AVMG{serial[-8:]}",
+            "NewPONId": "pon-1",
+            "NewONUId": 6,
+            "NewUNIType": "Unknown",
+            "NewGEMPortCount": 3,
+        },
+    )
+    statistics = {
+        "NewBytesSent": 97_008_448_189,
+        "NewBytesReceived": 523_456_789_000,
+        "NewPacketsSent": 212_024_952,
+        "NewPacketsReceived": 987_654_321,
+        "NewPacketErrorsSent": 0,
+        "NewPacketErrorsReceived": 2,
+        "NewPacketsMulticast": 871_440,
+        "NewConnectionRateDown": 2_488_320,
+        "NewConnectionRateUp": 1_244_160,
+    }
+    profile.add(
+        "X_AVM-DE_WANFiber1",
+        "GetStatistics",
+        statistics,
+        handler=_counting(
+            statistics,
+            {
+                "NewBytesSent": 60_000,
+                "NewBytesReceived": 500_000,
+                "NewPacketsSent": 120,
+                "NewPacketsReceived": 400,
+            },
+        ),
+    )
+    profile.add("Hosts1", "X_AVM-DE_GetMeshListPath", {"NewX_AVM-DE_MeshListPath": "/meshlist.lua"})
+    profile.mesh_topology = _mesh_topology(serial, repeaters)
+    return profile
+
+
+def repeater(
+    serial: str = "REP000000001", *, hosts: int = 5, wifi_clients: int = 3
+) -> DeviceProfile:
+    """A FRITZ!Repeater 2400: no WAN, mesh slave (no topology access)."""
+    profile = base_profile("FRITZ!Repeater 2400", serial, hosts=hosts, wifi_clients=wifi_clients)
+    profile.add("Hosts1", "X_AVM-DE_GetMeshListPath", {"NewX_AVM-DE_MeshListPath": "/meshlist.lua"})
+    return profile
+
+
+def add_homeautomation(profile: DeviceProfile, devices: int = 10) -> DeviceProfile:
+    """Add ``devices`` smart home devices (alternating DECT 200 plugs and 301 thermostats)."""
+    entries = []
+    for i in range(devices):
+        ain = f"0987{i:04d} {i % 10}"
+        if i % 2:
+            body = (
+                "<hkr><tist>42</tist><tsoll>44</tsoll><absenk>32</absenk><komfort>44</komfort>"
+                "<battery>80</battery><batterylow>0</batterylow></hkr>"
+            )
+            product = "FRITZ!DECT 301"
+        else:
+            body = (
+                "<switch><state>1</state><mode>manuell</mode><lock>0</lock></switch>"
+                f"<powermeter><power>{1000 + i * 10}</power><energy>{100_000 + i}</energy>"
+                "</powermeter><temperature><celsius>215</celsius><offset>0</offset></temperature>"
+            )
+            product = "FRITZ!DECT 200"
+        entries.append(
+            f'<device identifier="{ain}" id="{16 + i}" functionbitmask="35712" '
+            f'fwversion="05.10" manufacturer="AVM" productname="{product}">'
+            f"<present>1</present><name>{product} #{i}</name>{body}</device>"
+        )
+    profile.aha_devicelist = f'<devicelist version="1">{"".join(entries)}</devicelist>'
+
+    profile.add(
+        "X_AVM-DE_Homeauto1",
+        "GetInfo",
+        {
+            "NewAllowedCharsAIN": "0123456789ABCDEFabcdef :-grptmp",
+            "NewMaxCharsAIN": 19,
+            "NewMinCharsAIN": 1,
+            "NewMaxCharsDeviceName": 79,
+            "NewMinCharsDeviceName": 1,
+        },
+    )
+    profile.add(
+        "X_AVM-DE_Homeauto1",
+        "GetSpecificDeviceInfos",
+        {
+            "NewHkrSetVentilStatus": "TEMP",
+            "NewHkrReduceVentilStatus": "TEMP",
+            "NewHkrComfortVentilStatus": "TEMP",
+        },
+        inputs=("NewAIN",),
+    )
+    return profile
+
+
+PROFILES: dict[str, Callable[..., DeviceProfile]] = {
+    "dsl": dsl_router,
+    "fiber": fiber_router,
+    "repeater": repeater,
+}
@@ -0,0 +1,498 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""HTTP server speaking TR-064 (SOAP + digest auth) and the AHA HTTP interface."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import random
+import re
+import secrets
+import ssl
+import threading
+import time
+from collections import Counter, deque
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+from defusedxml import ElementTree
+
+from fritzexporter.simulator.profile import DeviceProfile, SimAction, SoapFault
+
+logger = logging.getLogger("fritzexporter.simulator")
+
+REALM = "F!Box SOAP-Auth"
+REMOTE_TR064_PREFIX = "/tr064"
+MAX_NONCES = 1024
+
+INVALID_ACTION = (401, "Invalid Action")
+
+_DIGEST_FIELD = re.compile(r'(\w+)=(?:"([^"]*)"|([^,\s]*))')
+
+
+def _md5(text: str) -> str:
+    return hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
+
+
+def _data_type(value: Any) -> str:  # noqa: ANN401
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        # fritzconnection converts by type name only, so 64-bit counters fit too.
+        return "ui4" if value >= 0 else "i4"
+    return "string"
+
+
+def _encode(value: Any) -> str:  # noqa: ANN401
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return escape(str(value))
+
+
+def _service_base(service: str) -> str:
+    return service.rstrip("0123456789")
+
+
+def _service_type(service: str) -> str:
+    return f"urn:dslforum-org:service:{_service_base(service)}:1"
+
+
+class SimulatedDevice:
+    """Answers the requests of one simulated FRITZ! device.
+
+    Holds the rendered description documents, the digest auth and AHA login
+    state and per-action call counters (``calls["Service/Action"]``) that
+    benchmarks use to count TR-064 calls per scrape.
+    """
+
+    def __init__(
+        self,
+        profile: DeviceProfile,
+        *,
+        user: str,
+        password: str,
+        seed: int | None = None,
+    ) -> None:
+        self.profile = profile
+        self.user = user
+        self.password = password
+        self.calls: Counter[str] = Counter()
+        self.handshakes = 0
+        self.resumed_handshakes = 0
+        self.digest_challenges = 0
+        self._rng = random.Random(seed)  # noqa: S311 - jitter, not crypto
+        self._nonces: deque[str] = deque(maxlen=MAX_NONCES)
+        self._challenges: deque[str] = deque(maxlen=MAX_NONCES)
+        self._sids: set[str] = set()
+        self._lock = threading.Lock()
+        self._controls: dict[str, str] = {}
+        self._scpds: dict[str, str] = {}
+        self.reindex()
+
+    def reindex(self) -> None:
+        """Pick up services added to the profile after construction."""
+        self._controls = {f"/upnp/control/{s.lower()}": s for s in self.profile.services}
+        self._scpds = {f"/{s.lower()}SCPD.xml": s for s in self.profile.services}
+
+    def record(self, key: str) -> None:
+        with self._lock:
+            self.calls[key] += 1
+
+    def record_handshake(self, *, resumed: bool = False) -> None:
+        with self._lock:
+            self.handshakes += 1
+            self.resumed_handshakes += resumed
+
+    # Description documents
+
+    def tr64desc(self) -> bytes:
+        services = "".join(
+            "<service>"
+            f"<serviceType>{_service_type(service)}</serviceType>"
+            f"<serviceId>urn:{_service_base(service)}-com:serviceId:{service}</serviceId>"
+            f"<controlURL>/upnp/control/{service.lower()}</controlURL>"
+            f"<eventSubURL>/upnp/control/{service.lower()}</eventSubURL>"
+            f"<SCPDURL>/{service.lower()}SCPD.xml</SCPDURL>"
+            "</service>"
+            for service in self.profile.services
+        )
+        major, minor, patch = self.profile.software_version.split(".")
+        return (
+            '<?xml version="1.0"?><root xmlns="urn:dslforum-org:device-1-0">'
+            "<specVersion><major>1</major><minor>0</minor></specVersion>"
+            f"<systemVersion><HW>0</HW><Major>{major}</Major><Minor>{minor}</Minor>"
+            f"<Patch>{patch}</Patch><Buildnumber>0</Buildnumber>"
+            f"<Display>{self.profile.software_version}</Display></systemVersion>"
+            "<device><deviceType>urn:dslforum-org:device:InternetGatewayDevice:1</deviceType>"
+            f"<friendlyName>{escape(self.profile.model)}</friendlyName>"
+            "<manufacturer>AVM</manufacturer>"
+            f"<modelName>{escape(self.profile.model)}</modelName>"
+            f"<UDN>uuid:{self.profile.serial}</UDN>"
+            f"<serviceList>{services}</serviceList></device></root>"
+        ).encode()
+
+    def scpd(self, service: str) -> bytes:
+        actions = []
+        variables: dict[str, str] = {}
+        for name, action in self.profile.services[service].items():
+            arguments = []
+            for argument in action.inputs:
+                variable = f"{name}.{argument}"
+                variables[variable] = "string"
+                arguments.append((argument, "in", variable))
+            for argument, value in action.response.items():
+                variable = f"{name}.{argument}"
+                variables[variable] = _data_type(value)
+                arguments.append((argument, "out", variable))
+            argument_list = "".join(
+                f"<argument><name>{argument}</name><direction>{direction}</direction>"
+                f"<relatedStateVariable>{variable}</relatedStateVariable></argument>"
+                for argument, direction, variable in arguments
+            )
+            actions.append(
+                f"<action><name>{name}</name><argumentList>{argument_list}</argumentList></action>"
+            )
+        state_table = "".join(
+            f'<stateVariable sendEvents="no"><name>{variable}</name>'
+            f"<dataType>{data_type}</dataType></stateVariable>"
+            for variable, data_type in variables.items()
+        )
+        return (
+            '<?xml version="1.0"?><scpd xmlns="urn:dslforum-org:service-1-0">'
+            "<specVersion><major>1</major><minor>0</minor></specVersion>"
+            f"<actionList>{''.join(actions)}</actionList>"
+            f"<serviceStateTable>{state_table}</serviceStateTable></scpd>"
+        ).encode()
+
+    def scpd_service(self, path: str) -> str | None:
+        return self._scpds.get(path)
+
+    def control_service(self, path: str) -> str | None:
+        return self._controls.get(path)
+
+    # Digest auth (TR-064)
+
+    def new_nonce(self) -> str:
+        nonce = secrets.token_hex(8).upper()
+        with self._lock:
+            self.digest_challenges += 1
+            self._nonces.append(nonce)
+        return nonce
+
+    def check_digest(self, method: str, header: str | None) -> bool:
+        if not header or not header.startswith("Digest "):
+            return False
+        fields = {key: quoted or plain for key, quoted, plain in _DIGEST_FIELD.findall(header)}
+        with self._lock:
+            known_nonce = fields.get("nonce") in self._nonces
+        if not known_nonce or fields.get("username") != self.user:
+            return False
+        ha1 = _md5(f"{self.user}:{REALM}:{self.password}")
+        ha2 = _md5(f"{method}:{fields.get('uri', '')}")
+        if fields.get("qop"):
+            expected = _md5(
+                f"{ha1}:{fields['nonce']}:{fields.get('nc', '')}:"
+                f"{fields.get('cnonce', '')}:{fields['qop']}:{ha2}"
+            )
+        else:
+            expected = _md5(f"{ha1}:{fields['nonce']}:{ha2}")
+        return secrets.compare_digest(expected, fields.get("response", ""))
+
+    # SOAP
+
+    def sleep(self, service: str, action: str) -> None:
+        delay = self.profile.latency_for(service, action)
+        if self.profile.jitter:
+            with self._lock:
+                delay += self._rng.uniform(-self.profile.jitter, self.profile.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def call(self, service: str, soapaction: str, body: bytes) -> tuple[int, bytes]:
+        """Run the SOAP call in ``body`` and return the HTTP status and response envelope."""
+        action_name = soapaction.strip('"').rpartition("#")[2]
+        action: SimAction | None = self.profile.action(service, action_name)
+        self.record(f"{service}/{action_name}")
+        self.sleep(service, action_name)
+        if action is None:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, _fault(*INVALID_ACTION)
+        try:
+            result = action.call(_arguments(body, action_name))
+        except SoapFault as fault:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, _fault(fault.code, fault.description)
+        values = "".join(f"<{name}>{_encode(value)}</{name}>" for name, value in result.items())
+        return HTTPStatus.OK, _envelope(
+            f'<u:{action_name}Response xmlns:u="{_service_type(service)}">'
+            f"{values}</u:{action_name}Response>"
+        )
+
+    # AHA HTTP interface
+
+    def login(self, username: str | None, response: str | None) -> str:
+        """Answer a ``login_sid.lua`` request: a fresh challenge, or a SID for a valid response."""
+        sid = "0000000000000000"
+        if username is not None and response is not None:
+            challenge, _, digest = response.partition("-")
+            expected = hashlib.md5(
+                f"{challenge}-{self.password}".encode("utf-16-le"), usedforsecurity=False
+            ).hexdigest()
+            with self._lock:
+                valid = challenge in self._challenges
+            if valid and username == self.user and secrets.compare_digest(digest, expected):
+                sid = secrets.token_hex(8)
+                with self._lock:
+                    self._sids.add(sid)
+        challenge = secrets.token_hex(4)
+        with self._lock:
+            self._challenges.append(challenge)
+        return (
+            f"<?xml version='1.0' encoding='utf-8'?><SessionInfo><SID>{sid}</SID>"
+            f"<Challenge>{challenge}</Challenge><BlockTime>0</BlockTime><Rights></Rights>"
+            "</SessionInfo>"
+        )
+
+    def valid_sid(self, sid: str | None) -> bool:
+        with self._lock:
+            return sid in self._sids
+
+
+def _arguments(body: bytes, action_name: str) -> dict[str, str]:
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        return {}
+    for element in root.iter():
+        if element.tag.rpartition("}")[2] == action_name:
+            return {child.tag.rpartition("}")[2]: child.text or "" for child in element}
+    return {}
+
+
+def _envelope(body: str) -> bytes:
+    return (
+        '<?xml version="1.0"?><s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" '
+        's:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">'
+        f"<s:Body>{body}</s:Body></s:Envelope>"
+    ).encode()
+
+
+def _fault(code: int, description: str) -> bytes:
+    # fritzconnection reads the text of every node below <detail>, so the
+    # container elements need (whitespace) text as well.
+    return _envelope(
+        "<s:Fault><faultcode>s:Client</faultcode><faultstring>UPnPError</faultstring>"
+        '<detail>\n<UPnPError xmlns="urn:dslforum-org:control-1-0">\n'
+        f"<errorCode>{code}</errorCode><errorDescription>{escape(description)}</errorDescription>"
+        "\n</UPnPError>\n</detail></s:Fault>"
+    )
+
+
+class _SimulatorHandler(BaseHTTPRequestHandler):
+    server: SimulatorServer
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; don't let Nagle delay the body.
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        if isinstance(self.request, ssl.SSLSocket):
+            # Handshake here, on the connection's own thread, not in accept().
+            self.request.do_handshake()
+            self.server.device.record_handshake(resumed=self.request.session_reused)
+        super().setup()
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        logger.debug(format, *args)
+
+    def _path(self) -> tuple[str, dict[str, list[str]]]:
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path.startswith(f"{REMOTE_TR064_PREFIX}/"):
+            path = path[len(REMOTE_TR064_PREFIX) :]
+        return path, parse_qs(parts.query)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str = 'text/xml; charset="utf-8"',
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self) -> None:
+        # fritzconnection treats text/html answers for description files as "absent".
+        self._send(HTTPStatus.NOT_FOUND, b"<html><body>404 Not Found</body></html>", "text/html")
+
+    def do_GET(self) -> None:
+        device = self.server.device
+        path, query = self._path()
+        if path == "/tr64desc.xml":
+            self._send(HTTPStatus.OK, device.tr64desc())
+        elif service := device.scpd_service(path):
+            self._send(HTTPStatus.OK, device.scpd(service))
+        elif path == "/meshlist.lua" and device.profile.mesh_topology is not None:
+            self._send(
+                HTTPStatus.OK, json.dumps(device.profile.mesh_topology).encode(), "application/json"
+            )
+        elif path == "/login_sid.lua":
+            self._send(HTTPStatus.OK, device.login(None, None).encode())
+        elif path == "/webservices/homeautoswitch.lua":
+            self._homeautoswitch(query)
+        else:
+            self._not_found()
+
+    def _homeautoswitch(self, query: dict[str, list[str]]) -> None:
+        device = self.server.device
+        if not device.valid_sid(query.get("sid", [None])[0]):
+            self._send(
+                HTTPStatus.FORBIDDEN, b"<html><body>403 Forbidden</body></html>", "text/html"
+            )
+            return
+        command = query.get("switchcmd", [None])[0]
+        if command != "getdevicelistinfos" or device.profile.aha_devicelist is None:
+            self._send(
+                HTTPStatus.BAD_REQUEST, b"<html><body>400 Bad Request</body></html>", "text/html"
+            )
+            return
+        device.record("aha/getdevicelistinfos")
+        device.sleep("aha", command)
+        self._send(HTTPStatus.OK, device.profile.aha_devicelist.encode(), "text/xml; charset=utf-8")
+
+    def do_POST(self) -> None:
+        device = self.server.device
+        path, _ = self._path()
+        body = self._body()
+        if path == "/login_sid.lua":
+            form = parse_qs(body.decode())
+            answer = device.login(form.get("username", [None])[0], form.get("response", [None])[0])
+            self._send(HTTPStatus.OK, answer.encode())
+            return
+        service = device.control_service(path)
+        if service is None:
+            self._not_found()
+            return
+        if not device.check_digest("POST", self.headers.get("Authorization")):
+            self._send(
+                HTTPStatus.UNAUTHORIZED,
+                b"<html><head><title>401 Unauthorized</title></head></html>",
+                "text/html",
+                {
+                    "WWW-Authenticate": (
+                        f'Digest realm="{REALM}", nonce="{device.new_nonce()}", algorithm=MD5, '
+                        'qop="auth"'
+                    )
+                },
+            )
+            return
+        status, answer = device.call(service, self.headers.get("SOAPACTION", ""), body)
+        self._send(status, answer)
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """Threaded HTTP(S) server for one ``SimulatedDevice``."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        device: SimulatedDevice,
+        *,
+        tls_context: ssl.SSLContext | None = None,
+    ) -> None:
+        super().__init__(address, _SimulatorHandler)
+        self.device = device
+        self.tls = tls_context is not None
+        if tls_context is not None:
+            self.socket = tls_context.wrap_socket(
+                self.socket, server_side=True, do_handshake_on_connect=False
+            )
+        self.companions: list[SimulatorServer] = []
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    @property
+    def host(self) -> str:
+        """The address to configure in the exporter, e.g. ``127.0.0.1`` or ``https://127.0.0.1``."""
+        host = str(self.server_address[0])
+        return f"https://{host}" if self.tls else host
+
+    def start(self) -> SimulatorServer:
+        self._thread = threading.Thread(
+            target=self.serve_forever, name=f"simulator-{self.port}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        for companion in self.companions:
+            companion.stop()
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def tls_context(certfile: str, keyfile: str | None = None) -> ssl.SSLContext:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def start_simulator(
+    device: SimulatedDevice,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    tls: ssl.SSLContext | None = None,
+    http_port: int | None = None,
+) -> SimulatorServer:
+    """Serve ``device`` on ``host:port`` (0 picks a free port) from background threads.
+
+    fritzconnection talks to the AHA HTTP interface on port 80 for plain HTTP
+    and on the remote access port for TLS. With ``tls`` the remote access port
+    is this server's port; for plain HTTP pass ``http_port=80`` to also serve
+    the web interface there.
+    """
+    server = SimulatorServer((host, port), device, tls_context=tls)
+    profile = device.profile
+    if profile.aha_devicelist is not None:
+        profile.add(
+            "X_AVM-DE_RemoteAccess1",
+            "GetInfo",
+            {"NewEnabled": tls is not None, "NewPort": server.port, "NewUsername": device.user},
+        )
+        device.reindex()
+    if http_port is not None:
+        server.companions.append(SimulatorServer((host, http_port), device).start())
+    logger.info("Simulating %s (%s) on %s:%d", profile.model, profile.serial, host, server.port)
+    return server.start()
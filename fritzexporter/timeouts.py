@@ -0,0 +1,116 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Per-device TR-064 timeouts derived from observed latency.
+
+The response time of every request to a device is recorded (the last
+``window`` ones). With a ``factor`` (off by default), once ``MIN_SAMPLES`` are
+known, the timeout of the device's SOAP calls becomes their p99 times
+``factor``, clamped to ``minimum`` and ``maximum`` (or the device's
+``connection_timeout`` if lower). The samples are dominated by the many fast
+per-host calls, so ``minimum`` has to leave room for the rare slow actions. A failed
+collection discards the samples, so the device falls back to its configured
+timeout until it has answered often enough again.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from collections import deque
+from typing import Any
+
+import requests
+from attrs import define
+
+logger = logging.getLogger("fritzexporter.timeouts")
+
+# Off by default; 3 suits most devices.
+TIMEOUT_FACTOR = 0.0
+TIMEOUT_MIN = 5.0
+TIMEOUT_MAX = 30.0
+TIMEOUT_WINDOW = 200
+MIN_SAMPLES = 20
+
+
+@define(frozen=True)
+class TimeoutOptions:
+    """Settings of the adaptive timeouts; ``factor`` 0 keeps the configured timeouts."""
+
+    factor: float = TIMEOUT_FACTOR
+    minimum: float = TIMEOUT_MIN
+    maximum: float = TIMEOUT_MAX
+    window: int = TIMEOUT_WINDOW
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class AdaptiveTimeout:
+    """Latency samples and effective timeout of one device.
+
+    ``configured`` is the static ``connection_timeout`` of the device (None for
+    no timeout); it is used until enough samples are known and caps the
+    adapted timeout.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        configured: float | None = None,
+        options: TimeoutOptions | None = None,
+    ) -> None:
+        self.name = name
+        self.configured = configured
+        self.options = options or TimeoutOptions()
+        self.samples: deque[float] = deque(maxlen=self.options.window)
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def reset(self) -> None:
+        self.samples.clear()
+
+    @property
+    def effective(self) -> float | None:
+        """The timeout for the next collection in seconds, None for no timeout."""
+        if self.options.factor <= 0 or len(self.samples) < MIN_SAMPLES:
+            return self.configured
+        maximum = self.options.maximum
+        if self.configured is not None:
+            maximum = min(maximum, self.configured)
+        adapted = percentile(list(self.samples), 99) * self.options.factor
+        return max(self.options.minimum, min(maximum, adapted))
+
+    def _hook(self, response: requests.Response, *_: Any, **__: Any) -> None:  # noqa: ANN401
+        self.observe(response.elapsed.total_seconds())
+
+    def apply(self, fc: Any) -> None:  # noqa: ANN401
+        """Record the latency of ``fc``'s requests and set its SOAP timeout.
+
+        Connections without a requests session (cassette replays) are left alone.
+        """
+        soaper = getattr(fc, "soaper", None)
+        hooks = getattr(getattr(fc, "session", None), "hooks", None)
+        if soaper is None or hooks is None:
+            return
+        response_hooks = hooks.setdefault("response", [])
+        if self._hook not in response_hooks:
+            response_hooks.append(self._hook)
+        timeout = self.effective
+        if timeout != soaper.timeout:
+            logger.debug("Timeout of %s set to %s", self.name, timeout)
+            soaper.timeout = timeout
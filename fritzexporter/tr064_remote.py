@@ -1,13 +1,22 @@
-"""AVM WAN remote TR-064 URL rewriting (/tr064 path prefix).
+"""TR-064 connection setup: AVM WAN remote URL rewriting (/tr064 path prefix),
+cassette record/replay, rate limiting, the HTTP transport (see ``transport``) and
+the TCP preflight for unreachable devices.
 
 See https://fritz.support/resources/TR-064_Remote_Access.pdf
 """
 
 from __future__ import annotations
 
-from collections.abc import Iterator
+import errno
+import inspect
+import logging
+import selectors
+import socket
+import time
+from collections.abc import Iterable, Iterator, Mapping
 from contextlib import contextmanager
-from typing import Any
+from pathlib import Path
+from typing import Any, cast
 from urllib.parse import urlsplit, urlunsplit
 from xml.etree.ElementTree import ParseError
 
@@ -15,9 +24,27 @@ import requests
 from attrs import define
 from fritzconnection import FritzConnection  # type: ignore[import]
 from fritzconnection.core.exceptions import FritzConnectionException  # type: ignore[import]
+from fritzconnection.core.soaper import Soaper  # type: ignore[import]
+
+from fritzexporter.cassette import RecordingConnection, ReplayConnection
+from fritzexporter.ratelimit import RATE_BURST, RateLimitedConnection, TokenBucket
+from fritzexporter.resolver import HostResolver
+from fritzexporter.soap import FastSoaper
+from fritzexporter.transport import install_transport
+
+logger = logging.getLogger("fritzexporter.tr064_remote")
 
 REMOTE_TR064_PREFIX = "/tr064"
 
+TR064_PORT = 49000
+TR064_TLS_PORT = 49443
+
+# Seconds a TCP preflight waits for a connection to be accepted.
+PREFLIGHT_TIMEOUT = 0.5
+
+# fritzconnection >= 1.10 caches the service descriptions itself.
+_HAS_DESCRIPTION_CACHE = "use_cache" in inspect.signature(FritzConnection).parameters
+
 
 def rewrite_tr064_remote_url(url: str) -> str:
     """Prepend /tr064 to the URL path unless it is already present."""
@@ -80,6 +107,13 @@ class ConnectionOptions:
     use_tls: bool = False
     port: int | None = None
     remote_access: bool = False
+    record_to: str | None = None
+    replay_from: str | None = None
+    replay_speed: float = 1.0
+    rate_limit: float | None = None
+    rate_burst: int = RATE_BURST
+    cache_dir: str | None = None
+    resolver: HostResolver | None = None
 
 
 def create_fritz_connection(
@@ -89,20 +123,124 @@ def create_fritz_connection(
     password: str,
     connection: ConnectionOptions | None = None,
 ) -> FritzConnection:
-    """Create a FritzConnection, optionally rewriting paths for WAN remote access."""
+    """Create a FritzConnection, optionally rewriting paths for WAN remote access.
+
+    With ``replay_from`` no connection is made; the calls are answered from the
+    cassette. With ``record_to`` the live connection's traffic is recorded.
+    With ``rate_limit`` at most that many calls per second (``rate_burst`` at
+    once) are made. With ``cache_dir`` the service descriptions are cached there
+    (fritzconnection's own cache, renewed on model or software changes). With
+    ``resolver`` the TR-064 calls connect to the addresses cached by it.
+    """
     options = connection or ConnectionOptions()
+    fc = _connect(address, user, password, options)
+    if options.rate_limit:
+        bucket = TokenBucket(options.rate_limit, options.rate_burst)
+        return cast("FritzConnection", RateLimitedConnection(fc, bucket))
+    return fc
+
+
+def _connect(address: str, user: str, password: str, options: ConnectionOptions) -> FritzConnection:
+    if options.replay_from is not None:
+        replay = ReplayConnection(options.replay_from, address, speed=options.replay_speed)
+        return cast("FritzConnection", replay)
     with remote_tr064_session(enabled=options.remote_access):
         try:
-            return FritzConnection(
+            fc = FritzConnection(
                 address=address,
                 user=user,
                 password=password,
                 timeout=options.connection_timeout,
                 use_tls=options.use_tls,
                 port=options.port,
+                **_description_cache(options.cache_dir),
             )
         except ParseError as err:
             # Fritz returns HTML (often text/html; charset=utf-8) for missing/auth
             # paths; fritzconnection then fails XML parse instead of a typed error.
             msg = f"Invalid TR-064 response from {address} (not XML): {err}"
             raise FritzConnectionException(msg) from err
+    if isinstance(fc.soaper, Soaper):
+        fc.soaper = FastSoaper.from_soaper(fc.soaper)
+    install_transport(fc, options.resolver)
+    if options.record_to is not None:
+        return cast("FritzConnection", RecordingConnection(fc, options.record_to))
+    return fc
+
+
+def _description_cache(cache_dir: str | None) -> dict[str, Any]:
+    if cache_dir is None:
+        return {}
+    if not _HAS_DESCRIPTION_CACHE:
+        logger.warning(
+            "This fritzconnection cannot cache service descriptions (needs 1.10 or newer), "
+            "only capabilities are cached in %s",
+            cache_dir,
+        )
+        return {}
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    return {"use_cache": True, "cache_directory": cache_dir, "cache_format": "json"}
+
+
+def tr064_endpoint(address: str, connection: ConnectionOptions) -> tuple[str, int] | None:
+    """Host and port the TR-064 connection to ``address`` goes to (None when replaying)."""
+    if connection.replay_from is not None:
+        return None
+    parts = urlsplit(address if "://" in address else f"//{address}")
+    use_tls = connection.use_tls or parts.scheme == "https"
+    default_port = TR064_TLS_PORT if use_tls else TR064_PORT
+    return parts.hostname or address, connection.port or default_port
+
+
+def unreachable_endpoints(
+    endpoints: Iterable[tuple[str, int]],
+    timeout: float = PREFLIGHT_TIMEOUT,
+    resolvers: Mapping[str, HostResolver] | None = None,
+) -> set[tuple[str, int]]:
+    """Connect to all ``endpoints`` at once and return those refusing or not answering.
+
+    The connects are non-blocking and share one ``timeout``, so a dead box costs at
+    most ``timeout`` seconds however many are probed. Hosts in ``resolvers`` are
+    connected to at the first address their ``HostResolver`` has, without asking
+    the system resolver again; the others are resolved by the system resolver.
+    Names that do not resolve are not reported; the TR-064 call fails on them with
+    a proper error anyway.
+    """
+    failed: set[tuple[str, int]] = set()
+    selector = selectors.DefaultSelector()
+    try:
+        for endpoint in set(endpoints):
+            host, port = endpoint
+            flags = 0
+            if resolvers is not None and host in resolvers:
+                # A name the resolver never resolved comes back as it is.
+                host, flags = resolvers[host].addresses(host)[0], socket.AI_NUMERICHOST
+            try:
+                family, kind, proto, _, sockaddr = socket.getaddrinfo(
+                    host, port, type=socket.SOCK_STREAM, flags=flags
+                )[0]
+            except OSError:
+                continue
+            sock = socket.socket(family, kind, proto)
+            sock.settimeout(0)
+            if sock.connect_ex(sockaddr) not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                sock.close()
+                failed.add(endpoint)
+                continue
+            selector.register(sock, selectors.EVENT_WRITE, endpoint)
+
+        deadline = time.monotonic() + timeout
+        while selector.get_map() and (remaining := deadline - time.monotonic()) > 0:
+            for key, _ in selector.select(remaining):
+                sock = cast("socket.socket", key.fileobj)
+                if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) != 0:
+                    failed.add(key.data)
+                selector.unregister(sock)
+                sock.close()
+        for key in list(selector.get_map().values()):
+            failed.add(key.data)
+    finally:
+        for key in list(selector.get_map().values()):
+            cast("socket.socket", key.fileobj).close()
+        selector.close()
+    return failed
@@ -0,0 +1,357 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""HTTP transport of the TR-064 connections: TLS session resumption, keep-alive
+and shared digest authentication.
+
+With ``use_tls``, and over WAN with ``remote_access`` in particular, a full TLS
+handshake costs several round trips. A ``TransportAdapter`` gives the pooled
+connections of one device their own ``ResumingSSLContext``, which offers the
+TLS session of an earlier connection on every new one, so that reconnecting
+takes an abbreviated handshake. The handshakes are counted.
+
+The box closes keep-alive connections after some idle time, usually shorter
+than the scrape interval. On request, a ``KeepAlive`` thread per TLS device
+requests the (unauthenticated) device description whenever the connection of
+the device was idle for ``interval`` seconds, which keeps the most recently
+used connection of the pool open between scrapes. The requests count against
+the rate limit of the device. Connections needed only when the WAN sampler and
+a collection run at the same time may still be closed; they come back with a
+resumed session.
+
+TR-064 calls are authenticated with HTTP digest auth. requests'
+``HTTPDigestAuth`` answers a 401 challenge and then authenticates the following
+requests preemptively, but keeps the challenge per thread: every scrape (served
+from a new thread), the WAN sampler and the keep-alive would each start with a
+401 round trip. ``SharedDigestAuth`` shares the last challenge (realm, nonce and
+nonce count) of a device between all threads, so a challenge is only answered
+again when the box no longer accepts the nonce. The challenges are counted.
+
+New connections take the address of the device from its ``HostResolver`` (see
+``fritzexporter.resolver``) instead of the system resolver.
+"""
+
+from __future__ import annotations
+
+import logging
+import socket
+import ssl
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any
+
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPDigestAuth
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool, PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import NewConnectionError
+
+from fritzexporter.resolver import HostResolver
+
+if TYPE_CHECKING:
+    import requests
+    from requests import PreparedRequest, Response
+
+    from fritzexporter.fritzdevice import FritzDevice
+
+logger = logging.getLogger("fritzexporter.transport")
+
+KEEP_ALIVE_INTERVAL = 20.0
+KEEP_ALIVE_PATH = "/tr64desc.xml"
+# Wait at least this long between two keep-alive checks.
+_MIN_WAIT = 1.0
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """Client context offering the last TLS session of its connections on new ones.
+
+    Like fritzconnection, certificates are not verified by default: boxes use
+    self-signed ones.
+    """
+
+    def __new__(cls) -> ResumingSSLContext:
+        return super().__new__(cls, ssl.PROTOCOL_TLS_CLIENT)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.check_hostname = False
+        self.verify_mode = ssl.CERT_NONE
+        self.handshakes = 0
+        self.resumed = 0
+        self._session: ssl.SSLSession | None = None
+        self._sockets: weakref.WeakSet[ssl.SSLSocket] = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def remember(self) -> None:
+        """Keep a resumable session of the open connections to offer on new ones."""
+        with self._lock:
+            for tls in list(self._sockets):
+                # TLS 1.3 sessions become resumable when the server's ticket was read,
+                # which is after the handshake; closed connections have none.
+                session = tls.session
+                if session is not None and (session.has_ticket or tls.version() != "TLSv1.3"):
+                    self._session = session
+
+    def wrap_socket(  # type: ignore[override]
+        self,
+        sock: socket.socket,
+        *args: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> ssl.SSLSocket:
+        if not kwargs.get("server_side") and kwargs.get("session") is None:
+            kwargs["session"] = self._session
+        tls = super().wrap_socket(sock, *args, **kwargs)
+        with self._lock:
+            self.handshakes += 1
+            self.resumed += tls.session_reused
+            self._sockets.add(tls)
+        return tls
+
+
+class SharedDigestAuth(HTTPDigestAuth):
+    """``HTTPDigestAuth`` sharing the challenge between all threads."""
+
+    def __init__(self, username: str, password: str) -> None:
+        super().__init__(username, password)
+        self.challenges = 0
+        self._challenge: dict[str, str] = {}
+        self._nonce = ""
+        self._nonce_count = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_auth(cls, auth: HTTPDigestAuth) -> SharedDigestAuth:
+        """A shared ``auth``, continuing with the challenge it answered on this thread."""
+        shared = cls(auth.username, auth.password)
+        auth.init_per_thread_state()
+        if auth._thread_local.last_nonce:  # noqa: SLF001
+            shared._challenge = auth._thread_local.chal  # noqa: SLF001
+            shared._nonce = auth._thread_local.last_nonce  # noqa: SLF001
+            shared._nonce_count = auth._thread_local.nonce_count  # noqa: SLF001
+        return shared
+
+    def __call__(self, r: PreparedRequest) -> PreparedRequest:
+        self.init_per_thread_state()
+        # A nonce makes HTTPDigestAuth authenticate preemptively, see build_digest_header.
+        self._thread_local.last_nonce = self._nonce
+        self._thread_local.answering = False
+        return super().__call__(r)
+
+    def handle_401(self, r: Response, **kwargs: Any) -> Response:  # noqa: ANN401
+        # A new challenge is parsed and answered in here.
+        self._thread_local.answering = True
+        try:
+            return super().handle_401(r, **kwargs)
+        finally:
+            self._thread_local.answering = False
+
+    def build_digest_header(self, method: str, url: str) -> str | None:
+        local = self._thread_local
+        with self._lock:
+            if local.answering:
+                self.challenges += 1
+                self._challenge = local.chal
+            else:
+                local.chal = self._challenge
+            local.last_nonce, local.nonce_count = self._nonce, self._nonce_count
+            header = super().build_digest_header(method, url)
+            self._nonce, self._nonce_count = local.last_nonce, local.nonce_count
+        return header
+
+
+class _ResolvingConnection(HTTPConnection):
+    """Connects to the addresses ``resolver`` has for the host, one after the other."""
+
+    def __init__(self, *args: Any, resolver: HostResolver, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(*args, **kwargs)
+        self.resolver = resolver
+
+    def _new_conn(self) -> socket.socket:
+        host = self._dns_host
+        addresses = self.resolver.addresses(host)
+        try:
+            for address in addresses[:-1]:
+                self._dns_host = address
+                with suppress(NewConnectionError):
+                    return super()._new_conn()
+            self._dns_host = addresses[-1]
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+
+class _ResolvingHTTPSConnection(_ResolvingConnection, HTTPSConnection):
+    pass
+
+
+class _ResolvingPoolManager(PoolManager):
+    """``PoolManager`` whose connections resolve host names with ``resolver``."""
+
+    def __init__(self, resolver: HostResolver, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(**kwargs)
+        self.resolver = resolver
+
+    def _new_pool(
+        self,
+        scheme: str,
+        host: str,
+        port: int,
+        request_context: dict[str, Any] | None = None,
+    ) -> HTTPConnectionPool:
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.ConnectionCls = (
+            _ResolvingHTTPSConnection
+            if isinstance(pool, HTTPSConnectionPool)
+            else _ResolvingConnection
+        )
+        pool.conn_kw["resolver"] = self.resolver
+        return pool
+
+
+class TransportAdapter(HTTPAdapter):
+    """``HTTPAdapter`` with TLS session resumption that remembers when it was last used.
+
+    ``session`` is the requests session it is mounted on and ``auth`` the
+    ``SharedDigestAuth`` of that session, if it uses digest auth. With
+    ``resolver`` host names are resolved by it.
+    """
+
+    def __init__(
+        self,
+        *,
+        resolver: HostResolver | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.tls = ResumingSSLContext()
+        self.session: requests.Session | None = None
+        self.auth: SharedDigestAuth | None = None
+        self.resolver = resolver
+        self._clock = clock
+        self.last_used = clock()
+        super().__init__()
+
+    def init_poolmanager(
+        self,
+        connections: int,
+        maxsize: int,
+        block: bool = False,  # noqa: FBT001, FBT002 - signature of HTTPAdapter
+        **pool_kwargs: dict[str, Any],
+    ) -> None:
+        pool_kwargs.setdefault("ssl_context", self.tls)  # type: ignore[arg-type]
+        if self.resolver is None:
+            super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+            return
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _ResolvingPoolManager(
+            self.resolver, num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs
+        )
+
+    def send(self, request: PreparedRequest, *args: Any, **kwargs: Any) -> Response:  # noqa: ANN401
+        self.last_used = self._clock()
+        try:
+            return super().send(request, *args, **kwargs)
+        finally:
+            self.tls.remember()
+
+    def idle(self) -> float:
+        """Seconds since the last request."""
+        return self._clock() - self.last_used
+
+
+def install_transport(fc: Any, resolver: HostResolver | None = None) -> TransportAdapter | None:  # noqa: ANN401
+    """Mount a ``TransportAdapter`` using ``resolver`` on the session of ``fc``, if it has one.
+
+    The digest auth of the session is replaced by a ``SharedDigestAuth``.
+    """
+    session = getattr(fc, "session", None)
+    if session is None:
+        return None
+    adapter = TransportAdapter(resolver=resolver)
+    adapter.session = session
+    if isinstance(session.auth, HTTPDigestAuth):
+        session.auth = adapter.auth = SharedDigestAuth.from_auth(session.auth)
+    for prefix in ("http://", "https://"):
+        previous = session.adapters.get(prefix)
+        session.mount(prefix, adapter)
+        if previous is not None:
+            previous.close()
+    return adapter
+
+
+def transport_of(fc: Any) -> TransportAdapter | None:  # noqa: ANN401
+    """The ``TransportAdapter`` of ``fc``, None for connections without one."""
+    adapters = getattr(getattr(fc, "session", None), "adapters", None)
+    if not isinstance(adapters, dict):
+        return None
+    return next((a for a in adapters.values() if isinstance(a, TransportAdapter)), None)
+
+
+def uses_tls(fc: Any) -> bool:  # noqa: ANN401
+    """Whether ``fc`` talks to its device over TLS."""
+    soaper = getattr(fc, "soaper", None)
+    return str(getattr(soaper, "address", "")).startswith("https://")
+
+
+class KeepAlive:
+    """Keeps the TR-064 connection of ``device`` open from a daemon thread.
+
+    The requests take a token from the rate limit of ``device``, if it has one.
+    """
+
+    def __init__(self, device: FritzDevice, interval: float = KEEP_ALIVE_INTERVAL) -> None:
+        self.device = device
+        self.interval = interval
+        self.sent = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def ping(self) -> None:
+        """Request the device description if the connection was idle for ``interval``."""
+        transport = self.device.transport
+        if transport is None or transport.session is None:
+            return
+        if not self.device.available or transport.idle() < self.interval:
+            return
+        soaper = self.device.fc.soaper
+        url = f"{soaper.address}:{soaper.port}{KEEP_ALIVE_PATH}"
+        if self.device.rate_limit is not None:
+            self.device.rate_limit.acquire()
+        try:
+            # Straight through the transport's session: a recording connection
+            # (--record-cassettes) must not fill its cassette with keep-alives.
+            transport.session.get(url, timeout=soaper.timeout).close()
+            self.sent += 1
+        except RequestException as err:
+            logger.debug("Keep-alive request to %s failed: %s", self.device.host, err)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.ping()
+            transport = self.device.transport
+            idle = transport.idle() if transport is not None else 0.0
+            self._stop.wait(max(self.interval - idle, _MIN_WAIT))
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name=f"keep-alive-{self.device.host}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
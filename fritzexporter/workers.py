@@ -0,0 +1,243 @@
+# Copyright 2019-2026 Patrick Dreker <patrick@dreker.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Sharded multi-process collection (``--workers N``).
+
+Parsing host tables, mesh JSON and AHA XML for hundreds of devices is CPU
+bound, so a single process is limited by the GIL. With ``--workers N`` the
+configured devices are split into N shards, each collected by its own
+``FritzCollector`` in a worker process. The front process keeps the
+HTTP server; on every scrape it asks all workers to collect in parallel,
+receives their metric families over a pipe and merges families of the same
+name into one ``/metrics`` response.
+
+Workers are started through a fork server, so restarting one while the
+front process runs its HTTP threads is safe. Shard builders therefore have
+to be picklable (module-level functions or ``functools.partial`` of them).
+
+A worker connects the devices of its shard before it reports ready; this does
+not count against the collection timeout. Scrapes leave out the shards of
+workers that are not ready yet, e.g. after a restart.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING
+
+from prometheus_client.core import Metric
+from prometheus_client.registry import Collector
+
+from fritzexporter.cassette import close_recordings, close_recordings_on_sigterm, recording
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.context import ForkServerProcess
+
+logger = logging.getLogger("fritzexporter.workers")
+
+DEFAULT_COLLECT_TIMEOUT = 120.0
+# How long starting waits for the workers to connect their devices.
+DEFAULT_START_TIMEOUT = 600.0
+
+_COLLECT = "collect"
+_READY = "ready"
+_STOP = "stop"
+
+
+def shard[T](items: Sequence[T], count: int) -> list[list[T]]:
+    """Split ``items`` round-robin into at most ``count`` non-empty shards."""
+    count = max(1, min(count, len(items)))
+    return [list(items[i::count]) for i in range(count)]
+
+
+def _serve(conn: Connection, build: Callable[[], Collector], log_level: int) -> None:
+    logging.getLogger("fritzexporter").setLevel(log_level)
+    try:
+        collector = build()
+        # Worker processes end without running the exit hooks that close recordings.
+        if recording():
+            close_recordings_on_sigterm()
+        conn.send(_READY)
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                return
+            if request == _STOP:
+                return
+            try:
+                conn.send(list(collector.collect()))
+            except Exception:
+                logger.exception("Worker failed to collect metrics")
+                conn.send([])
+    finally:
+        close_recordings()
+
+
+class Worker:
+    """One worker process collecting a shard of the devices."""
+
+    def __init__(self, index: int, build: Callable[[], Collector]) -> None:
+        self.index = index
+        self.build = build
+        self.process: ForkServerProcess | None = None
+        self.conn: Connection | None = None
+        self.ready = False
+
+    def start(self) -> None:
+        ctx = multiprocessing.get_context("forkserver")
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_serve,
+            args=(child_conn, self.build, logger.getEffectiveLevel()),
+            name=f"fritzexporter-worker-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.ready = False
+        logger.info("Started worker %d (pid %s)", self.index, self.process.pid)
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for the worker to have connected its devices."""
+        if not self.ready and self.conn is not None and self.conn.poll(timeout):
+            self.ready = self.conn.recv() == _READY
+        return self.ready
+
+    def request(self) -> None:
+        if self.conn is None:
+            msg = f"worker {self.index} is not running"
+            raise OSError(msg)
+        self.conn.send(_COLLECT)
+
+    def receive(self, timeout: float) -> list[Metric] | None:
+        """Return the worker's metric families, or None if it did not answer in time."""
+        if self.conn is None or not self.conn.poll(timeout):
+            return None
+        return self.conn.recv()
+
+    def stop(self) -> None:
+        if self.conn is not None:
+            with contextlib.suppress(OSError):
+                self.conn.send(_STOP)
+            self.conn.close()
+            self.conn = None
+        if self.process is not None:
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+
+    def restart(self) -> None:
+        logger.warning("Restarting worker %d", self.index)
+        if self.process is not None:
+            self.process.terminate()
+        self.stop()
+        self.start()
+
+
+class ShardedCollector(Collector):
+    """Collector merging the metric families of several worker processes.
+
+    ``builders`` are callables that each construct the collector for one
+    shard; they run inside the worker, so device connections are never
+    shared between processes. ``start`` waits up to ``start_timeout`` seconds
+    for all workers to be ready. The workers share one deadline of ``timeout``
+    seconds per collection; a worker that does not answer in time or has died
+    is restarted and its shard is missing until it is ready again.
+    """
+
+    def __init__(
+        self,
+        builders: Iterable[Callable[[], Collector]],
+        *,
+        timeout: float = DEFAULT_COLLECT_TIMEOUT,
+        start_timeout: float = DEFAULT_START_TIMEOUT,
+    ) -> None:
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.workers = [Worker(i, build) for i, build in enumerate(builders)]
+        self._collect_lock = threading.Lock()
+
+    def start(self) -> None:
+        for worker in self.workers:
+            worker.start()
+        deadline = time.monotonic() + self.start_timeout
+        for worker in self.workers:
+            try:
+                ready = worker.wait_ready(max(deadline - time.monotonic(), 0.0))
+            except EOFError, OSError:
+                logger.exception("Worker %d died while connecting its devices", worker.index)
+                worker.restart()
+                continue
+            if not ready:
+                logger.warning(
+                    "Worker %d is still connecting its devices after %ss",
+                    worker.index,
+                    self.start_timeout,
+                )
+
+    def stop(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+
+    def collect(self) -> Iterator[Metric]:
+        with self._collect_lock:
+            requested: list[Worker] = []
+            for worker in self.workers:
+                try:
+                    if not worker.wait_ready(0):
+                        logger.warning("Worker %d is still connecting its devices", worker.index)
+                        continue
+                    worker.request()
+                    requested.append(worker)
+                except EOFError, OSError:
+                    logger.exception("Worker %d is not reachable", worker.index)
+                    worker.restart()
+
+            shards: list[list[Metric]] = []
+            deadline = time.monotonic() + self.timeout
+            for worker in requested:
+                try:
+                    metrics = worker.receive(max(deadline - time.monotonic(), 0.0))
+                except EOFError, OSError:
+                    logger.exception("Worker %d died while collecting", worker.index)
+                    worker.restart()
+                    continue
+                if metrics is None:
+                    logger.error("Worker %d timed out after %ss", worker.index, self.timeout)
+                    worker.restart()
+                    continue
+                shards.append(metrics)
+
+        yield from merge_families(shards)
+
+
+def merge_families(shards: Iterable[Iterable[Metric]]) -> list[Metric]:
+    """Merge families of the same name from several collections, keeping first-seen order."""
+    merged: dict[str, Metric] = {}
+    for metrics in shards:
+        for metric in metrics:
+            existing = merged.get(metric.name)
+            if existing is None:
+                merged[metric.name] = metric
+            else:
+                existing.samples.extend(metric.samples)
+    return list(merged.values())
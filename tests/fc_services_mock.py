@@ -94,6 +94,12 @@ def call_action_mock(service, action, **kwargs):
         },
         ("WANCommonInterfaceConfig1", "GetTotalBytesReceived"): {"NewTotalBytesReceived": 1234567},
         ("WANCommonInterfaceConfig1", "GetTotalBytesSent"): {"NewTotalBytesSent": 234567},
+        ("WANCommonInterfaceConfig1", "X_AVM-DE_GetOnlineMonitor"): {
+            "NewTotalNumberSyncGroups": 1,
+            "NewSyncGroupName": "sync_dsl",
+            "Newds_current_bps": "1000,4000,2500,500",
+            "Newus_current_bps": "200,100,300,200",
+        },
         ("WANCommonIFC1", "GetAddonInfos"): {
             "NewByteReceiveRate": 12345,
             "NewByteSendRate": 23456,
@@ -619,6 +625,11 @@ fc_services_capabilities["WanCommonInterfaceDataBytes"] = {
         "GetTotalBytesReceived",
     ],
 }
+fc_services_capabilities["WanOnlineMonitor"] = {
+    "WANCommonInterfaceConfig1": [
+        "X_AVM-DE_GetOnlineMonitor",
+    ],
+}
 fc_services_capabilities["WanCommonInterfaceDataPackets"] = {
     "WANCommonInterfaceConfig1": [
         "GetTotalPacketsSent",
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from fritzexporter.capability_cache import capability_cache_path, load_capabilities
+from fritzexporter.fritzdevice import FritzCredentials, FritzDevice
+from fritzexporter.simulator import SimulatedDevice, dsl_router, start_simulator
+from fritzexporter.tr064_remote import ConnectionOptions
+
+USER = "monitor"
+PASSWORD = "secret"
+
+
+@pytest.fixture
+def server():
+    server = start_simulator(SimulatedDevice(dsl_router("DSL123"), user=USER, password=PASSWORD))
+    yield server
+    server.stop()
+
+
+def _device(server, cache_dir, **kwargs):
+    return FritzDevice(
+        FritzCredentials(server.host, USER, PASSWORD),
+        "sim",
+        connection=ConnectionOptions(port=server.port, cache_dir=str(cache_dir)),
+        **kwargs,
+    )
+
+
+def _present(device):
+    return {name: capa.state() for name, capa in device.capabilities.items()}
+
+
+class TestCapabilityCache:
+    def test_second_start_skips_detection(self, server, tmp_path):
+        first = _device(server, tmp_path)
+        detection_calls = sum(server.device.calls.values())
+        server.device.calls.clear()
+
+        second = _device(server, tmp_path)
+
+        assert capability_cache_path(str(tmp_path), server.host).is_file()
+        assert _present(second) == _present(first)
+        assert second.capabilities["WlanConfigurationInfo"].wifi_present[:2] == [True, True]
+        # Only DeviceInfo1/GetInfo for serial number and software version.
+        assert sum(server.device.calls.values()) == 1 < detection_calls
+
+    def test_changed_settings_detect_again(self, server, tmp_path):
+        _device(server, tmp_path)
+        server.device.calls.clear()
+
+        device = _device(server, tmp_path, host_info=True)
+
+        assert device.capabilities["HostInfo"].present
+        assert sum(server.device.calls.values()) > 1
+
+    def test_expired_or_broken_cache_is_ignored(self, tmp_path):
+        path = tmp_path / "capabilities_box.json"
+        key = {"serial": "ABC"}
+        path.write_text(json.dumps({"key": key, "created": 0, "capabilities": {}}))
+
+        assert load_capabilities(path, key) is None
+        assert load_capabilities(path, key, ttl=float("inf")) == {}
+        assert load_capabilities(path, {"serial": "DEF"}, ttl=float("inf")) is None
+
+        path.write_text("{not json")
+
+        assert load_capabilities(path, key) is None
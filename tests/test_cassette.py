@@ -0,0 +1,160 @@
+import gzip
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+from fritzconnection.core.exceptions import FritzConnectionException, FritzLookUpError
+from prometheus_client import CollectorRegistry, generate_latest
+
+from fritzexporter.cassette import ReplayConnection, cassette_path, unrecorded
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from fritzexporter.simulator import SimulatedDevice, dsl_router, start_simulator
+from fritzexporter.tr064_remote import ConnectionOptions
+
+USER = "monitor"
+PASSWORD = "secret"
+
+
+@pytest.fixture
+def server():
+    profile = dsl_router("DSL123", hosts=3)
+    profile.action_latency["DeviceInfo1/GetInfo"] = 0.1
+    server = start_simulator(SimulatedDevice(profile, user=USER, password=PASSWORD))
+    yield server
+    server.stop()
+
+
+def _device(host, connection):
+    return FritzDevice(
+        FritzCredentials(host, USER, PASSWORD), "sim", host_info=True, connection=connection
+    )
+
+
+def _scrape(device):
+    collector = FritzCollector()
+    collector.register(device)
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(collector)
+    return generate_latest(registry).decode()
+
+
+@pytest.fixture
+def cassette(server, tmp_path):
+    path = tmp_path / "box.jsonl.gz"
+    device = _device(server.host, ConnectionOptions(port=server.port, record_to=str(path)))
+    output = _scrape(device)
+    device.fc.close()
+    return path, output
+
+
+class TestCassette:
+    def test_replay_reproduces_recorded_scrape(self, cassette):
+        path, recorded = cassette
+
+        # An unroutable address: the replay must not contact any device.
+        replayed = _scrape(
+            _device("192.0.2.1", ConnectionOptions(replay_from=str(path), replay_speed=0))
+        )
+
+        assert 'fritz_host_active{friendly_name="sim",hostname="host-0002"' in replayed
+        assert 'peer="repeater-0"' in replayed
+        # Replays have no HTTP transport, hence no digest auth challenges.
+        recorded_lines = [
+            line for line in recorded.splitlines() if "fritz_device_auth_challenges" not in line
+        ]
+        assert replayed.count("\n") == len(recorded_lines)
+
+    def test_replay_keeps_timings_and_errors(self, cassette):
+        path, _ = cassette
+        replay = ReplayConnection(path)
+
+        start = time.monotonic()
+        info = replay.call_action("DeviceInfo1", "GetInfo")
+
+        assert time.monotonic() - start >= 0.1
+        assert info["NewModelName"] == "FRITZ!Box 7590"
+        assert "GetGenericHostEntry" in replay.services["Hosts1"].actions
+        with pytest.raises(FritzLookUpError):
+            replay.call_action(
+                "Hosts1", "X_AVM-DE_GetSpecificHostEntryByIP", NewIPAddress="0.0.0.0"
+            )
+
+    def test_replay_cycles_and_rejects_unrecorded_calls(self, cassette):
+        path, _ = cassette
+        replay = ReplayConnection(path, speed=0)
+
+        first = replay.call_action("Hosts1", "GetGenericHostEntry", arguments={"NewIndex": 2})
+        again = replay.call_action("Hosts1", "GetGenericHostEntry", NewIndex=2)
+
+        assert first == again
+        with pytest.raises(FritzConnectionException):
+            replay.call_action("Hosts1", "GetGenericHostEntry", NewIndex=99)
+
+    def test_unrecorded_calls_keep_replay_order_and_timing(self, cassette):
+        path, _ = cassette
+        replay = ReplayConnection(path)
+
+        start = time.monotonic()
+        with unrecorded():
+            info = replay.call_action("DeviceInfo1", "GetInfo")
+
+        assert time.monotonic() - start < 0.1
+        assert info["NewModelName"] == "FRITZ!Box 7590"
+        assert dict(replay._positions) == {}
+
+    def test_cassette_path(self):
+        assert cassette_path("/tmp/c", "https://fritz.box").name == "https___fritz.box.jsonl.gz"
+
+    def test_replays_truncated_cassette(self, cassette, tmp_path, caplog):
+        path, _ = cassette
+        complete = ReplayConnection(path, speed=0)
+        truncated = tmp_path / "truncated.jsonl.gz"
+        data = path.read_bytes()
+        truncated.write_bytes(data[: len(data) * 3 // 4])
+
+        replay = ReplayConnection(truncated, speed=0)
+
+        assert 0 < len(replay) < len(complete)
+        assert replay.services.keys() == complete.services.keys()
+        assert "is truncated" in caplog.text
+
+    def test_unreadable_cassette_is_a_connection_error(self, cassette, tmp_path):
+        path, _ = cassette
+        headless = tmp_path / "headless.jsonl.gz"
+        headless.write_bytes(path.read_bytes()[:20])
+
+        with pytest.raises(FritzConnectionException, match="Cannot read cassette"):
+            ReplayConnection(tmp_path / "missing.jsonl.gz")
+        with pytest.raises(FritzConnectionException, match="has no header"):
+            ReplayConnection(headless)
+
+    def test_sigterm_closes_recordings(self, tmp_path):
+        path = tmp_path / "box.jsonl.gz"
+        script = textwrap.dedent(
+            f"""
+            import os, signal, time
+            from types import SimpleNamespace
+            from fritzexporter.cassette import RecordingConnection, close_recordings_on_sigterm
+
+            fc = SimpleNamespace(
+                address="box", modelname="FRITZ!Box", system_version="7.57", services={{}},
+                session=None, call_action=lambda *args, **kwargs: {{"NewX": "1"}},
+            )
+            recording = RecordingConnection(fc, {str(path)!r})
+            recording.call_action("DeviceInfo1", "GetInfo")
+            close_recordings_on_sigterm()
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(10)
+            """
+        )
+
+        process = subprocess.run([sys.executable, "-c", script], check=False, timeout=30)
+
+        assert process.returncode == 128 + signal.SIGTERM
+        assert gzip.decompress(path.read_bytes()).count(b"\n") == 2
+        assert ReplayConnection(path, speed=0).call_action("DeviceInfo1", "GetInfo") == {
+            "NewX": "1"
+        }
@@ -0,0 +1,71 @@
+import logging
+
+from fritzexporter.circuit import BreakerState, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_consecutive_failures(self):
+        breaker = CircuitBreaker("box", threshold=3, cooldown=60, clock=FakeClock())
+
+        breaker.failure()
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        breaker.failure()
+
+        assert breaker.state is BreakerState.CLOSED
+        assert breaker.allow()
+
+        breaker.failure()
+
+        assert breaker.state is BreakerState.OPEN
+        assert not breaker.allow()
+
+    def test_half_opens_after_cooldown_and_closes_on_success(self, caplog):
+        caplog.set_level(logging.INFO)
+        clock = FakeClock()
+        breaker = CircuitBreaker("box", threshold=1, cooldown=60, clock=clock)
+        breaker.failure()
+
+        clock.now += 59
+        assert not breaker.allow()
+        clock.now += 1
+        assert breaker.allow()
+        assert breaker.state is BreakerState.HALF_OPEN
+
+        breaker.success()
+
+        assert breaker.state is BreakerState.CLOSED
+        assert breaker.failures == 0
+        assert "Circuit of box closed" in caplog.text
+
+    def test_failed_trial_reopens_for_another_cooldown(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("box", threshold=3, cooldown=60, clock=clock)
+        for _ in range(3):
+            breaker.failure()
+        clock.now += 60
+        assert breaker.allow()
+
+        breaker.failure()
+
+        assert breaker.state is BreakerState.OPEN
+        clock.now += 59
+        assert not breaker.allow()
+
+    def test_threshold_zero_never_opens(self):
+        breaker = CircuitBreaker("box", threshold=0, clock=FakeClock())
+
+        for _ in range(10):
+            breaker.failure()
+
+        assert breaker.allow()
+        assert breaker.state is BreakerState.CLOSED
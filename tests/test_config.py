@@ -170,6 +170,17 @@ class TestEnvConfig:
 
         assert config.devices[0].connection_timeout == 15
 
+    def test_rate_limit_env_config(self, monkeypatch):
+        monkeypatch.setenv("FRITZ_USERNAME", "SomeUserName")
+        monkeypatch.setenv("FRITZ_PASSWORD", "AnInterestingPassword")
+        monkeypatch.setenv("FRITZ_RATE_LIMIT", "2.5")
+        monkeypatch.setenv("FRITZ_RATE_BURST", "4")
+
+        config = get_config(None)
+
+        assert config.devices[0].rate_limit == 2.5
+        assert config.devices[0].rate_burst == 4
+
     def test_connection_timeout_env_zero_disables_timeout(self, monkeypatch):
         monkeypatch.setenv("FRITZ_USERNAME", "SomeUserName")
         monkeypatch.setenv("FRITZ_PASSWORD", "AnInterestingPassword")
@@ -427,6 +438,26 @@ class TestConfigEdgeCases:
                 connection_timeout=-1,
             )
 
+    def test_rate_limit_defaults_to_unlimited(self):
+        config = DeviceConfig(hostname="fritz.box", username="user", password="password")
+
+        assert config.rate_limit is None
+        assert config.rate_burst == 10
+
+    def test_rate_limit_zero_disables_limit(self):
+        config = DeviceConfig(
+            hostname="fritz.box", username="user", password="password", rate_limit=0
+        )
+        assert config.rate_limit is None
+
+    def test_rate_limit_must_not_be_negative(self):
+        with pytest.raises(ValueError):
+            DeviceConfig(hostname="fritz.box", username="user", password="password", rate_limit=-1)
+
+    def test_rate_burst_must_be_positive(self):
+        with pytest.raises(ValueError):
+            DeviceConfig(hostname="fritz.box", username="user", password="password", rate_burst=0)
+
     def test_connection_timeout_must_be_numeric(self):
         with pytest.raises(ValueError):
             DeviceConfig(
@@ -529,3 +560,83 @@ class TestWifiClientInfoConfig:
         monkeypatch.setenv("FRITZ_WIFI_CLIENT_INFO", "true")
         config = get_config(None)
         assert config.devices[0].wifi_client_info is True
+
+
+class TestScrapeCacheTtlConfig:
+    def test_scrape_cache_ttl_defaults_to_zero(self):
+        config = get_config("tests/conffiles/validconfig.yaml")
+
+        assert config.scrape_cache_ttl == 0
+
+    def test_scrape_cache_ttl_from_env(self, monkeypatch):
+        monkeypatch.setenv("FRITZ_USERNAME", "SomeUserName")
+        monkeypatch.setenv("FRITZ_PASSWORD", "AnInterestingPassword")
+        monkeypatch.setenv("FRITZ_SCRAPE_CACHE_TTL", "15")
+
+        config = get_config(None)
+
+        assert config.scrape_cache_ttl == 15
+
+    def test_scrape_cache_ttl_must_not_be_negative(self):
+        with pytest.raises(ValueError):
+            ExporterConfig.from_config(
+                {
+                    "scrape_cache_ttl": -1,
+                    "devices": [{"username": "user", "password": "pass"}],
+                }
+            )
+
+
+class TestProbeConfig:
+    def test_probe_mode_defaults(self):
+        config = get_config("tests/conffiles/validconfig.yaml")
+
+        assert config.probe_mode is False
+        assert config.probe_cache_size == 100
+        assert config.probe_idle_timeout == 600
+
+    def test_probe_settings_from_config(self):
+        config = ExporterConfig.from_config(
+            {
+                "probe_mode": "true",
+                "probe_cache_size": "10",
+                "probe_idle_timeout": 0,
+                "devices": [{"hostname": "fritz.box", "username": "user", "password": "pass"}],
+            }
+        )
+
+        assert config.probe_mode is True
+        assert config.probe_cache_size == 10
+        assert config.probe_idle_timeout == 0
+
+    def test_probe_settings_from_env(self, monkeypatch):
+        monkeypatch.setenv("FRITZ_USERNAME", "SomeUserName")
+        monkeypatch.setenv("FRITZ_PASSWORD", "AnInterestingPassword")
+        monkeypatch.setenv("FRITZ_PROBE_MODE", "true")
+        monkeypatch.setenv("FRITZ_PROBE_CACHE_SIZE", "10")
+        monkeypatch.setenv("FRITZ_PROBE_IDLE_TIMEOUT", "0")
+
+        config = get_config(None)
+
+        assert config.probe_mode is True
+        assert config.probe_cache_size == 10
+        assert config.probe_idle_timeout == 0
+
+    def test_probe_mode_env_defaults(self, monkeypatch):
+        monkeypatch.setenv("FRITZ_USERNAME", "SomeUserName")
+        monkeypatch.setenv("FRITZ_PASSWORD", "AnInterestingPassword")
+
+        config = get_config(None)
+
+        assert config.probe_mode is False
+        assert config.probe_cache_size == 100
+        assert config.probe_idle_timeout == 600
+
+    def test_probe_cache_size_must_be_positive(self):
+        with pytest.raises(ValueError):
+            ExporterConfig.from_config(
+                {
+                    "probe_cache_size": 0,
+                    "devices": [{"hostname": "fritz.box", "username": "user", "password": "pass"}],
+                }
+            )
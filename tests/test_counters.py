@@ -0,0 +1,97 @@
+from unittest.mock import MagicMock, patch
+
+from fritzexporter.counters import COUNTER_WRAP, MAX_WRAP_DELTA, CounterExtender
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+
+from .fc_services_mock import call_action_mock, create_fc_services, fc_services_capabilities
+
+
+class TestCounterExtender:
+    def test_values_pass_through_until_wrap(self):
+        counters = CounterExtender()
+
+        assert counters.extend("bytes", 100) == 100
+        assert counters.extend("bytes", "4000000000") == 4_000_000_000
+
+    def test_wrap_adds_counter_range(self):
+        counters = CounterExtender()
+        counters.extend("bytes", COUNTER_WRAP - 10)
+
+        assert counters.extend("bytes", 5) == COUNTER_WRAP + 5
+        assert counters.extend("bytes", 1000) == COUNTER_WRAP + 1000
+        counters.extend("bytes", COUNTER_WRAP - 1)
+        assert counters.extend("bytes", 0) == 2 * COUNTER_WRAP
+
+    def test_counters_are_independent(self):
+        counters = CounterExtender()
+        counters.extend("rx", COUNTER_WRAP - 1000)
+        counters.extend("tx", 1000)
+
+        assert counters.extend("rx", 10) == COUNTER_WRAP + 10
+        assert counters.extend("tx", 2000) == 2000
+
+    def test_restart_resets_instead_of_wrapping(self):
+        counters = CounterExtender()
+        counters.observe_uptime(5000)
+        counters.extend("bytes", 3_000_000_000)
+        counters.extend("bytes", 10)
+        counters.observe_uptime(5060)
+
+        counters.observe_uptime("30")
+
+        assert counters.extend("bytes", 20) == 20
+
+    def test_drop_from_small_value_is_a_reset(self):
+        counters = CounterExtender()
+        counters.extend("bytes", COUNTER_WRAP - 10)
+        counters.extend("bytes", 5000)
+
+        assert counters.extend("bytes", 10) == 10
+        assert counters.extend("bytes", 20) == 20
+
+    def test_drop_beyond_plausible_increase_is_a_reset(self):
+        counters = CounterExtender()
+        counters.extend("bytes", COUNTER_WRAP - 1000)
+
+        assert counters.extend("bytes", MAX_WRAP_DELTA) == MAX_WRAP_DELTA
+
+    def test_64bit_counter_going_down_is_a_reset(self):
+        counters = CounterExtender()
+        counters.extend("bytes", 10 * COUNTER_WRAP)
+
+        assert counters.extend("bytes", 10) == 10
+
+
+@patch("fritzexporter.tr064_remote.FritzConnection")
+class TestWrappedCounterMetrics:
+    def test_wan_bytes_stay_monotonic_across_wrap(self, mock_fritzconnection: MagicMock):
+        received = [COUNTER_WRAP - 1000, COUNTER_WRAP - 1000, 500]
+        fc = mock_fritzconnection.return_value
+
+        def call_action(service, action, **kwargs):
+            if action == "GetTotalBytesReceived":
+                return {"NewTotalBytesReceived": received.pop(0)}
+            return call_action_mock(service, action, **kwargs)
+
+        fc.call_action.side_effect = call_action
+        fc.services = create_fc_services(
+            {
+                **fc_services_capabilities["DeviceInfo"],
+                **fc_services_capabilities["WanCommonInterfaceDataBytes"],
+            }
+        )
+        collector = FritzCollector()
+        collector.register(
+            FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock")
+        )
+
+        def wan_rx():
+            metrics = {m.name: m for m in collector.collect()}
+            return next(
+                s.value
+                for s in metrics["fritz_wan_data_bytes"].samples
+                if s.labels["direction"] == "rx"
+            )
+
+        assert wan_rx() == COUNTER_WRAP - 1000
+        assert wan_rx() == COUNTER_WRAP + 500
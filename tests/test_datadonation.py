@@ -1,5 +1,9 @@
+import gzip
+import json
 import logging
-from unittest.mock import MagicMock, call, patch
+import threading
+import time
+from unittest.mock import ANY, MagicMock, call, patch
 
 import pytest
 import requests
@@ -11,6 +15,8 @@ from fritzconnection.core.exceptions import (
 )
 
 from fritzexporter.data_donation import (
+    DonationOptions,
+    collect_action_results,
     donate_data,
     get_sw_version,
     safe_call_action,
@@ -228,19 +234,26 @@ class TestDataDonation:
         assert mock_requests_post.call_count == 1
         assert mock_requests_post.call_args == call(
             "https://fritz.dreker.de/data/donate",
-            data='{"exporter_version": "develop", "fritzdevice": {"model": "Fritz!MockBox 9790", '
+            data=ANY,
+            headers={"Content-Type": "application/json"},timeout=10,
+        )
+        data = json.loads(mock_requests_post.call_args.kwargs["data"])
+        latency = data["fritzdevice"].pop("action_latency")
+        assert json.dumps(data) == (
+            '{"exporter_version": "develop", "fritzdevice": {"model": "Fritz!MockBox 9790", '
             '"os_version": "1.2", "services": {"Hosts1": ["GetHostNumberOfEntries"]}, '
             '"detected_capabilities": ["DeviceInfo", "HostNumberOfEntries", "UserInterface", '
             '"LanInterfaceConfig", "LanInterfaceConfigStatistics", "WanDSLInterfaceConfig", '
             '"WanDSLInterfaceConfigAVM", "WanFiberInterfaceConfig", "WanFiberGPONInfo", '
             '"WanFiberStatistics", "WanPPPConnectionStatus", "WanCommonInterfaceConfig", '
-            '"WanCommonInterfaceDataBytes", "WanCommonInterfaceByteRate", '
+            '"WanCommonInterfaceDataBytes", "WanCommonInterfaceByteRate", "WanOnlineMonitor", '
             '"WanCommonInterfaceDataPackets", "WlanConfigurationInfo", "WlanAssociatedDevices", '
             '"MeshTopology", "HostInfo", '
             '"HomeAutomation"], "action_results": {"Hosts1": {"GetHostNumberOfEntries": '
-            '{"NewHostNumberOfEntries": "3"}}}}}',
-            headers={"Content-Type": "application/json"},timeout=10,
+            '{"NewHostNumberOfEntries": "3"}}}}}'
         )
+        assert list(latency) == ["Hosts1"]
+        assert latency["Hosts1"]["GetHostNumberOfEntries"] >= 0
 
     @patch("fritzexporter.data_donation.requests.post")
     def test_should_produce_sensible_json_data_and_not_upload(
@@ -313,3 +326,147 @@ class TestDataDonation:
 
         # Check
         assert "did not return a donation id" in caplog.text
+
+    def test_should_collect_concurrently(self, mock_fritzconnection: MagicMock, caplog):
+        # Prepare
+        caplog.set_level(logging.INFO)
+        in_flight = []
+        lock = threading.Lock()
+
+        def slow_call_action(service, action, **_):
+            with lock:
+                in_flight.append(1)
+                peak = len(in_flight)
+            time.sleep(0.1)
+            with lock:
+                in_flight.pop()
+            return {"NewPeak": peak}
+
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_capabilities["HostNumberOfEntries"])
+        fd = FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock", host_info=False)
+        fc.call_action.side_effect = slow_call_action
+        calls = [(f"Service{i}", "GetInfo") for i in range(8)]
+
+        # Act
+        start = time.monotonic()
+        results, latencies = collect_action_results(fd, calls, concurrency=4)
+
+        # Check
+        assert time.monotonic() - start < 0.5
+        assert list(results) == calls
+        assert max(result["NewPeak"] for result in results.values()) == 4
+        assert all(latency >= 0.1 for latency in latencies.values())
+        assert "Collected 8 of 8 actions from somehost" in caplog.text
+
+    def test_should_honor_time_budget(self, mock_fritzconnection: MagicMock, caplog):
+        # Prepare
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_capabilities["HostNumberOfEntries"])
+        fd = FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock", host_info=False)
+        fc.call_action.side_effect = lambda service, action, **_: time.sleep(
+            0.5 if service == "Slow1" else 0
+        ) or {"NewValue": 1}
+
+        # Act
+        results, latencies = collect_action_results(
+            fd, [("Fast1", "GetInfo"), ("Slow1", "GetInfo")], time_budget=0.2
+        )
+
+        # Check
+        assert results[("Fast1", "GetInfo")] == {"NewValue": 1}
+        assert results[("Slow1", "GetInfo")] == {"error": "<TIME_BUDGET_EXCEEDED>"}
+        assert list(latencies) == [("Fast1", "GetInfo")]
+        assert "Time budget of 0.2s exceeded, 1 of 2 actions" in caplog.text
+
+    def test_should_stream_sanitized_ndjson(self, mock_fritzconnection: MagicMock, capsys):
+        # Prepare
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_capabilities["HostNumberOfEntries"])
+        fd = FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock", host_info=False)
+        fc.services = create_fc_services({"Hosts1": ["GetHostNumberOfEntries", "X_AVM-DE_GetMeshListPath"], "Time1": ["GetInfo"]})
+        fc.call_action.side_effect = lambda service, action, **_: {
+            ("Hosts1", "GetHostNumberOfEntries"): {"NewHostNumberOfEntries": 3},
+            ("Time1", "GetInfo"): {"NewNTPServer1": "ntp.example.org", "NewLocalTimeZone": "CET"},
+        }.get((service, action), {"NewSoftwareVersion": "1.2"})
+
+        # Act
+        donate_data(fd, sanitation=[["Hosts1", "GetHostNumberOfEntries"]], options=DonationOptions(stream=True))
+
+        # Check
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert records[0]["model"] == "Fritz!MockBox 9790"
+        assert records[0]["services"]["Time1"] == ["GetInfo"]
+        actions = {(r["service"], r["action"]): r for r in records[1:]}
+        assert set(actions) == {("Hosts1", "GetHostNumberOfEntries"), ("Time1", "GetInfo")}
+        assert actions[("Hosts1", "GetHostNumberOfEntries")]["result"] == {
+            "NewHostNumberOfEntries": "<SANITIZED>"
+        }
+        assert actions[("Time1", "GetInfo")]["result"] == {
+            "NewNTPServer1": "<SANITIZED>",
+            "NewLocalTimeZone": "CET",
+        }
+        assert actions[("Time1", "GetInfo")]["latency"] >= 0
+
+    @patch("fritzexporter.data_donation.requests.post")
+    def test_should_upload_gzipped_ndjson_stream(
+        self, mock_requests_post: MagicMock, mock_fritzconnection: MagicMock, caplog
+    ):
+        # Prepare
+        caplog.set_level(logging.INFO)
+        uploaded = []
+
+        def post(url, data, headers, timeout):
+            uploaded.extend(data)
+            return MockResponse({"donation_id": "1234"}, 200)
+
+        mock_requests_post.side_effect = post
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_capabilities["HostNumberOfEntries"])
+        fd = FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock", host_info=False)
+
+        # Act
+        donate_data(
+            fd, upload=True, options=DonationOptions(stream=True, url="https://donate.example/")
+        )
+
+        # Check
+        assert mock_requests_post.call_args.args == ("https://donate.example/",)
+        assert mock_requests_post.call_args.kwargs["headers"] == {
+            "Content-Type": "application/x-ndjson",
+            "Content-Encoding": "gzip",
+        }
+        lines = gzip.decompress(b"".join(uploaded)).decode().splitlines()
+        assert json.loads(lines[0])["services"] == {"Hosts1": ["GetHostNumberOfEntries"]}
+        assert json.loads(lines[1])["result"] == {"NewHostNumberOfEntries": "3"}
+        assert "registered under id 1234" in caplog.text
+
+    @patch("fritzexporter.data_donation.requests.post")
+    def test_should_upload_json_to_default_server_when_streaming(
+        self, mock_requests_post: MagicMock, mock_fritzconnection: MagicMock
+    ):
+        # Prepare
+        mock_requests_post.return_value = MockResponse({"donation_id": "1234"}, 200)
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_capabilities["HostNumberOfEntries"])
+        fd = FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock", host_info=False)
+
+        # Act
+        donate_data(fd, upload=True, options=DonationOptions(stream=True))
+
+        # Check
+        assert mock_requests_post.call_args == call(
+            "https://fritz.dreker.de/data/donate",
+            data=ANY,
+            headers={"Content-Type": "application/json"},
+            timeout=10,
+        )
+        data = json.loads(mock_requests_post.call_args.kwargs["data"])
+        assert data["fritzdevice"]["action_results"] == {
+            "Hosts1": {"GetHostNumberOfEntries": {"NewHostNumberOfEntries": "3"}}
+        }
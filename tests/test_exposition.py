@@ -0,0 +1,243 @@
+import gzip
+import threading
+import time
+import urllib.request
+
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, InfoMetricFamily
+
+from fritzexporter.exposition import (
+    TEXT_CONTENT_TYPE,
+    ExpositionCache,
+    FamilyRenderer,
+    gzip_accepted,
+    restricted,
+    start_http_server,
+)
+
+OPENMETRICS = "application/openmetrics-text;version=1.0.0;q=0.5,text/plain;version=0.0.4;q=0.3"
+
+
+class CountingCollector:
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def collect(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        m = GaugeMetricFamily("fritz_test", "Test metric", labels=["serial"])
+        m.add_metric(["1234"], self.calls)
+        yield m
+
+
+def _registry(collector):
+    registry = CollectorRegistry()
+    registry.register(collector)
+    return registry
+
+
+class TestExpositionCache:
+    def test_renders_each_scrape_without_ttl(self):
+        collector = CountingCollector()
+        cache = ExpositionCache(_registry(collector))
+
+        first = cache.snapshot()
+        second = cache.snapshot()
+
+        assert collector.calls == 2
+        assert second.generation == first.generation + 1
+        assert b'fritz_test{serial="1234"} 2.0' in second.body
+
+    def test_reuses_snapshot_within_ttl(self):
+        collector = CountingCollector()
+        cache = ExpositionCache(_registry(collector), max_age=60)
+
+        first = cache.snapshot()
+        second = cache.snapshot()
+
+        assert collector.calls == 1
+        assert second is first
+
+    def test_gzip_body_is_compressed_once(self):
+        cache = ExpositionCache(_registry(CountingCollector()), max_age=60)
+
+        snapshot = cache.snapshot()
+
+        assert gzip.decompress(snapshot.gzipped()) == snapshot.body
+        assert snapshot.gzipped() is snapshot.gzipped()
+
+    def test_concurrent_scrapes_are_coalesced(self):
+        collector = CountingCollector(delay=0.2)
+        cache = ExpositionCache(_registry(collector))
+        results = []
+
+        def scrape():
+            results.append(cache.snapshot())
+
+        threads = [threading.Thread(target=scrape) for _ in range(5)]
+        for t in threads:
+            t.start()
+            time.sleep(0.01)
+        for t in threads:
+            t.join()
+
+        assert collector.calls < 5
+        assert len({r.generation for r in results}) == collector.calls
+
+    def test_failed_render_is_not_cached(self):
+        class FailingOnce(CountingCollector):
+            def collect(self):
+                if self.calls == 0:
+                    self.calls += 1
+                    raise RuntimeError("boom")
+                yield from super().collect()
+
+        collector = FailingOnce()
+        cache = ExpositionCache(_registry(collector), max_age=60)
+
+        try:
+            cache.snapshot()
+        except RuntimeError:
+            pass
+
+        assert b"fritz_test" in cache.snapshot().body
+
+
+class TestGzipAccepted:
+    def test_plain_gzip(self):
+        assert gzip_accepted("gzip")
+
+    def test_gzip_in_list_with_quality(self):
+        assert gzip_accepted("identity, gzip;q=0.5")
+
+    def test_no_gzip(self):
+        assert not gzip_accepted("identity, deflate")
+
+
+class TestNegotiation:
+    def test_openmetrics_is_rendered_once_per_snapshot(self):
+        cache = ExpositionCache(_registry(CountingCollector()), max_age=60)
+        snapshot = cache.snapshot()
+
+        content_type, body = snapshot.encoded(OPENMETRICS)
+
+        assert content_type.startswith("application/openmetrics-text")
+        assert body.endswith(b"# EOF\n")
+        assert snapshot.encoded(OPENMETRICS)[1] is body
+        assert gzip.decompress(snapshot.gzipped(OPENMETRICS)) == body
+        assert snapshot.encoded("") == (TEXT_CONTENT_TYPE, snapshot.body)
+
+    def test_restricted_keeps_named_samples(self):
+        counter = CounterMetricFamily("fritz_test_bytes", "Test counter", labels=["serial"])
+        counter.add_metric(["1234"], 5)
+        families = [counter, *CountingCollector().collect()]
+
+        (family,) = restricted(families, ["fritz_test_bytes_total"])
+
+        assert family.name == "fritz_test_bytes"
+        assert [s.name for s in family.samples] == ["fritz_test_bytes_total"]
+
+
+class TestHttpServer:
+    def test_serves_plain_and_gzip_bodies(self):
+        httpd, _ = start_http_server(0, "127.0.0.1", _registry(CountingCollector()), max_age=60)
+        port = httpd.server_address[1]
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                plain = resp.read()
+                assert resp.headers["Content-Type"].startswith("text/plain")
+
+            req = urllib.request.Request(
+                f"http://127.0.0.1:{port}/metrics", headers={"Accept-Encoding": "gzip"}
+            )
+            with urllib.request.urlopen(req) as resp:
+                assert resp.headers["Content-Encoding"] == "gzip"
+                assert gzip.decompress(resp.read()) == plain
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+
+    def test_negotiates_format_and_filters_names(self):
+        collector = CountingCollector()
+        httpd, _ = start_http_server(0, "127.0.0.1", _registry(collector), max_age=60)
+        url = f"http://127.0.0.1:{httpd.server_address[1]}"
+        try:
+            req = urllib.request.Request(f"{url}/metrics", headers={"Accept": OPENMETRICS})
+            with urllib.request.urlopen(req) as resp:
+                assert resp.headers["Content-Type"].startswith("application/openmetrics-text")
+                assert resp.headers["Vary"] == "Accept, Accept-Encoding"
+                assert resp.read().endswith(b"# EOF\n")
+
+            with urllib.request.urlopen(f"{url}/?name[]=fritz_other") as resp:
+                assert resp.headers["Content-Type"] == TEXT_CONTENT_TYPE
+                assert b"fritz_test" not in resp.read()
+
+            with pytest.raises(urllib.error.HTTPError) as err:
+                urllib.request.urlopen(f"{url}/favicon.ico")
+            assert err.value.code == 404
+            with pytest.raises(urllib.error.HTTPError) as err:
+                urllib.request.urlopen(f"{url}/metricz")
+            assert err.value.code == 404
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+        assert collector.calls == 1
+
+
+class ChangingCollector:
+    """Yields a gauge, a counter and an info family with values that change per collect."""
+
+    def __init__(self):
+        self.calls = 0
+        self.serials = ["1234", "5678"]
+
+    def collect(self):
+        self.calls += 1
+        gauge = GaugeMetricFamily("fritz_test_gauge", "Test gauge", labels=["serial", "note"])
+        for serial in self.serials:
+            gauge.add_metric([serial, 'quote " and \\ backslash'], 1.5)
+        yield gauge
+        counter = CounterMetricFamily("fritz_test_bytes", "Test counter", labels=["serial"])
+        for serial in self.serials:
+            counter.add_metric([serial], self.calls * 1e21)
+        yield counter
+        yield InfoMetricFamily("fritz_test", "Test info", value={"serial": "1234"})
+
+
+class TestFamilyRenderer:
+    def test_output_matches_generate_latest(self):
+        collector = ChangingCollector()
+        registry = _registry(collector)
+        renderer = FamilyRenderer()
+
+        for serials in (["1234", "5678"], ["1234", "5678"], ["5678", "9999"], []):
+            collector.serials = serials
+            rendered = renderer.render(registry)
+            collector.calls -= 1  # generate_latest must see the same values
+            assert rendered == generate_latest(registry)
+
+    def test_unchanged_family_text_is_reused(self):
+        collector = ChangingCollector()
+        registry = _registry(collector)
+        renderer = FamilyRenderer()
+
+        renderer.render(registry)
+        gauge_text = renderer._families["fritz_test_gauge"].text
+        renderer.render(registry)
+
+        assert renderer._families["fritz_test_gauge"].text is gauge_text
+
+    def test_removed_family_is_dropped(self):
+        collector = CountingCollector()
+        registry = _registry(collector)
+        renderer = FamilyRenderer()
+        renderer.render(registry)
+
+        registry.unregister(collector)
+        renderer.render(registry)
+
+        assert renderer._families == {}
@@ -13,7 +13,13 @@ from prometheus_client import CollectorRegistry, generate_latest
 from prometheus_client.core import Metric
 
 from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
-from fritzexporter.fritzcapabilities import FritzCapabilities
+from fritzexporter.fritzcapabilities import (
+    FritzCapabilities,
+    FritzCapability,
+    MetricSpec,
+    SampleSpec,
+    SpecCapability,
+)
 
 from .fc_services_mock import (
     call_action_mock,
@@ -54,7 +60,7 @@ class TestFritzCapabilitiesMethods:
         num_caps = len(fd.capabilities)
 
         # Check
-        assert num_caps == 20  # All known capabilities
+        assert num_caps == 21  # All known capabilities
 
     def test_empty_capabilities_is_true_when_all_absent(self, mock_fritzconnection: MagicMock):
         # Prepare - use an empty service set so no capability is present
@@ -663,3 +669,139 @@ class TestWanCommonInterfaceByteRateCableWan:
         registry = CollectorRegistry()
         registry.register(collector)
         generate_latest(registry)
+
+
+@patch("fritzexporter.tr064_remote.FritzConnection")
+class TestWanOnlineMonitorCapability:
+    def _register(self, mock_fritzconnection: MagicMock) -> FritzCollector:
+        fc = mock_fritzconnection.return_value
+        fc.services = create_fc_services(
+            {
+                **fc_services_capabilities["DeviceInfo"],
+                **fc_services_capabilities["WanOnlineMonitor"],
+            }
+        )
+        collector = FritzCollector()
+        device = FritzDevice(
+            FritzCredentials("somehost", "someuser", "password"),
+            "FritzMonitor",
+            host_info=False,
+        )
+        collector.register(device)
+        return collector
+
+    def test_peak_and_average_over_history(self, mock_fritzconnection: MagicMock):
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        collector = self._register(mock_fritzconnection)
+
+        by_name = {m.name: m for m in collector.collect()}
+
+        rx = (("direction", "rx"), ("friendly_name", "FritzMonitor"), ("serial", "1234567890"))
+        tx = (("direction", "tx"), ("friendly_name", "FritzMonitor"), ("serial", "1234567890"))
+        peak = _sample_map(by_name["fritz_wan_monitor_datarate_peak_bytes"])
+        average = _sample_map(by_name["fritz_wan_monitor_datarate_average_bytes"])
+        assert peak[rx] == 4000
+        assert peak[tx] == 300
+        assert average[rx] == 2000
+        assert average[tx] == 200
+        fc.call_action.assert_any_call(
+            "WANCommonInterfaceConfig1",
+            "X_AVM-DE_GetOnlineMonitor",
+            arguments={"NewSyncGroupIndex": 0},
+        )
+
+    def test_disabled_when_action_rejects_call(self, mock_fritzconnection: MagicMock):
+        fc = mock_fritzconnection.return_value
+
+        def call_action_no_monitor(service, action, **kwargs):
+            if action == "X_AVM-DE_GetOnlineMonitor":
+                raise FritzArgumentError("Invalid Args")
+            return call_action_mock(service, action, **kwargs)
+
+        fc.call_action.side_effect = call_action_no_monitor
+        collector = self._register(mock_fritzconnection)
+
+        assert not collector.devices[0].capabilities["WanOnlineMonitor"].present
+
+
+class LanSpec(SpecCapability, register=False):
+    metric_specs = (
+        MetricSpec("status", "fritz_test_status", "Test status", ("state",)),
+        MetricSpec("kbytes", "fritz_test_received", "Test bytes", ("direction",), "kbytes"),
+        MetricSpec("info", "fritz_test_info", "Test info", ("status",), counter=True),
+    )
+    sample_specs = (
+        SampleSpec(
+            "LANEthernetInterfaceConfig1", "GetInfo", "NewStatus", "status", ("{NewStatus}",), match="Up"
+        ),
+        SampleSpec(
+            "LANEthernetInterfaceConfig1",
+            "GetStatistics",
+            "NewBytesReceived",
+            "kbytes",
+            ("rx",),
+            divisor=1000,
+        ),
+        SampleSpec("LANEthernetInterfaceConfig1", "GetInfo", None, "info", ("{NewStatus}",)),
+    )
+
+
+class LanPacketsSpec(SpecCapability, register=False):
+    metric_specs = (MetricSpec("packets", "fritz_test_packets", "Test packets"),)
+    sample_specs = (
+        SampleSpec("LANEthernetInterfaceConfig1", "GetStatistics", "NewPacketsReceived", "packets"),
+    )
+
+
+@patch("fritzexporter.tr064_remote.FritzConnection")
+class TestSpecCapability:
+    def _device(self, mock_fritzconnection: MagicMock) -> FritzDevice:
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+        return FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock")
+
+    def test_specs_are_not_registered(self, mock_fritzconnection: MagicMock):
+        assert SpecCapability not in FritzCapability.subclasses
+        assert LanSpec not in FritzCapability.subclasses
+
+    def test_requirements_from_specs(self, mock_fritzconnection: MagicMock):
+        assert LanSpec().requirements == [
+            ("LANEthernetInterfaceConfig1", "GetInfo"),
+            ("LANEthernetInterfaceConfig1", "GetStatistics"),
+        ]
+
+    def test_samples_from_specs(self, mock_fritzconnection: MagicMock):
+        device = self._device(mock_fritzconnection)
+        capa = LanSpec()
+        capa.create_metrics()
+
+        capa._generate_metric_values(device)
+
+        by_name = {m.name: m for m in capa._get_metric_values()}
+        status = by_name["fritz_test_status"].samples[0]
+        assert status.labels == {"serial": "1234567890", "friendly_name": "FritzMock", "state": "Up"}
+        assert status.value == 1
+        assert by_name["fritz_test_received_kbytes"].samples[0].value == pytest.approx(1.234)
+        assert by_name["fritz_test_info"].samples[0].value == 1
+        assert by_name["fritz_test_info"].samples[0].labels["status"] == "Up"
+
+    def test_shared_action_called_once_per_collection(self, mock_fritzconnection: MagicMock):
+        device = self._device(mock_fritzconnection)
+        collector = FritzCollector()
+        collector.register(device)
+        fc = mock_fritzconnection.return_value
+        list(collector.collect())
+        fc.call_action.reset_mock()
+
+        for capa in (LanSpec(), LanPacketsSpec()):
+            capa.create_metrics()
+            capa._generate_metric_values(device)
+
+        statistics = [c for c in fc.call_action.call_args_list if c.args[1] == "GetStatistics"]
+        assert statistics == []  # already called by LanInterfaceConfigStatistics
+
+        list(collector.collect())
+        statistics = [c for c in fc.call_action.call_args_list if c.args[1] == "GetStatistics"]
+        assert len(statistics) == 1
@@ -15,6 +15,7 @@ from prometheus_client.core import Metric
 from fritzexporter.exceptions import FritzDeviceHasNoCapabilitiesError
 from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
 from fritzexporter.fritz_aha import parse_aha_devicelist_xml
+from fritzexporter.resolver import HostResolver
 from fritzexporter.tr064_remote import ConnectionOptions
 
 from .fc_services_mock import (
@@ -320,6 +321,7 @@ class TestFritzCollector:
             "WanCommonInterfaceConfig",
             "WanCommonInterfaceDataBytes",
             "WanCommonInterfaceByteRate",
+            "WanOnlineMonitor",
             "WanCommonInterfaceDataPackets",
             "WlanConfigurationInfo",
             "WlanAssociatedDevices",
@@ -347,6 +349,24 @@ class TestFritzCollector:
         assert len(collector.devices) == 1
         assert device is collector.devices[0]
 
+    def test_should_unregister_device_from_collector(self, mock_fritzconnection: MagicMock):
+        # Prepare
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+
+        collector = FritzCollector()
+        collector.register(FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock"))
+        collector.register(FritzDevice(FritzCredentials("otherhost", "someuser", "password"), "FritzMock"))
+        collector.register_offline(FritzCredentials("somehost", "someuser", "password"), "FritzMock")
+
+        # Act
+        collector.unregister("somehost")
+
+        # Check
+        assert [dev.host for dev in collector.devices] == ["otherhost"]
+        assert collector.offline_devices == []
+
     def test_should_collect_metrics_from_device(self, mock_fritzconnection: MagicMock, caplog):
         # Prepare
         caplog.set_level(logging.DEBUG)
@@ -638,6 +658,129 @@ class TestFritzCollector:
         assert len(collector.devices) == 1
         assert len(collector.offline_devices) == 0
 
+    def test_should_skip_previously_unavailable_device_refusing_connections(
+        self, mock_fritzconnection: MagicMock, caplog
+    ):
+        # Prepare: device went down in the previous collection and now refuses connections
+        caplog.set_level(logging.DEBUG)
+
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.call_http.side_effect = call_http_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+
+        collector = FritzCollector()
+        device = FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock", host_info=False)
+        collector.register(device)
+        device.available = False
+        device.endpoint = ("127.0.0.1", 49000)
+        calls_before = fc.call_action.call_count
+
+        # Act
+        with patch(
+            "fritzexporter.fritzdevice.unreachable_endpoints", return_value={("127.0.0.1", 49000)}
+        ) as preflight:
+            metrics: list[Metric] = list(collector.collect())
+
+        # Check: no TR-064 traffic to the dead device, reported unreachable
+        preflight.assert_called_once_with([("127.0.0.1", 49000)], collector.preflight_timeout, {})
+        assert fc.call_action.call_count == calls_before
+        reachable = [m for m in metrics if m.name == "fritz_device_reachable"]
+        assert reachable[0].samples[0].value == 0.0
+
+        # Act: the box accepts connections again
+        with patch("fritzexporter.fritzdevice.unreachable_endpoints", return_value=set()):
+            metrics = list(collector.collect())
+
+        # Check
+        reachable = [m for m in metrics if m.name == "fritz_device_reachable"]
+        assert reachable[0].samples[0].value == 1.0
+        assert fc.call_action.call_count > calls_before
+
+    def test_should_not_preflight_available_devices(self, mock_fritzconnection: MagicMock):
+        # Prepare
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.call_http.side_effect = call_http_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+        collector = FritzCollector()
+        collector.register(
+            FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock")
+        )
+
+        # Act
+        with patch("fritzexporter.fritzdevice.unreachable_endpoints") as preflight:
+            list(collector.collect())
+
+        # Check
+        preflight.assert_not_called()
+
+    def test_should_not_retry_offline_device_refusing_connections(
+        self, mock_fritzconnection: MagicMock
+    ):
+        # Prepare
+        collector = FritzCollector()
+        resolver = HostResolver()
+        collector.register_offline(
+            FritzCredentials("offlinehost", "user", "pass"),
+            "OfflineDevice",
+            connection=ConnectionOptions(use_tls=True, resolver=resolver),
+        )
+
+        # Act
+        with patch(
+            "fritzexporter.fritzdevice.unreachable_endpoints",
+            return_value={("offlinehost", 49443)},
+        ) as preflight:
+            list(collector.collect())
+
+        # Check: resolved through the device's resolver
+        preflight.assert_called_once_with(
+            [("offlinehost", 49443)], collector.preflight_timeout, {"offlinehost": resolver}
+        )
+        mock_fritzconnection.assert_not_called()
+        assert len(collector.offline_devices) == 1
+
+    def test_should_stop_contacting_device_behind_open_circuit(
+        self, mock_fritzconnection: MagicMock, caplog
+    ):
+        # Prepare
+        caplog.set_level(logging.DEBUG)
+
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.call_http.side_effect = call_http_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+
+        collector = FritzCollector(preflight_timeout=0, breaker_threshold=2, breaker_cooldown=60)
+        device = FritzDevice(FritzCredentials("somehost", "someuser", "password"), "FritzMock", host_info=False)
+        collector.register(device)
+        fc.call_action.side_effect = FritzConnectionException("device unreachable")
+
+        # Act: two failed collections open the circuit
+        list(collector.collect())
+        metrics: list[Metric] = list(collector.collect())
+        calls = fc.call_action.call_count
+        metrics_open: list[Metric] = list(collector.collect())
+
+        # Check
+        circuit = [m for m in metrics if m.name == "fritz_device_circuit_state"]
+        assert circuit[0].samples[0].value == 1.0
+        assert fc.call_action.call_count == calls
+        reachable = [m for m in metrics_open if m.name == "fritz_device_reachable"]
+        assert reachable[0].samples[0].value == 0.0
+
+        # Act: after the cool-down a successful trial closes the circuit
+        collector.breaker("somehost").cooldown = 0
+        fc.call_action.side_effect = call_action_mock
+        metrics = list(collector.collect())
+
+        # Check
+        circuit = [m for m in metrics if m.name == "fritz_device_circuit_state"]
+        assert circuit[0].samples[0].value == 0.0
+        reachable = [m for m in metrics if m.name == "fritz_device_reachable"]
+        assert reachable[0].samples[0].value == 1.0
+
     def test_register_offline_preserves_connection_timeout(self, mock_fritzconnection: MagicMock):
         # Prepare
         collector = FritzCollector()
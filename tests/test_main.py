@@ -5,6 +5,7 @@ import pytest
 from fritzconnection.core.exceptions import FritzConnectionException
 
 from fritzexporter.__main__ import main, parse_cmdline
+from fritzexporter.fritzdevice import FritzCollector
 
 from .fc_services_mock import call_action_mock, create_fc_services, fc_services_devices
 
@@ -40,6 +41,15 @@ class Test_Main:
 
         assert "donate_data" in args
 
+    def test_cli_args_donation_url(self, monkeypatch):
+        monkeypatch.setattr(
+            "sys.argv", ["fritzexporter", "--upload-data", "--donation-url", "https://donate.example/"]
+        )
+
+        args = parse_cmdline()
+
+        assert args.donation_url == "https://donate.example/"
+
     def test_cli_args_sanitize(self, monkeypatch):
         monkeypatch.setattr(
             "sys.argv",
@@ -51,6 +61,44 @@ class Test_Main:
         assert "sanitize" in args
         assert args.sanitize == [["FOO", "BAR"], ["FOOBAR", "BLABLA", "SOMETHING"]]
 
+    def test_cli_args_workers(self, monkeypatch):
+        monkeypatch.setattr("sys.argv", ["fritzexporter", "--workers", "4"])
+
+        args = parse_cmdline()
+
+        assert args.workers == 4
+
+    def test_cli_args_cassettes(self, monkeypatch):
+        monkeypatch.setattr(
+            "sys.argv", ["fritzexporter", "--replay-cassettes", "/tmp/c", "--replay-speed", "0"]
+        )
+
+        args = parse_cmdline()
+
+        assert args.replay_cassettes == "/tmp/c"
+        assert args.record_cassettes is None
+        assert args.replay_speed == 0
+
+    def test_cli_args_remote_write(self, monkeypatch):
+        monkeypatch.setattr(
+            "sys.argv",
+            ["fritzexporter", "--remote-write", "http://prom/api/v1/write", "--remote-write-batch", "2"],
+        )
+
+        args = parse_cmdline()
+
+        assert args.remote_write == "http://prom/api/v1/write"
+        assert args.remote_write_batch == 2
+        assert args.remote_write_spool is None
+
+    def test_cli_args_once(self, monkeypatch):
+        monkeypatch.setattr("sys.argv", ["fritzexporter", "--once", "--cache-dir", "/tmp/c"])
+
+        args = parse_cmdline()
+
+        assert args.once == "-"
+        assert args.cache_dir == "/tmp/c"
+
     def test_cli_args_version(self, monkeypatch):
         monkeypatch.setattr("sys.argv", ["fritzexporter", "--version"])
 
@@ -108,6 +156,52 @@ class Test_Main:
             if log.name.startswith("fritzexporter"):
                 assert log.level == logging.DEBUG
 
+    @patch("prometheus_client.core.REGISTRY.register")
+    @patch("fritzexporter.__main__.start_http_server")
+    @patch("fritzexporter.tr064_remote.FritzConnection")
+    def test_once_writes_textfile_and_exits(
+        self, mock_fc: MagicMock, mock_server: MagicMock, mock_registry: MagicMock, monkeypatch, tmp_path
+    ):
+        output = tmp_path / "fritz.prom"
+        monkeypatch.setattr(
+            "sys.argv",
+            ["fritzexporter", "--config", "tests/conffiles/validconfig.yaml", "--once", str(output)],
+        )
+
+        fc = mock_fc.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+
+        main()
+
+        text = output.read_text()
+        assert "fritz_device_reachable" in text
+        assert "process_cpu_seconds_total" not in text
+        assert [p.name for p in tmp_path.iterdir()] == ["fritz.prom"]
+        mock_server.assert_not_called()
+
+    @patch("fritzexporter.__main__.start_http_server")
+    @patch("fritzexporter.tr064_remote.FritzConnection")
+    def test_once_collects_once(
+        self, mock_fc: MagicMock, mock_server: MagicMock, monkeypatch, tmp_path
+    ):
+        output = tmp_path / "fritz.prom"
+        monkeypatch.setattr(
+            "sys.argv",
+            ["fritzexporter", "--config", "tests/conffiles/validconfig.yaml", "--once", str(output)],
+        )
+        fc = mock_fc.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+
+        with patch.object(
+            FritzCollector, "collect", autospec=True, side_effect=FritzCollector.collect
+        ) as collect:
+            main()
+
+        assert collect.call_count == 1
+        assert "fritz_device_reachable" in output.read_text()
+
     @patch("prometheus_client.core.REGISTRY.register")
     @patch("fritzexporter.tr064_remote.FritzConnection")
     def test_donate_data_path(
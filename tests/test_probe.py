@@ -0,0 +1,172 @@
+import urllib.error
+import urllib.request
+
+import pytest
+from prometheus_client import CollectorRegistry
+from prometheus_client.core import GaugeMetricFamily
+
+from fritzexporter.config import DeviceConfig
+from fritzexporter.exceptions import UnknownProbeTargetError
+from fritzexporter.exposition import start_http_server
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from fritzexporter.probe import ProbeManager
+from fritzexporter.reload import DeviceDiff
+from fritzexporter.simulator import SimulatedDevice, dsl_router, start_simulator
+from fritzexporter.tr064_remote import ConnectionOptions
+
+
+class DeviceCollector:
+    def __init__(self, device):
+        self.device = device
+        self.collects = 0
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def collect(self):
+        self.collects += 1
+        m = GaugeMetricFamily("fritz_test", "Test metric", labels=["host"])
+        m.add_metric([self.device.hostname], self.collects)
+        yield m
+
+
+class Builder:
+    def __init__(self):
+        self.built = []
+        self.collectors = []
+
+    def __call__(self, device):
+        self.built.append(device.hostname)
+        self.collectors.append(DeviceCollector(device))
+        return self.collectors[-1]
+
+    def closed(self):
+        return [collector.device.hostname for collector in self.collectors if collector.closed]
+
+
+def _devices(count):
+    return [
+        DeviceConfig(hostname=f"fritz-{i}", username="user", password="pass", name=f"Box {i}")
+        for i in range(count)
+    ]
+
+
+class TestProbeManager:
+    def test_target_is_built_lazily_and_kept_warm(self):
+        builder = Builder()
+        probes = ProbeManager(_devices(3), builder)
+
+        assert builder.built == []
+        first = probes.probe("fritz-1")
+        second = probes.probe("Box 1")
+
+        assert builder.built == ["fritz-1"]
+        assert b'fritz_test{host="fritz-1"} 1.0' in first
+        assert b'fritz_test{host="fritz-1"} 2.0' in second
+
+    def test_unknown_target(self):
+        probes = ProbeManager(_devices(1), Builder())
+
+        with pytest.raises(UnknownProbeTargetError):
+            probes.probe("somewhere.else")
+
+    def test_least_recently_used_target_is_evicted(self):
+        builder = Builder()
+        probes = ProbeManager(_devices(3), builder, max_size=2)
+
+        probes.probe("fritz-0")
+        probes.probe("fritz-1")
+        probes.probe("fritz-0")
+        probes.probe("fritz-2")
+        probes.probe("fritz-0")
+        probes.probe("fritz-1")
+
+        assert len(probes) == 2
+        assert builder.built == ["fritz-0", "fritz-1", "fritz-2", "fritz-1"]
+        assert builder.closed() == ["fritz-1", "fritz-2"]
+
+    def test_idle_target_is_evicted(self, monkeypatch):
+        builder = Builder()
+        probes = ProbeManager(_devices(2), builder, idle_timeout=60)
+        now = [1000.0]
+        monkeypatch.setattr("fritzexporter.probe.time.monotonic", lambda: now[0])
+
+        probes.probe("fritz-0")
+        now[0] += 61
+        probes.probe("fritz-1")
+
+        assert len(probes) == 1
+        assert builder.closed() == ["fritz-0"]
+        probes.probe("fritz-0")
+        assert builder.built == ["fritz-0", "fritz-1", "fritz-0"]
+
+    def test_apply_drops_changed_and_removed_targets(self):
+        builder = Builder()
+        devices = _devices(2)
+        probes = ProbeManager(devices, builder)
+        probes.probe("fritz-0")
+        probes.probe("fritz-1")
+
+        changed = DeviceConfig(hostname="fritz-0", username="other", password="pass", name="Box 0")
+        probes.apply(DeviceDiff(removed=[devices[1]], changed=[changed]))
+
+        assert len(probes) == 0
+        assert builder.closed() == ["fritz-0", "fritz-1"]
+        with pytest.raises(UnknownProbeTargetError):
+            probes.probe("Box 1")
+        probes.probe("Box 0")
+        assert builder.built == ["fritz-0", "fritz-1", "fritz-0"]
+
+    def test_evicted_target_stops_its_threads(self):
+        server = start_simulator(SimulatedDevice(dsl_router(), user="monitor", password="secret"))
+        collectors = []
+
+        def build(device):
+            collector = FritzCollector()
+            collector.sample_wan(30.0)
+            collector.register(
+                FritzDevice(
+                    FritzCredentials(server.host, "monitor", "secret"),
+                    device.name,
+                    connection=ConnectionOptions(port=server.port),
+                )
+            )
+            collectors.append(collector)
+            return collector
+
+        devices = _devices(1)
+        probes = ProbeManager(devices, build)
+        try:
+            probes.probe("fritz-0")
+            sampler = next(iter(collectors[0]._samplers.values()))
+            assert sampler._thread.is_alive()
+
+            probes.apply(DeviceDiff(removed=devices))
+
+            sampler._thread.join(5)
+            assert not sampler._thread.is_alive()
+            assert collectors[0]._samplers == {}
+        finally:
+            server.stop()
+
+
+class TestProbeEndpoint:
+    def test_probe_endpoint(self):
+        probes = ProbeManager(_devices(1), Builder())
+        httpd, _ = start_http_server(0, "127.0.0.1", CollectorRegistry(), probes=probes)
+        base = f"http://127.0.0.1:{httpd.server_address[1]}"
+        try:
+            with urllib.request.urlopen(f"{base}/probe?target=fritz-0") as resp:
+                assert b'host="fritz-0"' in resp.read()
+
+            with pytest.raises(urllib.error.HTTPError) as err:
+                urllib.request.urlopen(f"{base}/probe?target=unknown")
+            assert err.value.code == 404
+
+            with pytest.raises(urllib.error.HTTPError) as err:
+                urllib.request.urlopen(f"{base}/probe")
+            assert err.value.code == 400
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
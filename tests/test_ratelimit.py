@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from fritzexporter.ratelimit import RateLimitedConnection, TokenBucket
+from fritzexporter.simulator import SimulatedDevice, repeater, start_simulator
+from fritzexporter.tr064_remote import ConnectionOptions
+
+USER = "monitor"
+PASSWORD = "secret"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket:
+    def test_burst_passes_then_calls_are_spaced(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, 3, clock=clock, sleep=clock.sleep)
+
+        waits = [bucket.acquire() for _ in range(5)]
+
+        assert waits == [0, 0, 0, 0.5, 0.5]
+        assert bucket.waited == 1.0
+        assert bucket.delayed == 2
+        assert clock.now == 101.0
+
+    def test_refills_up_to_burst(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1, 2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+
+        clock.now += 60
+
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 1.0]
+
+    def test_concurrent_calls_queue_behind_each_other(self):
+        bucket = TokenBucket(20, 1)
+        waits = []
+
+        threads = [threading.Thread(target=lambda: waits.append(bucket.acquire())) for _ in range(5)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert time.monotonic() - start >= 0.2 - 0.01
+        assert sorted(waits)[-1] == pytest.approx(0.2, abs=0.02)
+
+
+@pytest.fixture
+def server():
+    server = start_simulator(SimulatedDevice(repeater("REP123"), user=USER, password=PASSWORD))
+    yield server
+    server.stop()
+
+
+class TestRateLimitedDevice:
+    def test_calls_are_limited_and_queueing_exported(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port, rate_limit=200, rate_burst=2),
+        )
+        collector = FritzCollector()
+        collector.register(device)
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(collector)
+
+        output = generate_latest(registry).decode()
+
+        assert isinstance(device.fc, RateLimitedConnection)
+        assert device.rate_limit is not None
+        assert device.rate_limit.delayed > 0
+        assert 'fritz_device_rate_limit_delayed_calls_total{friendly_name="sim",serial="REP123"}' in output
+        assert "fritz_device_rate_limit_wait_seconds_total" in output
+
+    def test_no_limit_by_default(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port),
+        )
+        collector = FritzCollector()
+        collector.register(device)
+
+        names = {metric.name for metric in collector.collect()}
+
+        assert device.rate_limit is None
+        assert "fritz_device_rate_limit_wait_seconds" not in names
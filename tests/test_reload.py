@@ -0,0 +1,83 @@
+import os
+
+import yaml
+
+from fritzexporter.config import DeviceConfig, get_config
+from fritzexporter.reload import ConfigReloader, diff_devices
+
+
+def _device(hostname, **kwargs):
+    return DeviceConfig(hostname=hostname, username="user", password="pass", **kwargs)
+
+
+def _write_config(path, devices, **settings):
+    path.write_text(yaml.safe_dump({"devices": devices, **settings}))
+
+
+class TestDiffDevices:
+    def test_added_removed_changed(self):
+        old = [_device("a"), _device("b"), _device("c")]
+        new = [_device("a"), _device("b", host_info=True), _device("d")]
+
+        diff = diff_devices(old, new)
+
+        assert [d.hostname for d in diff.added] == ["d"]
+        assert [d.hostname for d in diff.removed] == ["c"]
+        assert diff.changed == [_device("b", host_info=True)]
+
+    def test_unchanged_is_empty(self):
+        assert not diff_devices([_device("a")], [_device("a")])
+
+
+class TestConfigReloader:
+    def test_reload_applies_device_diff(self, tmp_path):
+        config_file = tmp_path / "config.yaml"
+        _write_config(config_file, [{"hostname": "a", "username": "u", "password": "p"}])
+        config = get_config(str(config_file))
+        applied = []
+        reloader = ConfigReloader(str(config_file), config, applied.append)
+
+        _write_config(
+            config_file,
+            [
+                {"hostname": "a", "username": "u", "password": "p"},
+                {"hostname": "b", "username": "u", "password": "p"},
+            ],
+        )
+        reloader.reload()
+        reloader.reload()
+
+        assert len(applied) == 1
+        assert [d.hostname for d in applied[0].added] == ["b"]
+        assert [d.hostname for d in config.devices] == ["a", "b"]
+
+    def test_invalid_config_keeps_running_devices(self, tmp_path):
+        config_file = tmp_path / "config.yaml"
+        _write_config(config_file, [{"hostname": "a", "username": "u", "password": "p"}])
+        config = get_config(str(config_file))
+        applied = []
+        reloader = ConfigReloader(str(config_file), config, applied.append)
+
+        _write_config(config_file, [])
+
+        assert reloader.reload() is None
+        assert applied == []
+        assert [d.hostname for d in config.devices] == ["a"]
+
+    def test_watch_reloads_on_mtime_change(self, tmp_path):
+        config_file = tmp_path / "config.yaml"
+        _write_config(config_file, [{"hostname": "a", "username": "u", "password": "p"}])
+        config = get_config(str(config_file))
+        applied = []
+        reloader = ConfigReloader(str(config_file), config, applied.append, watch_interval=0.01)
+        reloader.start()
+
+        _write_config(config_file, [{"hostname": "b", "username": "u", "password": "p"}])
+        stat = config_file.stat()
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        for _ in range(200):
+            if applied:
+                break
+            reloader._requested.wait(0.01)
+        assert [d.hostname for d in applied[0].removed] == ["a"]
@@ -0,0 +1,236 @@
+import os
+import random
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from prometheus_client import CollectorRegistry, Gauge
+
+from fritzexporter.remote_write import (
+    HEADERS,
+    RemoteWriteOptions,
+    RemoteWriter,
+    encode_write_request,
+    snappy_compress,
+)
+
+
+def _uvarint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def snappy_decompress(data):
+    length, position = _uvarint(data, 0)
+    out = bytearray()
+    while position < len(data):
+        tag = data[position]
+        position += 1
+        if tag & 3 == 0:
+            size = tag >> 2
+            if size >= 60:
+                extra = size - 59
+                size = int.from_bytes(data[position : position + extra], "little")
+                position += extra
+            out += data[position : position + size + 1]
+            position += size + 1
+            continue
+        if tag & 3 == 1:
+            size = ((tag >> 2) & 7) + 4
+            offset = (tag >> 5) << 8 | data[position]
+            position += 1
+        else:
+            size = (tag >> 2) + 1
+            offset = int.from_bytes(data[position : position + 2], "little")
+            position += 2
+        assert 0 < offset <= len(out)
+        for _ in range(size):
+            out.append(out[-offset])
+    assert len(out) == length
+    return bytes(out)
+
+
+def fields(message):
+    position = 0
+    while position < len(message):
+        key, position = _uvarint(message, position)
+        if key & 7 == 2:
+            size, position = _uvarint(message, position)
+            yield key >> 3, message[position : position + size]
+            position += size
+        elif key & 7 == 1:
+            yield key >> 3, message[position : position + 8]
+            position += 8
+        else:
+            value, position = _uvarint(message, position)
+            yield key >> 3, value
+
+
+def decode_write_request(payload):
+    """{labels: [(value, timestamp)]} of a WriteRequest."""
+    series = {}
+    for _, timeseries in fields(payload):
+        labels, samples = {}, []
+        for number, item in fields(timeseries):
+            parts = dict(fields(item))
+            if number == 1:
+                labels[parts[1].decode()] = parts[2].decode()
+            else:
+                samples.append((struct.unpack("<d", parts[1])[0], parts[2]))
+        series[tuple(sorted(labels.items()))] = samples
+    return series
+
+
+class Receiver(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((dict(self.headers), body))
+        status = self.server.statuses.pop(0) if self.server.statuses else 204
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def receiver():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+    server.requests = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/write"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def registry():
+    registry = CollectorRegistry(auto_describe=False)
+    gauge = Gauge("fritz_test", "Test", ["serial"], registry=registry)
+    gauge.labels("ABC").set(1.5)
+    return registry
+
+
+class TestEncoding:
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"",
+            b"a",
+            b"abcd" * 1000,
+            b"x" * 70_000,
+            os.urandom(5000),
+            bytes(random.Random(1).choice(b"ab") for _ in range(20_000)),
+            b'fritz_wifi_signal{serial="123",friendly_name="box"}' * 500,
+        ],
+    )
+    def test_snappy_round_trip(self, data):
+        assert snappy_decompress(snappy_compress(data)) == data
+
+    def test_snappy_compresses_repeated_labels(self):
+        data = b'{__name__="fritz_host_active",hostname="host-0001"}' * 1000
+
+        assert len(snappy_compress(data)) < len(data) / 10
+
+    def test_write_request(self):
+        labels = (("__name__", "up"), ("serial", "ABC"))
+
+        payload = encode_write_request({labels: [(2.0, 2000), (1.0, 1000)]})
+
+        assert decode_write_request(payload) == {labels: [(1.0, 1000), (2.0, 2000)]}
+
+
+class TestRemoteWriter:
+    def test_batches_collections(self, receiver, registry):
+        writer = RemoteWriter(receiver.url, registry, RemoteWriteOptions(batch=2))
+
+        writer.collect()
+        assert receiver.requests == []
+        writer.collect()
+
+        assert len(receiver.requests) == 1
+        headers, body = receiver.requests[0]
+        for name, value in HEADERS.items():
+            assert headers[name] == value
+        series = decode_write_request(snappy_decompress(body))
+        samples = series[(("__name__", "fritz_test"), ("serial", "ABC"))]
+        assert [value for value, _ in samples] == [1.5, 1.5]
+        assert samples[0][1] <= samples[1][1]
+
+    def test_spools_until_endpoint_accepts(self, receiver, registry, tmp_path):
+        options = RemoteWriteOptions(batch=1, spool_dir=str(tmp_path))
+        writer = RemoteWriter(receiver.url, registry, options)
+        receiver.statuses = [503, 429]
+
+        writer.collect()
+        writer.collect()
+
+        assert len(list(tmp_path.glob("*.rw"))) == 2
+        # The second batch waits behind the first instead of overtaking it.
+        assert [body for _, body in receiver.requests] == [receiver.requests[0][1]] * 2
+
+        writer.collect()
+
+        assert list(tmp_path.glob("*.rw")) == []
+        accepted = [decode_write_request(snappy_decompress(body)) for _, body in receiver.requests[2:]]
+        assert receiver.requests[2][1] == receiver.requests[0][1]
+        stamps = [
+            batch[(("__name__", "fritz_test"), ("serial", "ABC"))][0][1] for batch in accepted
+        ]
+        assert len(stamps) == 3
+        assert stamps == sorted(stamps)
+
+    def test_rejected_spooled_batch_is_discarded(self, receiver, registry, tmp_path, caplog):
+        options = RemoteWriteOptions(batch=1, spool_dir=str(tmp_path))
+        writer = RemoteWriter(receiver.url, registry, options)
+        receiver.statuses = [503, 400]
+
+        writer.collect()
+        writer.collect()
+
+        assert list(tmp_path.glob("*.rw")) == []
+        assert len(receiver.requests) == 3
+        assert "Discarding spooled batch" in caplog.text
+
+    def test_spool_is_bounded(self, receiver, registry, tmp_path):
+        options = RemoteWriteOptions(batch=1, spool_dir=str(tmp_path), spool_bytes=1)
+        writer = RemoteWriter("http://127.0.0.1:1/unreachable", registry, options)
+
+        writer.collect()
+        writer.collect()
+
+        assert list(tmp_path.glob("*.rw")) == []
+
+    def test_rejected_batch_is_dropped(self, receiver, registry, tmp_path):
+        options = RemoteWriteOptions(batch=1, spool_dir=str(tmp_path))
+        writer = RemoteWriter(receiver.url, registry, options)
+        receiver.statuses = [400]
+
+        writer.collect()
+
+        assert len(receiver.requests) == 1
+        assert list(tmp_path.glob("*.rw")) == []
+
+    def test_run_sends_spool_and_pending_on_stop(self, receiver, registry, tmp_path):
+        (tmp_path / "00000000000000000001-000001.rw").write_bytes(b"old")
+        options = RemoteWriteOptions(interval=60, batch=10, spool_dir=str(tmp_path))
+        writer = RemoteWriter(receiver.url, registry, options)
+        writer.collect()
+        stop = threading.Event()
+        stop.set()
+
+        writer.run(stop)
+
+        assert receiver.requests[0][1] == b"old"
+        assert len(receiver.requests) == 2
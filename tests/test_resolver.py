@@ -0,0 +1,99 @@
+import socket
+import threading
+
+from fritzexporter.resolver import HostResolver, lookup
+
+
+class FakeDNS:
+    def __init__(self, answers):
+        self.answers = answers
+        self.queries = []
+        self.fail = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, host):
+        self.queries.append(host)
+        self.release.wait(5)
+        if self.fail:
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        return self.answers[host]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _wait_for_refresh():
+    for thread in threading.enumerate():
+        if thread.name.startswith("resolve-"):
+            thread.join(5)
+
+
+class TestHostResolver:
+    def test_caches_for_ttl(self):
+        dns, clock = FakeDNS({"fritz.box": ["192.168.178.1"]}), Clock()
+        resolver = HostResolver(60, resolve=dns, clock=clock)
+
+        assert resolver.addresses("fritz.box") == ["192.168.178.1"]
+        clock.now += 59
+        assert resolver.addresses("fritz.box") == ["192.168.178.1"]
+
+        assert dns.queries == ["fritz.box"]
+
+    def test_address_literals_are_not_resolved(self):
+        dns = FakeDNS({})
+        resolver = HostResolver(60, resolve=dns)
+
+        assert resolver.addresses("192.168.178.1") == ["192.168.178.1"]
+        assert resolver.addresses("[fd00::1]") == ["[fd00::1]"]
+        assert dns.queries == []
+
+    def test_expired_entry_is_served_while_refreshing(self):
+        dns, clock = FakeDNS({"fritz.box": ["192.168.178.1"]}), Clock()
+        resolver = HostResolver(60, resolve=dns, clock=clock)
+        resolver.addresses("fritz.box")
+        dns.answers["fritz.box"] = ["192.168.178.2"]
+        clock.now += 60
+
+        # The resolver stalls; the cached address is used meanwhile.
+        dns.release.clear()
+        assert resolver.addresses("fritz.box") == ["192.168.178.1"]
+        assert resolver.addresses("fritz.box") == ["192.168.178.1"]
+        dns.release.set()
+        _wait_for_refresh()
+
+        assert resolver.addresses("fritz.box") == ["192.168.178.2"]
+        assert dns.queries == ["fritz.box", "fritz.box"]
+
+    def test_keeps_last_known_address_on_failure(self, caplog):
+        dns, clock = FakeDNS({"fritz.box": ["192.168.178.1"]}), Clock()
+        resolver = HostResolver(60, resolve=dns, clock=clock)
+        resolver.addresses("fritz.box")
+        dns.fail = True
+        clock.now += 60
+
+        resolver.addresses("fritz.box")
+        _wait_for_refresh()
+
+        assert resolver.addresses("fritz.box") == ["192.168.178.1"]
+        assert resolver.failures == 1
+        assert "keeping 192.168.178.1" in caplog.text
+        # Not asked again before another ttl has passed.
+        assert dns.queries == ["fritz.box", "fritz.box"]
+
+    def test_unresolvable_name_is_returned_as_is(self):
+        dns = FakeDNS({})
+        dns.fail = True
+        resolver = HostResolver(60, resolve=dns)
+
+        assert resolver.addresses("fritz.box") == ["fritz.box"]
+        assert resolver.failures == 1
+
+    def test_lookup(self):
+        assert lookup("localhost")
+        assert "127.0.0.1" in lookup("127.0.0.1")
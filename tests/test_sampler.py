@@ -0,0 +1,160 @@
+import pytest
+
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from fritzexporter.sampler import RingBuffer, ThroughputSampler
+from fritzexporter.simulator import SimulatedDevice, dsl_router, start_simulator
+from fritzexporter.tr064_remote import ConnectionOptions
+
+USER = "monitor"
+PASSWORD = "secret"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDevice:
+    host = "box"
+    available = True
+
+    def __init__(self, rates):
+        self.rates = iter(rates)
+        self.fc = self
+
+    def call_action(self, service, action):
+        assert (service, action) == ("WANCommonIFC1", "GetAddonInfos")
+        rx, tx = next(self.rates)
+        return {"NewByteReceiveRate": rx, "NewByteSendRate": tx}
+
+
+class TestRingBuffer:
+    def test_keeps_last_values_in_order(self):
+        ring = RingBuffer(3)
+        assert ring.values() == []
+
+        for value in range(5):
+            ring.append(value)
+
+        assert ring.values() == [2.0, 3.0, 4.0]
+        assert len(ring) == 3
+
+    def test_partially_filled(self):
+        ring = RingBuffer(4)
+        ring.append(1.5)
+        ring.append(2.5)
+
+        assert ring.values() == [1.5, 2.5]
+
+
+class TestThroughputSampler:
+    def test_window_drops_old_samples(self):
+        clock = FakeClock()
+        device = FakeDevice([(100, 10), (5000, 20), (300, 30)])
+        sampler = ThroughputSampler(device, interval=1, window=10, clock=clock)
+
+        sampler.sample()
+        clock.now += 20
+        sampler.sample()
+        sampler.sample()
+
+        assert sampler.rates() == {"rx": [5000.0, 300.0], "tx": [20.0, 30.0]}
+
+    def test_unavailable_device_is_not_polled(self):
+        device = FakeDevice([])
+        device.available = False
+        sampler = ThroughputSampler(device, interval=1)
+
+        sampler.sample()
+
+        assert sampler.rates() == {"rx": [], "tx": []}
+
+
+@pytest.fixture
+def server():
+    server = start_simulator(SimulatedDevice(dsl_router("DSL123"), user=USER, password=PASSWORD))
+    yield server
+    server.stop()
+
+
+class TestCollectorSampling:
+    def test_peak_and_quantiles_exported(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port),
+        )
+        collector = FritzCollector()
+        collector.sample_wan(0.01, window=60)
+        collector.register(device)
+        list(collector.collect())
+        sampler = collector._samplers[server.host]
+        sampler.stop()
+        for _ in range(3):
+            sampler.sample()
+
+        metrics = {m.name: m for m in collector.collect()}
+
+        peak = {s.labels["direction"]: s.value for s in metrics["fritz_wan_datarate_peak_bytes"].samples}
+        assert set(peak) == {"rx", "tx"}
+        quantiles = metrics["fritz_wan_datarate_quantile_bytes"].samples
+        assert {s.labels["quantile"] for s in quantiles} == {"0.5", "0.9", "0.99"}
+        assert all(s.value <= peak[s.labels["direction"]] for s in quantiles)
+
+        collector.unregister(server.host)
+        assert collector._samplers == {}
+
+    def test_sampler_dropped_when_reconnected_device_lost_byte_rate(self, server):
+        def device():
+            return FritzDevice(
+                FritzCredentials(server.host, USER, PASSWORD),
+                "sim",
+                connection=ConnectionOptions(port=server.port),
+            )
+
+        collector = FritzCollector()
+        collector.sample_wan(60)
+        collector.register(device())
+        list(collector.collect())
+        sampler = collector._samplers[server.host]
+
+        reconnected = device()
+        reconnected.capabilities["WanCommonInterfaceByteRate"].present = False
+        collector.devices = [reconnected]
+        names = {m.name for m in collector.collect()}
+
+        assert collector._samplers == {}
+        assert sampler._stop.is_set()
+        assert "fritz_wan_datarate_peak_bytes" not in names
+
+    def test_samples_are_not_recorded(self, server, tmp_path):
+        path = tmp_path / "box.jsonl.gz"
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port, record_to=str(path)),
+        )
+        recorded = device.fc._recorded
+        sampler = ThroughputSampler(device, interval=1)
+
+        for _ in range(3):
+            sampler.sample()
+
+        assert len(sampler.rates()["rx"]) == 3
+        assert device.fc._recorded == recorded
+
+    def test_disabled_by_default(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port),
+        )
+        collector = FritzCollector()
+        collector.register(device)
+
+        names = {m.name for m in collector.collect()}
+
+        assert "fritz_wan_datarate_peak_bytes" not in names
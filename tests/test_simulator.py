@@ -0,0 +1,233 @@
+import json
+import shutil
+import subprocess
+import time
+
+import pytest
+from fritzconnection.core.exceptions import (
+    FritzActionFailedError,
+    FritzArrayIndexError,
+    FritzAuthorizationError,
+    FritzLookUpError,
+)
+from prometheus_client import CollectorRegistry, generate_latest
+
+from fritzexporter.data_donation import DonationOptions, donate_data
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from fritzexporter.simulator import (
+    SimulatedDevice,
+    add_homeautomation,
+    donation_profile,
+    donation_profiles,
+    dsl_router,
+    fiber_router,
+    repeater,
+    start_simulator,
+    tls_context,
+)
+from fritzexporter.tr064_remote import ConnectionOptions, create_fritz_connection
+
+USER = "monitor"
+PASSWORD = "secret"
+
+
+@pytest.fixture
+def simulate():
+    servers = []
+
+    def start(profile, **kwargs):
+        server = start_simulator(SimulatedDevice(profile, user=USER, password=PASSWORD), **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def _samples(output):
+    return {line.partition("{")[0] for line in output.splitlines() if not line.startswith("#")}
+
+
+def _scrape(server, **kwargs):
+    device = FritzDevice(
+        FritzCredentials(server.host, USER, PASSWORD),
+        "sim",
+        connection=ConnectionOptions(port=server.port, use_tls=server.tls),
+        **kwargs,
+    )
+    collector = FritzCollector()
+    collector.register(device)
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(collector)
+    return generate_latest(registry).decode()
+
+
+class TestSimulator:
+    def test_dsl_router_end_to_end(self, simulate):
+        server = simulate(dsl_router("DSL123", hosts=7))
+
+        output = _scrape(server, host_info=True)
+
+        assert 'fritz_uptime_seconds_total{friendly_name="sim",modelname="FRITZ!Box 7590"' in output
+        assert 'fritz_dsl_datarate_kbps{direction="rx",friendly_name="sim"' in output
+        assert output.count("fritz_host_active{") == 7
+        assert 'peer="repeater-0"' in output
+        assert server.device.calls["Hosts1/GetGenericHostEntry"] > 7
+
+    def test_fiber_and_repeater(self, simulate):
+        fiber = _scrape(simulate(fiber_router()))
+        rep = _scrape(simulate(repeater()))
+
+        assert "fritz_fiber_gpon_onu_id{" in fiber
+        assert "fritz_dsl_status{" not in fiber
+        assert "fritz_wan_phys_link_status{" not in rep
+        assert "fritz_mesh_link_available{" not in rep
+
+    def test_wrong_password(self, simulate):
+        server = simulate(dsl_router())
+        fc = create_fritz_connection(
+            address=server.host,
+            user=USER,
+            password="wrong",
+            connection=ConnectionOptions(port=server.port),
+        )
+
+        with pytest.raises(FritzAuthorizationError):
+            fc.call_action("DeviceInfo1", "GetInfo")
+
+    def test_soap_faults(self, simulate):
+        server = simulate(dsl_router(hosts=2))
+        fc = create_fritz_connection(
+            address=server.host,
+            user=USER,
+            password=PASSWORD,
+            connection=ConnectionOptions(port=server.port),
+        )
+
+        with pytest.raises(FritzLookUpError):
+            fc.call_action("Hosts1", "X_AVM-DE_GetSpecificHostEntryByIP", NewIPAddress="0.0.0.0")
+        assert fc.call_action("Hosts1", "GetGenericHostEntry", NewIndex=1)["NewHostName"] == (
+            "host-0001"
+        )
+
+    def test_latency(self, simulate):
+        profile = dsl_router()
+        profile.action_latency["DeviceInfo1/GetInfo"] = 0.2
+        server = simulate(profile)
+        fc = create_fritz_connection(
+            address=server.host,
+            user=USER,
+            password=PASSWORD,
+            connection=ConnectionOptions(port=server.port),
+        )
+
+        start = time.monotonic()
+        fc.call_action("DeviceInfo1", "GetInfo")
+        fc.call_action("UserInterface1", "GetInfo")
+
+        assert 0.2 <= time.monotonic() - start < 1.0
+
+    @pytest.mark.skipif(shutil.which("openssl") is None, reason="needs openssl")
+    @pytest.mark.filterwarnings("ignore::urllib3.exceptions.InsecureRequestWarning")
+    def test_tls_and_homeautomation(self, simulate, tmp_path, monkeypatch):
+        # requests lets a CA bundle from the environment override verify=False.
+        monkeypatch.delenv("REQUESTS_CA_BUNDLE", raising=False)
+        monkeypatch.delenv("CURL_CA_BUNDLE", raising=False)
+        cert = tmp_path / "cert.pem"
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+            + ["-subj", "/CN=localhost", "-keyout", str(cert), "-out", str(cert)],
+            check=True,
+            capture_output=True,
+        )
+        server = simulate(add_homeautomation(dsl_router(), 4), tls=tls_context(str(cert)))
+
+        output = _scrape(server)
+
+        assert output.count("fritz_ha_device_present{") == 4
+        assert "fritz_ha_heater_valve_set_state{" in output
+        assert server.device.calls["aha/getdevicelistinfos"] == 1
+        assert server.device.handshakes >= 1
+
+
+class TestDonationProfile:
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_round_trip(self, simulate, tmp_path, capsys, stream):
+        original = simulate(dsl_router("DSL123", hosts=5, wifi_clients=2))
+        device = FritzDevice(
+            FritzCredentials(original.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=original.port),
+        )
+        donate_data(device, options=DonationOptions(stream=stream))
+        (tmp_path / "7590.txt").write_text(capsys.readouterr().out)
+
+        profiles = donation_profiles(tmp_path)
+        server = simulate(profiles[0])
+        donated = _scrape(server, host_info=True, wifi_client_info=True)
+        expected = _scrape(original, host_info=True, wifi_client_info=True)
+
+        assert len(profiles) == 1
+        assert server.device.profile.services.keys() == original.device.profile.services.keys()
+        assert 'modelname="FRITZ!Box 7590"' in donated
+        assert donated.count("fritz_host_active{") == 5
+        assert donated.count("fritz_wifi_client_signal_strength{") == 4
+        assert _samples(donated) == {s for s in _samples(expected) if "mesh" not in s}
+
+    def test_donated_values_and_errors(self, simulate, tmp_path):
+        donation = {
+            "exporter_version": "develop",
+            "fritzdevice": {
+                "model": "FRITZ!Box 6690 Cable",
+                "os_version": "141.07.29",
+                "services": {
+                    "DeviceInfo1": ["GetInfo"],
+                    "WANIPConn1": ["GetStatusInfo", "X_AVM_DE_GetIPv6Prefix"],
+                    "X_AVM-DE_Homeauto1": ["GetGenericDeviceInfos"],
+                },
+                "detected_capabilities": [],
+                "action_latency": {"DeviceInfo1": {"GetInfo": 0.25}},
+                "action_results": {
+                    "DeviceInfo1": {
+                        "GetInfo": {
+                            "NewModelName": "FRITZ!Box 6690 Cable",
+                            "NewSerialNumber": "<SANITIZED>",
+                            "NewSoftwareVersion": "141.07.29",
+                            "NewUpTime": "4711",
+                        }
+                    },
+                    "WANIPConn1": {
+                        "GetStatusInfo": {
+                            "NewConnectionStatus": "Connected",
+                            "NewUptime": "42",
+                            "NewEnable": "True",
+                        },
+                        "X_AVM_DE_GetIPv6Prefix": {
+                            "error": "UPnPError:\nerrorCode: 501\nerrorDescription: Action Failed"
+                        },
+                    },
+                },
+            },
+        }
+        (tmp_path / "6690.json").write_text(json.dumps(donation))
+        profile = donation_profile(json.loads((tmp_path / "6690.json").read_text()), "DON42")
+        fc = create_fritz_connection(
+            address=simulate(profile).host,
+            user=USER,
+            password=PASSWORD,
+            connection=ConnectionOptions(port=simulate(profile).port),
+        )
+
+        info = fc.call_action("DeviceInfo1", "GetInfo")
+        status = fc.call_action("WANIPConn1", "GetStatusInfo")
+
+        assert profile.action_latency == {"DeviceInfo1/GetInfo": 0.25}
+        assert fc.modelname == "FRITZ!Box 6690 Cable"
+        assert info["NewUpTime"] == 4711
+        assert info["NewSerialNumber"] == "DON42"
+        assert status == {"NewConnectionStatus": "Connected", "NewUptime": 42, "NewEnable": True}
+        with pytest.raises(FritzActionFailedError):
+            fc.call_action("WANIPConn1", "X_AVM_DE_GetIPv6Prefix")
+        with pytest.raises(FritzArrayIndexError):
+            fc.call_action("X_AVM-DE_Homeauto1", "GetGenericDeviceInfos", NewIndex=0)
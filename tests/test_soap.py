@@ -0,0 +1,162 @@
+import logging
+from unittest.mock import patch
+
+import pytest
+from fritzconnection.core.exceptions import FritzActionError
+from fritzconnection.core.logger import fritzlogger
+from fritzconnection.core.soaper import Soaper
+
+from fritzexporter.simulator import SimulatedDevice, dsl_router, fiber_router, start_simulator
+from fritzexporter.soap import FastSoaper, response_values
+from fritzexporter.tr064_remote import ConnectionOptions, create_fritz_connection
+
+USER = "monitor"
+PASSWORD = "secret"
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.text = content.decode()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeSession:
+    """Answers every POST with the same response and keeps the requests."""
+
+    def __init__(self, response):
+        self.response = response
+        self.posts = []
+
+    def post(self, url, data, headers, timeout):
+        self.posts.append((url, data, headers, timeout))
+        return self.response
+
+
+def _envelope(values, action="GetInfo"):
+    return (
+        '<?xml version="1.0"?><s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" '
+        's:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"><s:Body>'
+        f'<u:{action}Response xmlns:u="urn:dslforum-org:service:Hosts:1">{values}'
+        f"</u:{action}Response></s:Body></s:Envelope>"
+    ).encode()
+
+
+@pytest.fixture(autouse=True)
+def quiet_fritzlogger():
+    # With fritzconnection's debug log enabled FastSoaper takes the stock path.
+    level = fritzlogger.level
+    fritzlogger.setLevel(logging.INFO)
+    yield
+    fritzlogger.setLevel(level)
+
+
+@pytest.fixture(params=[dsl_router, fiber_router])
+def connection(request):
+    server = start_simulator(
+        SimulatedDevice(request.param("SIM123", hosts=5), user=USER, password=PASSWORD)
+    )
+    yield create_fritz_connection(
+        address=server.host,
+        user=USER,
+        password=PASSWORD,
+        connection=ConnectionOptions(port=server.port),
+    )
+    server.stop()
+
+
+def _pair(fc, response):
+    fast = FastSoaper.from_soaper(fc.soaper)
+    stock = Soaper(fc.soaper.address, fc.soaper.port, USER, PASSWORD)
+    fast.session, stock.session = FakeSession(response), FakeSession(response)
+    return fast, stock
+
+
+class TestFastSoaper:
+    def test_installed_on_connections(self, connection):
+        assert isinstance(connection.soaper, FastSoaper)
+
+    def test_debug_log_uses_stock_path(self, connection):
+        service = connection.services["Hosts1"]
+        fast, _ = _pair(
+            connection,
+            FakeResponse(_envelope("<NewHostNumberOfEntries>3</NewHostNumberOfEntries>")),
+        )
+        fritzlogger.setLevel(logging.DEBUG)
+
+        with patch.object(Soaper, "execute", return_value={"stock": True}) as execute:
+            assert fast.execute(service, "GetHostNumberOfEntries", {}) == {"stock": True}
+        execute.assert_called_once()
+
+    def test_same_results_as_stock_parser(self, connection):
+        responses = []
+        connection.session.hooks["response"].append(lambda r, *_, **__: responses.append(r))
+        stock = Soaper(connection.soaper.address, connection.soaper.port, USER, PASSWORD)
+        checked = 0
+        for name, service in connection.services.items():
+            for action_name, action in service.actions.items():
+                if any(argument.direction == "in" for argument in action.arguments.values()):
+                    continue
+                result = connection.call_action(name, action_name)
+                expected = stock.parse_response(responses[-1], service, action_name)
+                assert result == expected, f"{name}/{action_name}"
+                assert list(result) == list(expected)
+                checked += 1
+        assert checked > 10
+
+    def test_same_request_as_stock(self, connection):
+        service = connection.services["Hosts1"]
+        fast, stock = _pair(connection, FakeResponse(_envelope("<NewHostName>a</NewHostName>")))
+        arguments = {"NewIndex": 1, "NewFlag": True, "NewName": "<a & 'b'>"}
+
+        fast.execute(service, "GetGenericHostEntry", dict(arguments))
+        stock.execute(service, "GetGenericHostEntry", dict(arguments))
+        fast.execute(service, "GetHostNumberOfEntries", {})
+        stock.execute(service, "GetHostNumberOfEntries", {})
+
+        assert fast.session.posts == stock.session.posts
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            "<NewHostName>a &amp; b &#x263A;</NewHostName><NewActive>1</NewActive>",
+            "<NewHostName><![CDATA[<b>]]></NewHostName>",
+            "<NewHostName>line\r\nbreak</NewHostName>",
+            "<NewHostName></NewHostName><NewActive>yes</NewActive><NewIPAddress/>",
+            "<NewHostName>first</NewHostName><NewHostName>second</NewHostName>",
+            '<NewHostName type="string">a</NewHostName><NewActive nil="true"/>',
+        ],
+    )
+    def test_unusual_responses_match_stock(self, connection, values):
+        service = connection.services["Hosts1"]
+        fast, stock = _pair(connection, FakeResponse(_envelope(values, "GetGenericHostEntry")))
+
+        assert fast.execute(service, "GetGenericHostEntry", {"NewIndex": 1}) == stock.execute(
+            service, "GetGenericHostEntry", {"NewIndex": 1}
+        )
+
+    def test_fault_raises_like_stock(self, connection):
+        service = connection.services["Hosts1"]
+        fault = (
+            '<?xml version="1.0"?><s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">'
+            "<s:Body><s:Fault><faultcode>s:Client</faultcode><faultstring>UPnPError</faultstring>"
+            '<detail>\n<UPnPError xmlns="urn:dslforum-org:control-1-0">\n<errorCode>401</errorCode>'
+            "<errorDescription>Invalid Action</errorDescription>\n</UPnPError>\n</detail>"
+            "</s:Fault></s:Body></s:Envelope>"
+        ).encode()
+        fast, _ = _pair(connection, FakeResponse(fault, status_code=500))
+
+        with pytest.raises(FritzActionError):
+            fast.execute(service, "GetHostNumberOfEntries", {})
+
+
+def test_response_values_non_utf8_declaration():
+    content = '<?xml version="1.0" encoding="ISO-8859-1"?><r><NewName>M\xfcller</NewName></r>'
+
+    assert response_values(content.encode("latin-1"), {"NewName"}) == {"NewName": "M\xfcller"}
@@ -0,0 +1,118 @@
+import math
+
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from fritzexporter.simulator import SimulatedDevice, dsl_router, start_simulator
+from fritzexporter.timeouts import MIN_SAMPLES, AdaptiveTimeout, TimeoutOptions, percentile
+from fritzexporter.tr064_remote import ConnectionOptions
+
+USER = "monitor"
+PASSWORD = "secret"
+
+
+class TestAdaptiveTimeout:
+    def test_configured_timeout_until_enough_samples(self):
+        timeout = AdaptiveTimeout("box", 10, TimeoutOptions(factor=3, minimum=1, maximum=30))
+
+        for _ in range(MIN_SAMPLES - 1):
+            timeout.observe(0.5)
+
+        assert timeout.effective == 10
+
+        timeout.observe(0.5)
+
+        assert timeout.effective == 1.5
+
+    @pytest.mark.parametrize(
+        ("configured", "latency", "expected"),
+        [
+            (None, 0.01, 1.0),  # clamped to minimum
+            (None, 20.0, 30.0),  # clamped to maximum
+            (5, 20.0, 5),  # connection_timeout caps the maximum
+        ],
+    )
+    def test_clamped(self, configured, latency, expected):
+        timeout = AdaptiveTimeout("box", configured, TimeoutOptions(factor=3, minimum=1, maximum=30))
+
+        for _ in range(MIN_SAMPLES):
+            timeout.observe(latency)
+
+        assert timeout.effective == expected
+
+    def test_follows_p99_and_reset_falls_back(self):
+        timeout = AdaptiveTimeout("box", None, TimeoutOptions(factor=2, minimum=0.1, maximum=30))
+
+        for index in range(100):
+            timeout.observe(4.0 if index == 50 else 0.2)
+
+        assert timeout.effective == 0.4
+
+        timeout.reset()
+
+        assert timeout.effective is None
+
+    def test_factor_zero_keeps_configured_timeout(self):
+        timeout = AdaptiveTimeout("box", 10, TimeoutOptions(factor=0))
+
+        for _ in range(MIN_SAMPLES):
+            timeout.observe(0.5)
+
+        assert timeout.effective == 10
+
+    def test_off_by_default(self):
+        timeout = AdaptiveTimeout("box", 10)
+
+        for _ in range(MIN_SAMPLES):
+            timeout.observe(0.02)
+
+        assert timeout.effective == 10
+
+    def test_percentile(self):
+        assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+        assert percentile(list(range(1, 101)), 99) == 99
+
+
+@pytest.fixture
+def server():
+    server = start_simulator(SimulatedDevice(dsl_router("DSL123"), user=USER, password=PASSWORD))
+    yield server
+    server.stop()
+
+
+class TestCollectorTimeouts:
+    def test_soap_timeout_follows_latency(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port, connection_timeout=20),
+        )
+        collector = FritzCollector(timeouts=TimeoutOptions(factor=3, minimum=2, maximum=30))
+        collector.register(device)
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(collector)
+
+        assert collector.adaptive_timeout(device).effective == 20
+
+        first = generate_latest(registry).decode()
+        generate_latest(registry)
+
+        assert len(collector.adaptive_timeout(device).samples) >= MIN_SAMPLES
+        # The simulator answers within milliseconds, so the minimum applies.
+        assert 'fritz_device_timeout_seconds{friendly_name="sim",serial="DSL123"} 2.0' in first
+        assert device.fc.soaper.timeout == 2
+
+    def test_device_without_timeout_reports_inf(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port),
+        )
+        collector = FritzCollector(timeouts=TimeoutOptions(factor=0))
+        collector.register(device)
+
+        metrics = {m.name: m for m in collector.collect()}
+
+        assert math.isinf(metrics["fritz_device_timeout_seconds"].samples[0].value)
+        assert device.fc.soaper.timeout is None
@@ -1,13 +1,18 @@
+import socket
+import time
 from unittest.mock import MagicMock, patch
 
 import requests
 from requests.adapters import HTTPAdapter
 
+from fritzexporter.resolver import HostResolver
 from fritzexporter.tr064_remote import (
     ConnectionOptions,
     Tr064RemoteAccessSession,
     create_fritz_connection,
     rewrite_tr064_remote_url,
+    tr064_endpoint,
+    unreachable_endpoints,
 )
 
 
@@ -127,3 +132,99 @@ class TestCreateFritzConnection:
                 password="pass",
                 connection=ConnectionOptions(use_tls=True, port=11243, remote_access=True),
             )
+
+
+class TestDescriptionCache:
+    @patch("fritzexporter.tr064_remote.FritzConnection")
+    def test_cache_dir_enables_description_cache(self, mock_fc: MagicMock, tmp_path):
+        create_fritz_connection(
+            address="box.example",
+            user="user",
+            password="pass",
+            connection=ConnectionOptions(cache_dir=str(tmp_path / "cache")),
+        )
+
+        kwargs = mock_fc.call_args.kwargs
+        assert kwargs["use_cache"] is True
+        assert kwargs["cache_directory"] == str(tmp_path / "cache")
+        assert (tmp_path / "cache").is_dir()
+
+    @patch("fritzexporter.tr064_remote._HAS_DESCRIPTION_CACHE", False)
+    @patch("fritzexporter.tr064_remote.FritzConnection")
+    def test_old_fritzconnection_gets_no_cache_arguments(
+        self, mock_fc: MagicMock, tmp_path, caplog
+    ):
+        create_fritz_connection(
+            address="box.example",
+            user="user",
+            password="pass",
+            connection=ConnectionOptions(cache_dir=str(tmp_path)),
+        )
+
+        assert "use_cache" not in mock_fc.call_args.kwargs
+        assert "cannot cache service descriptions" in caplog.text
+
+
+class TestPreflight:
+    def test_endpoint_defaults(self):
+        assert tr064_endpoint("fritz.box", ConnectionOptions()) == ("fritz.box", 49000)
+        assert tr064_endpoint("fritz.box", ConnectionOptions(use_tls=True)) == ("fritz.box", 49443)
+        assert tr064_endpoint("https://box.example", ConnectionOptions(port=11243)) == (
+            "box.example",
+            11243,
+        )
+        assert tr064_endpoint("fritz.box", ConnectionOptions(replay_from="x")) is None
+
+    def test_reports_refused_and_keeps_listening_endpoints(self):
+        with socket.socket() as listening, socket.socket() as closed:
+            listening.bind(("127.0.0.1", 0))
+            listening.listen()
+            closed.bind(("127.0.0.1", 0))
+            up = listening.getsockname()
+            down = closed.getsockname()
+            closed.close()
+
+            start = time.monotonic()
+            failed = unreachable_endpoints([up, down], timeout=2.0)
+
+        assert failed == {down}
+        assert time.monotonic() - start < 1.0
+
+    def test_ignores_unresolvable_names(self):
+        assert unreachable_endpoints([("name.invalid", 49000)], timeout=0.1) == set()
+
+    def test_resolves_through_resolvers(self):
+        resolver = HostResolver(resolve=lambda host: ["127.0.0.1"])
+        with socket.socket() as listening, socket.socket() as closed:
+            listening.bind(("127.0.0.1", 0))
+            listening.listen()
+            closed.bind(("127.0.0.1", 0))
+            up = ("box.invalid", listening.getsockname()[1])
+            down = ("repeater.invalid", closed.getsockname()[1])
+            closed.close()
+
+            with patch("socket.getaddrinfo", wraps=socket.getaddrinfo) as getaddrinfo:
+                failed = unreachable_endpoints(
+                    [up, down],
+                    timeout=2.0,
+                    resolvers={"box.invalid": resolver, "repeater.invalid": resolver},
+                )
+
+        assert failed == {down}
+        assert {c.args[0] for c in getaddrinfo.call_args_list} == {"127.0.0.1"}
+
+    def test_resolver_failure_is_not_looked_up_again(self):
+        def fail(host):
+            raise OSError("no DNS")
+
+        resolver = HostResolver(resolve=fail)
+        with patch("socket.getaddrinfo", wraps=socket.getaddrinfo) as getaddrinfo:
+            failed = unreachable_endpoints(
+                [("box.invalid", 49000)], timeout=0.1, resolvers={"box.invalid": resolver}
+            )
+
+        assert failed == set()
+        assert resolver.failures == 1
+        getaddrinfo.assert_called_once_with(
+            "box.invalid", 49000, type=socket.SOCK_STREAM, flags=socket.AI_NUMERICHOST
+        )
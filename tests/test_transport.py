@@ -0,0 +1,333 @@
+import shutil
+import subprocess
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from prometheus_client import CollectorRegistry, generate_latest
+from requests.auth import HTTPDigestAuth
+
+from fritzexporter.fritzdevice import FritzCollector, FritzCredentials, FritzDevice
+from fritzexporter.resolver import HostResolver
+from fritzexporter.simulator import SimulatedDevice, dsl_router, start_simulator, tls_context
+from fritzexporter.tr064_remote import ConnectionOptions
+from fritzexporter.transport import (
+    KeepAlive,
+    SharedDigestAuth,
+    TransportAdapter,
+    install_transport,
+    transport_of,
+)
+
+from .fc_services_mock import call_action_mock, create_fc_services, fc_services_devices
+
+USER = "monitor"
+PASSWORD = "secret"
+
+pytestmark = pytest.mark.filterwarnings("ignore::urllib3.exceptions.InsecureRequestWarning")
+
+
+@pytest.fixture
+def tls_server(tmp_path, monkeypatch):
+    if shutil.which("openssl") is None:
+        pytest.skip("needs openssl")
+    # requests lets a CA bundle from the environment override verify=False.
+    monkeypatch.delenv("REQUESTS_CA_BUNDLE", raising=False)
+    monkeypatch.delenv("CURL_CA_BUNDLE", raising=False)
+    cert = tmp_path / "cert.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+        + ["-subj", "/CN=localhost", "-keyout", str(cert), "-out", str(cert)],
+        check=True,
+        capture_output=True,
+    )
+    server = start_simulator(
+        SimulatedDevice(dsl_router("DSL123", hosts=2), user=USER, password=PASSWORD),
+        tls=tls_context(str(cert)),
+    )
+    yield server
+    server.stop()
+
+
+def _device(server):
+    return FritzDevice(
+        FritzCredentials(server.host, USER, PASSWORD),
+        "sim",
+        connection=ConnectionOptions(port=server.port, use_tls=True),
+    )
+
+
+class TestTransport:
+    def test_installed_on_connections(self, tls_server):
+        device = _device(tls_server)
+
+        assert isinstance(device.transport, TransportAdapter)
+        assert device.fc.session.get_adapter("https://box") is device.transport
+        assert device.fc.session.get_adapter("http://box") is device.transport
+
+    def test_connection_without_session(self):
+        fc = object()
+
+        assert install_transport(fc) is None
+        assert transport_of(fc) is None
+        assert transport_of(MagicMock()) is None
+
+    def test_reconnect_resumes_tls_session(self, tls_server):
+        device = _device(tls_server)
+        tls = device.transport.tls
+        full = tls.handshakes - tls.resumed
+
+        # Drop the pooled connections, as the box does with idle ones.
+        device.transport.poolmanager.clear()
+        device.fc.call_action("DeviceInfo1", "GetInfo")
+
+        assert tls.handshakes - tls.resumed == full
+        assert tls.resumed >= 1
+        assert tls_server.device.resumed_handshakes == tls.resumed
+
+    def test_handshake_metrics(self, tls_server):
+        device = _device(tls_server)
+        collector = FritzCollector()
+        collector.register(device)
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(collector)
+
+        output = generate_latest(registry).decode()
+
+        tls = device.transport.tls
+        labels = '{friendly_name="sim",serial="DSL123"}'
+        assert f"fritz_device_tls_handshakes_total{labels} {float(tls.handshakes)}" in output
+        assert f"fritz_device_tls_resumed_handshakes_total{labels} {float(tls.resumed)}" in output
+
+
+class TestKeepAlive:
+    def test_ping_when_idle(self, tls_server):
+        device = _device(tls_server)
+        keepalive = KeepAlive(device, interval=30.0)
+        handshakes = device.transport.tls.handshakes
+
+        keepalive.ping()
+        assert keepalive.sent == 0
+
+        device.transport.last_used -= 30.0
+        keepalive.ping()
+
+        assert keepalive.sent == 1
+        assert device.transport.idle() < 30.0
+        # The pooled connection was reused.
+        assert device.transport.tls.handshakes == handshakes
+
+    def test_ping_is_not_recorded(self, tls_server, tmp_path):
+        device = FritzDevice(
+            FritzCredentials(tls_server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(
+                port=tls_server.port, use_tls=True, record_to=str(tmp_path / "sim.jsonl.gz")
+            ),
+        )
+        recorded = device.fc._recorded
+        device.transport.last_used -= 30.0
+        keepalive = KeepAlive(device, interval=30.0)
+
+        keepalive.ping()
+
+        assert keepalive.sent == 1
+        assert device.fc._recorded == recorded
+
+    def test_ping_takes_a_token(self, tls_server):
+        device = FritzDevice(
+            FritzCredentials(tls_server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(
+                port=tls_server.port, use_tls=True, rate_limit=1000
+            ),
+        )
+        device.transport.last_used -= 30.0
+        keepalive = KeepAlive(device, interval=30.0)
+
+        with patch.object(device.rate_limit, "acquire", wraps=device.rate_limit.acquire) as acquire:
+            keepalive.ping()
+
+        acquire.assert_called_once_with()
+        assert keepalive.sent == 1
+
+    def test_no_ping_to_unavailable_device(self, tls_server):
+        device = _device(tls_server)
+        device.available = False
+        device.transport.last_used -= 30.0
+        keepalive = KeepAlive(device, interval=30.0)
+
+        keepalive.ping()
+
+        assert keepalive.sent == 0
+
+    def test_collector_starts_keepalives(self, tls_server):
+        device = _device(tls_server)
+        collector = FritzCollector()
+        collector.keep_alive(30.0)
+        collector.register(device)
+
+        list(collector.collect())
+        keepalive = collector._keepalives[device.host]
+        list(collector.collect())
+
+        assert collector._keepalives[device.host] is keepalive
+        collector.unregister(device.host)
+        assert keepalive._stop.is_set()
+
+    def test_no_keepalive_for_plain_http(self):
+        server = start_simulator(
+            SimulatedDevice(dsl_router("DSL123"), user=USER, password=PASSWORD)
+        )
+        try:
+            device = FritzDevice(
+                FritzCredentials(server.host, USER, PASSWORD),
+                "sim",
+                connection=ConnectionOptions(port=server.port),
+            )
+            collector = FritzCollector()
+            collector.keep_alive(30.0)
+            collector.register(device)
+
+            list(collector.collect())
+
+            assert collector._keepalives == {}
+        finally:
+            server.stop()
+
+    @patch("fritzexporter.tr064_remote.FritzConnection")
+    def test_devices_without_transport_are_skipped(self, mock_fritzconnection):
+        fc = mock_fritzconnection.return_value
+        fc.call_action.side_effect = call_action_mock
+        fc.services = create_fc_services(fc_services_devices["FritzBox 7590"])
+        collector = FritzCollector()
+        collector.keep_alive(30.0)
+        collector.register(FritzDevice(FritzCredentials("somehost", "u", "p"), "Fritz!Box"))
+
+        list(collector.collect())
+
+        assert collector._keepalives == {}
+
+
+class TestSharedDigestAuth:
+    @pytest.fixture
+    def server(self):
+        server = start_simulator(
+            SimulatedDevice(dsl_router("DSL123", hosts=2), user=USER, password=PASSWORD)
+        )
+        yield server
+        server.stop()
+
+    def _call_in_threads(self, device, threads=4):
+        workers = [
+            threading.Thread(target=device.fc.call_action, args=("DeviceInfo1", "GetInfo"))
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def test_challenge_shared_between_threads(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port),
+        )
+        auth = device.transport.auth
+        assert auth is device.fc.session.auth
+        challenges = server.device.digest_challenges
+
+        self._call_in_threads(device)
+        self._call_in_threads(device)
+
+        assert server.device.digest_challenges == challenges
+        assert auth.challenges <= challenges
+
+    def test_rechallenge_on_stale_nonce(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port),
+        )
+        auth = device.transport.auth
+        challenges = auth.challenges
+
+        server.device._nonces.clear()
+        assert device.fc.call_action("DeviceInfo1", "GetInfo")["NewSerialNumber"] == "DSL123"
+        self._call_in_threads(device)
+
+        assert auth.challenges == challenges + 1
+
+    def test_continues_with_answered_challenge(self, server):
+        session = requests.Session()
+        session.auth = HTTPDigestAuth(USER, PASSWORD)
+        url = f"http://{server.host}:{server.port}/upnp/control/deviceinfo1"
+        session.post(url, data=b"", headers={"SOAPACTION": "x#GetInfo"})
+        challenges = server.device.digest_challenges
+
+        auth = SharedDigestAuth.from_auth(session.auth)
+        session.auth = auth
+        session.post(url, data=b"", headers={"SOAPACTION": "x#GetInfo"})
+
+        assert server.device.digest_challenges == challenges
+        assert auth.challenges == 0
+
+    def test_challenge_metric(self, server):
+        device = FritzDevice(
+            FritzCredentials(server.host, USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port),
+        )
+        collector = FritzCollector()
+        collector.register(device)
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(collector)
+
+        output = generate_latest(registry).decode()
+
+        challenges = float(device.transport.auth.challenges)
+        labels = '{friendly_name="sim",serial="DSL123"}'
+        assert f"fritz_device_auth_challenges_total{labels} {challenges}" in output
+
+
+class TestResolvingTransport:
+    @pytest.fixture
+    def server(self):
+        server = start_simulator(SimulatedDevice(dsl_router(), user=USER, password=PASSWORD))
+        yield server
+        server.stop()
+
+    def _session(self, addresses):
+        session = requests.Session()
+        resolver = HostResolver(resolve=lambda host: addresses)
+        session.mount("http://", TransportAdapter(resolver=resolver))
+        return session
+
+    def test_connects_to_cached_address(self, server):
+        session = self._session(["127.0.0.1"])
+
+        response = session.get(f"http://fritz.invalid:{server.port}/tr64desc.xml")
+
+        assert response.status_code == 200
+
+    def test_tries_all_addresses(self, server):
+        # Nothing listens on 127.0.0.2.
+        session = self._session(["127.0.0.2", "127.0.0.1"])
+
+        response = session.get(f"http://fritz.invalid:{server.port}/tr64desc.xml")
+
+        assert response.status_code == 200
+
+    def test_used_by_connections(self, server):
+        resolver = HostResolver()
+        device = FritzDevice(
+            FritzCredentials("localhost", USER, PASSWORD),
+            "sim",
+            connection=ConnectionOptions(port=server.port, resolver=resolver),
+        )
+
+        assert device.transport.resolver is resolver
+        assert device.fc.call_action("DeviceInfo1", "GetInfo")["NewModelName"]
+        assert "localhost" in resolver._cache
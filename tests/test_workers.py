@@ -0,0 +1,151 @@
+import functools
+import os
+import signal
+import time
+
+from prometheus_client.core import GaugeMetricFamily
+
+from fritzexporter.workers import ShardedCollector, merge_families, shard
+
+
+def _gauge(serial, value):
+    m = GaugeMetricFamily("fritz_test", "Test metric", labels=["serial"])
+    m.add_metric([serial], value)
+    return m
+
+
+class ShardCollector:
+    def __init__(self, serial):
+        self.serial = serial
+
+    def collect(self):
+        yield _gauge(self.serial, os.getpid())
+
+
+class SlowShardCollector(ShardCollector):
+    def __init__(self, serial, build_time=0.0, collect_time=0.0):
+        time.sleep(build_time)
+        super().__init__(serial)
+        self.collect_time = collect_time
+
+    def collect(self):
+        time.sleep(self.collect_time)
+        yield from super().collect()
+
+
+class SigtermShardCollector(ShardCollector):
+    def collect(self):
+        yield _gauge(self.serial, signal.getsignal(signal.SIGTERM) == signal.SIG_DFL)
+
+
+class TestShard:
+    def test_round_robin(self):
+        assert shard([1, 2, 3, 4, 5], 2) == [[1, 3, 5], [2, 4]]
+
+    def test_never_more_shards_than_items(self):
+        assert shard([1, 2], 8) == [[1], [2]]
+
+    def test_empty(self):
+        assert shard([], 3) == [[]]
+
+
+class TestMergeFamilies:
+    def test_same_name_is_merged_in_order(self):
+        merged = merge_families([[_gauge("a", 1)], [_gauge("b", 2)]])
+
+        assert len(merged) == 1
+        assert [s.labels["serial"] for s in merged[0].samples] == ["a", "b"]
+
+
+class TestShardedCollector:
+    def test_collects_from_all_workers(self):
+        collector = ShardedCollector(
+            [functools.partial(ShardCollector, "a"), functools.partial(ShardCollector, "b")]
+        )
+        collector.start()
+        try:
+            (family,) = list(collector.collect())
+        finally:
+            collector.stop()
+
+        serials = {s.labels["serial"]: s.value for s in family.samples}
+        assert set(serials) == {"a", "b"}
+        # Each shard was collected in its own process
+        assert serials["a"] != serials["b"] != os.getpid()
+
+    def test_dead_worker_is_restarted(self):
+        collector = ShardedCollector([functools.partial(ShardCollector, "a")], timeout=5)
+        collector.start()
+        try:
+            worker = collector.workers[0]
+            os.kill(worker.process.pid, signal.SIGKILL)
+            worker.process.join()
+
+            assert list(collector.collect()) == []
+            assert worker.wait_ready(30)
+            (family,) = list(collector.collect())
+        finally:
+            collector.stop()
+
+        assert family.samples[0].labels["serial"] == "a"
+
+    def test_connecting_does_not_count_against_timeout(self):
+        collector = ShardedCollector(
+            [functools.partial(SlowShardCollector, "a", build_time=2.0)], timeout=0.5
+        )
+        collector.start()
+        try:
+            pid = collector.workers[0].process.pid
+            (family,) = list(collector.collect())
+        finally:
+            collector.stop()
+
+        assert family.samples[0].labels["serial"] == "a"
+        assert family.samples[0].value == pid
+
+    def test_worker_not_ready_is_skipped_without_restart(self):
+        collector = ShardedCollector(
+            [functools.partial(SlowShardCollector, "a", build_time=2.0)], start_timeout=0
+        )
+        collector.start()
+        try:
+            worker = collector.workers[0]
+            pid = worker.process.pid
+
+            assert list(collector.collect()) == []
+            assert worker.process.pid == pid
+            assert worker.wait_ready(30)
+            (family,) = list(collector.collect())
+        finally:
+            collector.stop()
+
+        assert family.samples[0].value == pid
+
+    def test_workers_share_one_deadline(self):
+        collector = ShardedCollector(
+            [
+                functools.partial(SlowShardCollector, "a", collect_time=5.0),
+                functools.partial(SlowShardCollector, "b", collect_time=5.0),
+            ],
+            timeout=1.0,
+        )
+        collector.start()
+        try:
+            start = time.monotonic()
+            assert list(collector.collect()) == []
+            elapsed = time.monotonic() - start
+        finally:
+            collector.stop()
+
+        # Restarting a worker takes a moment, but not a timeout per worker.
+        assert elapsed < 1.9
+
+    def test_sigterm_untouched_without_recordings(self):
+        collector = ShardedCollector([functools.partial(SigtermShardCollector, "a")])
+        collector.start()
+        try:
+            (family,) = list(collector.collect())
+        finally:
+            collector.stop()
+
+        assert family.samples[0].value == 1